@@ -0,0 +1,381 @@
+"""In-memory stand-ins for the external services the platform talks to.
+
+These fakes implement just enough of the Supabase query builder, the
+DynamoDB resource and the SQS, S3 and SNS clients for the code paths under
+benchmark to run offline, with no network and no credentials. ``offline()``
+installs them for the duration of a ``with`` block.
+"""
+
+import io
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from unittest.mock import patch
+
+
+class FakeResponse:
+    """Mimics the ``APIResponse`` returned by ``execute()``."""
+
+    def __init__(self, data: List[Dict[str, Any]]) -> None:
+        self.data = data
+        self.count = len(data)
+
+
+class FakeQuery:
+    """Chainable query over one in-memory table."""
+
+    def __init__(self, rows: List[Dict[str, Any]]) -> None:
+        self._rows = rows
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._insert = None
+        self._upsert = None
+        self._delete = False
+
+    def select(self, *columns: str, **kwargs: Any) -> 'FakeQuery':
+        return self
+
+    def insert(self, rows: Any, **kwargs: Any) -> 'FakeQuery':
+        self._insert = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows: Any, on_conflict: str = '',
+               **kwargs: Any) -> 'FakeQuery':
+        self._upsert = (rows if isinstance(rows, list) else [rows],
+                        on_conflict)
+        return self
+
+    def delete(self, **kwargs: Any) -> 'FakeQuery':
+        self._delete = True
+        return self
+
+    def _where(self, column: str, test) -> 'FakeQuery':
+        self._filters.append(lambda row: test(row.get(column)))
+        return self
+
+    def eq(self, column: str, value: Any) -> 'FakeQuery':
+        return self._where(column, lambda v: v == value)
+
+    def neq(self, column: str, value: Any) -> 'FakeQuery':
+        return self._where(column, lambda v: v != value)
+
+    def gt(self, column: str, value: Any) -> 'FakeQuery':
+        return self._where(column, lambda v: v is not None and v > value)
+
+    def gte(self, column: str, value: Any) -> 'FakeQuery':
+        return self._where(column, lambda v: v is not None and v >= value)
+
+    def lt(self, column: str, value: Any) -> 'FakeQuery':
+        return self._where(column, lambda v: v is not None and v < value)
+
+    def lte(self, column: str, value: Any) -> 'FakeQuery':
+        return self._where(column, lambda v: v is not None and v <= value)
+
+    def in_(self, column: str, values: List[Any]) -> 'FakeQuery':
+        return self._where(column, lambda v: v in values)
+
+    def order(self, column: str, desc: bool = False,
+              **kwargs: Any) -> 'FakeQuery':
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size: int, **kwargs: Any) -> 'FakeQuery':
+        self._limit = size
+        return self
+
+    def execute(self) -> FakeResponse:
+        if self._insert is not None:
+            for row in self._insert:
+                row = dict(row)
+                row.setdefault('id', len(self._rows) + 1)
+                self._rows.append(row)
+            return FakeResponse(self._insert)
+        if self._upsert is not None:
+            rows, on_conflict = self._upsert
+            for row in rows:
+                existing = [
+                    r for r in self._rows if on_conflict
+                    and r.get(on_conflict) == row.get(on_conflict)
+                ]
+                if existing:
+                    existing[0].update(row)
+                else:
+                    self._rows.append(dict(row))
+            return FakeResponse(rows)
+
+        matched = [
+            row for row in self._rows
+            if all(test(row) for test in self._filters)
+        ]
+        if self._delete:
+            for row in matched:
+                self._rows.remove(row)
+            return FakeResponse(matched)
+        for column, desc in reversed(self._order):
+            matched.sort(key=lambda row: row.get(column), reverse=desc)
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        return FakeResponse([dict(row) for row in matched])
+
+
+class FakeSupabase:
+    """Stand-in for a Supabase ``Client`` backed by in-memory tables."""
+
+    def __init__(self) -> None:
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self.tables.setdefault(name, []))
+
+
+class FakeDynamoTable:
+    """Stand-in for a DynamoDB ``Table`` resource."""
+
+    def __init__(self, key_name: str = 'key') -> None:
+        self.key_name = key_name
+        self.items: Dict[str, Dict[str, Any]] = {}
+
+    def put_item(self, Item: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        old = self.items.get(Item[self.key_name])
+        self.items[Item[self.key_name]] = dict(Item)
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and old:
+            return {'Attributes': old}
+        return {}
+
+    def get_item(self, Key: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        item = self.items.get(Key[self.key_name])
+        return {'Item': dict(item)} if item else {}
+
+    def delete_item(self, Key: Dict[str, Any],
+                    **kwargs: Any) -> Dict[str, Any]:
+        old = self.items.pop(Key[self.key_name], None)
+        if kwargs.get('ReturnValues') == 'ALL_OLD' and old:
+            return {'Attributes': old}
+        return {}
+
+    def update_item(self, Key: Dict[str, Any], UpdateExpression: str,
+                    ExpressionAttributeNames: Dict[str, str],
+                    ExpressionAttributeValues: Optional[Dict[str, Any]] = None,
+                    **kwargs: Any) -> Dict[str, Any]:
+        """Supports a single ``ADD`` or ``REMOVE`` clause."""
+        item = self.items.setdefault(Key[self.key_name], dict(Key))
+        clause, _, actions = UpdateExpression.partition(' ')
+        for action in actions.split(', '):
+            name, _, value = action.partition(' ')
+            name = ExpressionAttributeNames[name]
+            if clause == 'ADD':
+                item[name] = (item.get(name, 0)
+                              + ExpressionAttributeValues[value])
+            else:
+                item.pop(name, None)
+        if kwargs.get('ReturnValues') == 'ALL_NEW':
+            return {'Attributes': dict(item)}
+        return {}
+
+
+class FakeDynamoResource:
+    """Stand-in for ``boto3.resource('dynamodb')``."""
+
+    def __init__(self) -> None:
+        self.tables: Dict[str, FakeDynamoTable] = {}
+        self.calls = 0
+
+    # Partition key of tables not keyed by "key"
+    KEY_NAMES = {'SharedDataUsage': 'user_id'}
+
+    def Table(self, name: str) -> FakeDynamoTable:
+        if name not in self.tables:
+            self.tables[name] = FakeDynamoTable(
+                self.KEY_NAMES.get(name, 'key')
+            )
+        return self.tables[name]
+
+    def batch_get_item(self, RequestItems: Dict[str, Any],
+                       **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        responses = {}
+        for name, request in RequestItems.items():
+            table = self.Table(name)
+            responses[name] = [
+                table.get_item(Key=key)['Item'] for key in request['Keys']
+                if table.get_item(Key=key)
+            ]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems: Dict[str, Any],
+                         **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        for name, requests in RequestItems.items():
+            table = self.Table(name)
+            for request in requests:
+                if 'PutRequest' in request:
+                    table.put_item(Item=request['PutRequest']['Item'])
+                else:
+                    table.delete_item(Key=request['DeleteRequest']['Key'])
+        return {'UnprocessedItems': {}}
+
+
+class FakeSQS:
+    """Stand-in for ``boto3.client('sqs')`` recording every message."""
+
+    def __init__(self) -> None:
+        self.messages: List[Dict[str, Any]] = []
+        self.calls = 0
+
+    def send_message(self, QueueUrl: str, MessageBody: str,
+                     **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        self.messages.append({'QueueUrl': QueueUrl, 'Body': MessageBody})
+        return {'MessageId': str(len(self.messages))}
+
+    def send_message_batch(self, QueueUrl: str, Entries: List[Dict[str, Any]],
+                           **kwargs: Any) -> Dict[str, Any]:
+        self.calls += 1
+        successful = []
+        for entry in Entries:
+            self.messages.append(
+                {'QueueUrl': QueueUrl, 'Body': entry['MessageBody']}
+            )
+            successful.append({
+                'Id': entry['Id'], 'MessageId': str(len(self.messages))
+            })
+        return {'Successful': successful, 'Failed': []}
+
+
+class FakeS3:
+    """Stand-in for ``boto3.client('s3')`` holding objects in memory."""
+
+    def __init__(self) -> None:
+        self.objects: Dict[str, bytes] = {}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any,
+                   **kwargs: Any) -> Dict[str, Any]:
+        body = Body.encode() if isinstance(Body, str) else bytes(Body)
+        self.objects[f'{Bucket}/{Key}'] = body
+        return {}
+
+    def get_object(self, Bucket: str, Key: str,
+                   **kwargs: Any) -> Dict[str, Any]:
+        return {'Body': io.BytesIO(self.objects[f'{Bucket}/{Key}'])}
+
+
+class FakeSNS:
+    """Stand-in for ``boto3.client('sns')``."""
+
+    def __init__(self) -> None:
+        self.published: List[Dict[str, Any]] = []
+
+    def publish(self, **kwargs: Any) -> Dict[str, Any]:
+        self.published.append(kwargs)
+        return {'MessageId': str(len(self.published))}
+
+
+class FakeSSM:
+    """Stand-in for ``boto3.client('ssm')``."""
+
+    def __init__(self) -> None:
+        self.parameters: Dict[str, Any] = {}
+
+    def put_parameter(self, Name: str, Value: Any,
+                      **kwargs: Any) -> Dict[str, Any]:
+        self.parameters[Name] = Value
+        return {'Version': 1}
+
+
+class FakeServices:
+    """The set of fakes installed by offline()."""
+
+    def __init__(self) -> None:
+        self.supabase = FakeSupabase()
+        self.dynamodb = FakeDynamoResource()
+        self.sqs = FakeSQS()
+        self.s3 = FakeS3()
+        self.sns = FakeSNS()
+        self.ssm = FakeSSM()
+
+    def client(self, service: str, *args: Any, **kwargs: Any) -> Any:
+        """Drop-in for ``boto3.client``."""
+        return {'sqs': self.sqs, 's3': self.s3, 'sns': self.sns,
+                'ssm': self.ssm}[service]
+
+
+def fake_ohlcv(rows: int = 100) -> List[List[float]]:
+    """Deterministic daily OHLCV candles for indicator benchmarks."""
+    candles = []
+    price = 30000.0
+    for day in range(rows):
+        change = ((day * 7919) % 200 - 100) / 10.0
+        open_ = price
+        close = price + change
+        candles.append([
+            1_600_000_000_000 + day * 86_400_000,
+            open_, max(open_, close) + 5, min(open_, close) - 5, close,
+            1000 + (day * 31) % 500,
+        ])
+        price = close
+    return candles
+
+
+class FakeExchange:
+    """Stand-in for a ccxt exchange."""
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None) -> None:
+        self.config = config or {}
+
+    def fetch_ohlcv(self, symbol: str, timeframe: str = '1d',
+                    limit: int = 100) -> List[List[float]]:
+        return fake_ohlcv(limit)
+
+    def fetch_balance(self) -> Dict[str, Any]:
+        return {'total': {'BTC': 0.5, 'USD': 1200.0}}
+
+
+@contextmanager
+def offline(config: Optional[Dict[str, Any]] = None) -> Iterator[FakeServices]:
+    """Install in-memory fakes for every external service.
+
+    Args:
+        config: Extra config values visible through get_config()
+
+    Yields:
+        The installed fakes, for inspection
+    """
+    import src.config_manager
+    from src.utils import config_manager
+    from src.utils.aws_clients import flush_messages, get_shared_data_cache
+
+    services = FakeServices()
+    # Cached SharedData items belong to the previous set of fakes
+    get_shared_data_cache().clear()
+    # Modules read config through one of two ConfigManager singletons
+    managers = [config_manager.get_config_manager(),
+                src.config_manager.get_config_manager()]
+    base = managers[0].config
+    overrides = {
+        'endpoints': {**base.get('endpoints', {}),
+                      'sqs_queue': 'https://sqs.local/queue'},
+        'tracing': {'emit_metrics': False},
+        # Failed audit writes would otherwise land in the real spool
+        'audit_log': {**base.get('audit_log', {}), 'spool_path': None},
+        **(config or {}),
+    }
+    targets = {
+        'src.utils.database.supabase_client': services.supabase,
+        'src.utils.aws_clients.dynamodb': services.dynamodb,
+        'src.utils.aws_clients.sqs': services.sqs,
+        'src.utils.claim_check._s3_client': services.s3,
+        # Buffered messages go to this set of fakes only
+        'src.utils.aws_clients._message_buffer': None,
+        'boto3.client': services.client,
+        'ccxt.coinbase': FakeExchange,
+    }
+    with ExitStack() as stack:
+        for manager in managers:
+            stack.enter_context(patch.dict(manager.config, overrides))
+        for target, fake in targets.items():
+            stack.enter_context(patch(target, fake))
+        for module in ('src.agents.financial.financial_agent',
+                       'src.agents.financial.expense_report'):
+            stack.enter_context(patch(f'{module}.supabase', services.supabase))
+        stack.callback(flush_messages)
+        yield services
@@ -0,0 +1,298 @@
+"""Offline benchmark runner.
+
+Runs every registered case against the in-memory fakes from
+``benchmarks.fakes``. It reports the median and p95 latency of each case in
+microseconds and compares the medians with ``benchmarks/baseline.json``.
+
+Usage::
+
+    python -m benchmarks.run [--iterations N] [--case PREFIX]
+                             [--tolerance 0.25] [--update-baseline]
+
+The exit status is 1 when any case is slower than its baseline median by
+more than the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeServices, offline
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baseline.json')
+DEFAULT_ITERATIONS = 200
+DEFAULT_TOLERANCE = 0.25
+WARMUP = 5
+
+USER_ID = 'bench-user'
+
+# name -> setup(services) returning a zero-argument callable to time
+CASES: Dict[str, Callable[[FakeServices], Callable[[], Any]]] = {}
+
+# Iteration caps for cases too slow to run the default number of times
+MAX_ITERATIONS: Dict[str, int] = {}
+
+
+def case(name: str, max_iterations: Optional[int] = None) -> Callable:
+    """Register a benchmark case under a name."""
+    def register(setup):
+        CASES[name] = setup
+        if max_iterations:
+            MAX_ITERATIONS[name] = max_iterations
+        return setup
+    return register
+
+
+def _run_in_loop(coro_fn: Callable[[], Any]) -> Callable[[], Any]:
+    """Time a coroutine on one long-lived loop, as in a warm Lambda."""
+    loop = asyncio.new_event_loop()
+    return lambda: loop.run_until_complete(coro_fn())
+
+
+@case('dispatch.overhead')
+def dispatch_overhead(services: FakeServices) -> Callable[[], Any]:
+    """Spans, cache policy lookup and coalescing around a no-op handler,
+    once per registered action."""
+    from src.agents import agent_registry
+
+    async def noop(data, user_id):
+        return {'status': 'success'}
+
+    async def dispatch_all():
+        for action in agent_registry.list_actions():
+            await agent_registry.dispatch(
+                action, {'task': 'benchmark'}, USER_ID
+            )
+
+    run = _run_in_loop(dispatch_all)
+
+    def timed():
+        with patch.object(agent_registry, 'get_async_handler',
+                          lambda action: noop):
+            return run()
+    return timed
+
+
+def _dispatch_case(action: str, data: Dict[str, Any]) -> Callable:
+    def setup(services: FakeServices) -> Callable[[], Any]:
+        from src.agents.agent_registry import dispatch
+        return _run_in_loop(lambda: dispatch(action, dict(data), USER_ID))
+    return setup
+
+
+for _action, _data in {
+    'alert': {'task': 'status'},
+    'key': {'task': 'status'},
+    'financial_plan': {'task': 'investment_strategy'},
+}.items():
+    case(f'dispatch.{_action}')(_dispatch_case(_action, _data))
+
+
+@case('dispatch.sync')
+def dispatch_sync_case(services: FakeServices) -> Callable[[], Any]:
+    """The Flask path, which starts an event loop per request."""
+    from src.agents.agent_registry import dispatch_sync
+    return lambda: dispatch_sync('alert', {'task': 'status'}, USER_ID)
+
+
+@case('audit.log_audit')
+def log_audit_case(services: FakeServices) -> Callable[[], Any]:
+    from src.utils.database import log_audit
+    details = {'status': 'success', 'result': {'items': list(range(50))}}
+    return lambda: log_audit(USER_ID, 'benchmark', details)
+
+
+@case('audit.log_audit_trade')
+def log_audit_trade_case(services: FakeServices) -> Callable[[], Any]:
+    """Dispatcher-level audit of a full fetch_data response."""
+    from benchmarks.fakes import fake_ohlcv
+    from src.utils.database import log_audit
+    candles = fake_ohlcv(100)
+    patterns = [
+        {f'indicator_{i}': row[4] * i for i in range(90)} for row in candles
+    ]
+    details = {'data': candles, 'patterns': patterns}
+    return lambda: log_audit(USER_ID, 'trade', details)
+
+
+def _financial_case(data: Dict[str, Any]) -> Callable:
+    def setup(services: FakeServices) -> Callable[[], Any]:
+        from src.agents.financial.financial_agent import handle_request
+        return lambda: handle_request(dict(data), USER_ID)
+    return setup
+
+
+for _task, _data in {
+    'create_retirement_plan': {'age': 35, 'annual_income': 85000},
+    'investment_strategy': {'risk_tolerance': 'aggressive'},
+    'create_budget': {
+        'income': 5000,
+        'expenses': [{'amount': 100 + i} for i in range(20)],
+    },
+}.items():
+    case(f'financial.{_task}')(
+        _financial_case({'task': _task, 'task_id': 'bench', **_data})
+    )
+
+
+@case('trading.fetch_data', max_iterations=20)
+def trading_fetch_data(services: FakeServices) -> Callable[[], Any]:
+    """Indicator computation over 100 daily candles."""
+    from src.agents.financial.trading_agent import handle_trade_request
+    data = {'task': 'fetch_data', 'symbol': 'BTC/USD'}
+    return lambda: handle_trade_request(dict(data), USER_ID)
+
+
+@case('shared_data.round_trip')
+def shared_data_round_trip(services: FakeServices) -> Callable[[], Any]:
+    from src.utils.aws_clients import get_shared_data, store_shared_data
+    value = {'result': {'rows': [{'id': i, 'v': i * 2} for i in range(20)]}}
+
+    def run():
+        store_shared_data('benchmark', value, USER_ID)
+        return get_shared_data('benchmark', USER_ID)
+    return run
+
+
+@case('shared_data.load_run')
+def shared_data_load_run(services: FakeServices) -> Callable[[], Any]:
+    """Load a 20-step workflow checkpoint from cold, as a resuming
+    container does."""
+    from src import workflows
+    from src.utils.aws_clients import get_shared_data_cache, store_many
+    steps = [{'id': f's{i}', 'agent': 'news'} for i in range(20)]
+    store_many({
+        'workflow_bench': {'run_id': 'bench', 'workflow_name': 'bench',
+                           'steps': steps, 'inputs': {}},
+        **{f'workflow_bench_step_s{i}': {'output': {'n': i}}
+           for i in range(20)},
+    }, USER_ID)
+    run = _run_in_loop(lambda: workflows._load_run('bench', USER_ID))
+
+    def timed():
+        get_shared_data_cache().clear()
+        return run()
+    return timed
+
+
+@case('messages.fan_out')
+def messages_fan_out(services: FakeServices) -> Callable[[], Any]:
+    """Notify five agents and send the messages, as at the end of an
+    invocation."""
+    from src.utils.aws_clients import flush_messages, send_message
+    targets = ['news_agent', 'alert_agent', 'key_agent', 'priority_agent',
+               'update_agent']
+
+    def run():
+        for target in targets:
+            send_message({'target_agent': target, 'user_id': USER_ID,
+                          'event': 'workflow_completed'})
+        return flush_messages()
+    return run
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def measure(fn: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """Time ``fn`` and summarize its latency in microseconds."""
+    for _ in range(WARMUP):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        fn()
+        samples.append((time.perf_counter_ns() - start) / 1000.0)
+    return {
+        'median_us': round(percentile(samples, 50), 1),
+        'p95_us': round(percentile(samples, 95), 1),
+    }
+
+
+def run_cases(iterations: int = DEFAULT_ITERATIONS,
+              prefix: str = '') -> Dict[str, Dict[str, float]]:
+    """Run the registered cases whose names start with ``prefix``.
+
+    Returns:
+        Mapping of case name to median and p95 latency in microseconds
+    """
+    from src.utils.database import flush_audit
+
+    results = {}
+    for name, setup in CASES.items():
+        if not name.startswith(prefix):
+            continue
+        with offline() as services:
+            count = min(iterations, MAX_ITERATIONS.get(name, iterations))
+            results[name] = measure(setup(services), count)
+            # Buffered audit records and counters must land in the fakes,
+            # not Supabase
+            flush_audit(final=True)
+    return results
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict[str, Dict[str, float]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results: Dict[str, Dict[str, float]],
+            baseline: Dict[str, Dict[str, float]],
+            tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """List the cases whose median regressed beyond the tolerance."""
+    regressions = []
+    for name, stats in results.items():
+        expected = baseline.get(name, {}).get('median_us')
+        if expected and stats['median_us'] > expected * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Run offline benchmarks.')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--case', default='',
+                        help='Only run cases whose name starts with this')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='Allowed slowdown of the median, as a fraction')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args(argv)
+
+    # Handlers log at INFO on every call, which would dominate the timings
+    logging.disable(logging.INFO)
+    results = run_cases(args.iterations, args.case)
+    baseline = load_baseline(args.baseline)
+    regressions = compare(results, baseline, args.tolerance)
+
+    print(f'{"case":<34}{"median us":>12}{"p95 us":>12}{"baseline":>12}')
+    for name, stats in results.items():
+        expected = baseline.get(name, {}).get('median_us', '-')
+        flag = '  REGRESSION' if name in regressions else ''
+        print(f'{name:<34}{stats["median_us"]:>12}{stats["p95_us"]:>12}'
+              f'{expected:>12}{flag}')
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({**baseline, **results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+        return 0
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
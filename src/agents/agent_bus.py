@@ -0,0 +1,138 @@
+"""Agent-to-agent messaging that skips SQS for co-located agents.
+
+send_to_agent() builds the same envelope send_message() puts on the SQS
+queue: the message body with its ``target_agent`` and ``user_id``. When the
+target is in AGENT_MODULES, so its code is deployed in this process, the
+envelope is handed to the agent's ``handle_message`` on the bus's own
+event loop instead, as process_record() would after receiving it from the
+queue. Senders never wait for the handler, as with the queue.
+
+Delivery is at least once, as with SQS: a local delivery that fails, by
+raising or returning an error result, or that reaches an agent without
+``handle_message``, is sent to the queue, where the consumer retries it.
+The Lambda handler calls drain() before each invocation returns, so no
+local delivery is cut off by a frozen execution environment, and before
+buffered messages are flushed, so fallbacks are sent too. The Flask backend
+calls it at shutdown.
+
+Set ``agent_bus.local_delivery`` to false to send every message through
+SQS, for deployments that split agents across functions.
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from typing import Any, Dict, Optional, Set
+
+from src.agents.agent_registry import (
+    AGENT_MODULES, get_agent_module, message_handler
+)
+from src.utils.aws_clients import flush_write_behind, send_message
+from src.utils.config_manager import get_config
+from src.utils.logging_config import logger
+from src.utils.tracing import span
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+_in_flight: Set[concurrent.futures.Future] = set()
+_in_flight_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop local deliveries run on, starting its
+    thread on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name='agent-bus', daemon=True
+            ).start()
+        return _loop
+
+
+def is_local(agent_name: str) -> bool:
+    """Whether messages to an agent are delivered in-process."""
+    return (agent_name in AGENT_MODULES
+            and get_config('agent_bus', {}).get('local_delivery', True))
+
+
+def send_to_agent(target_agent: str, body: Dict[str, Any],
+                  user_id: str) -> None:
+    """Send a message to an agent, in-process when it is co-located.
+
+    Args:
+        target_agent: Name of the receiving agent
+        body: Message fields (must be JSON-serializable)
+        user_id: ID of the user the message is sent for
+
+    Raises:
+        Exception: If the message could not be sent to SQS
+    """
+    message = {**body, 'target_agent': target_agent, 'user_id': user_id}
+    if not is_local(target_agent):
+        send_message(message)
+        return
+    # The handler runs on another thread, which cannot see values still
+    # buffered by the sender's write-behind scopes
+    flush_write_behind()
+    # Scheduled from an empty context: the sender's audit and write-behind
+    # scopes may be closed by the time the receiver runs, and anything
+    # added to them then would be lost
+    future = contextvars.Context().run(
+        asyncio.run_coroutine_threadsafe, deliver(message), _get_loop()
+    )
+    with _in_flight_lock:
+        _in_flight.add(future)
+    future.add_done_callback(_done)
+    logger.info("Delivering message to %s in-process", target_agent)
+
+
+def _done(future: concurrent.futures.Future) -> None:
+    with _in_flight_lock:
+        _in_flight.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.error("Message could not be delivered: %s",
+                     str(future.exception()))
+
+
+async def deliver(message: Dict[str, Any]) -> None:
+    """Hand a message to its agent, falling back to SQS on failure."""
+    agent_name = message['target_agent']
+    try:
+        with span('bus.deliver', agent=agent_name):
+            handle_message = message_handler(
+                get_agent_module(agent_name), agent_name
+            )
+            await handle_message(message, message['user_id'])
+    except Exception as e:
+        logger.error("In-process delivery to %s failed, sending to SQS: %s",
+                     agent_name, str(e))
+        await asyncio.get_running_loop().run_in_executor(
+            None, send_message, message
+        )
+
+
+def drain(timeout: Optional[float] = None) -> int:
+    """Wait for in-process deliveries, including any they start.
+
+    Args:
+        timeout: Seconds to wait for each round of deliveries; None waits
+            until they finish
+
+    Returns:
+        Number of deliveries waited for
+    """
+    waited = 0
+    while True:
+        with _in_flight_lock:
+            pending = set(_in_flight)
+        if not pending:
+            return waited
+        done, not_done = concurrent.futures.wait(pending, timeout=timeout)
+        waited += len(done)
+        if not_done:
+            logger.warning("%d in-process deliveries still running",
+                           len(not_done))
+            return waited
@@ -1,112 +1,431 @@
-import os
-from . import (
-    priority_agent,
-    news_agent,
-    alert_agent,
-    key_agent,
-    update_agent
-)
-from .communication import (
-    email_agent,
-    social_agent,
-    texts_agent,
-    notes_agent,
-    voice_agent
-)
-from .coding import (
-    coding_agent
-)
-from .financial import (
-    trading_agent,
-    portfolio_agent,
-    financial_agent
+"""Lazy registry of agent handlers.
+
+Handlers are registered as dotted paths (``package.module:attribute``) and
+the owning module is only imported the first time it is dispatched to. This
+keeps heavy agent dependencies (ccxt, pandas, ta, tweepy, googleapiclient,
+supabase) off the Lambda cold-start path for invocations that never use them.
+
+Handlers follow an async protocol for dispatch: an agent module may expose
+``async def handle(data, user_id)``, and any plain synchronous handler is
+adapted to run in a shared thread pool so blocking I/O can overlap.
+
+dispatch() is the common entry point for the Lambda handler and the Flask
+backend. Identical concurrent requests for read-only tasks are coalesced so
+they share one upstream call and one result, and tasks an agent declares in
+its ``CACHEABLE_TASKS`` are served from the response cache while fresh.
+Each dispatch writes one audit record for the action, into which the
+records logged by its handler are collapsed.
+dispatch_batch() runs several independent actions from one request
+concurrently, each with its own result or error.
+"""
+import asyncio
+import contextvars
+import functools
+import importlib
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from src.utils.cache import (
+    MISS, cache_key, get_response_cache, is_cacheable_result
 )
+from src.utils.config_manager import get_config
+from src.utils.logging_config import logger
+from src.utils.singleflight import SingleFlight, request_key
+from src.utils.tracing import span
 
-from src.backend.dashboard import render_dashboard
-from src.workflows import execute_workflow
-from src.utils import get_config
+# Threads available to synchronous handlers adapted by to_async()
+EXECUTOR_WORKERS = 32
 
+# Defaults for the "batch_requests" config section
+DEFAULT_BATCH_MAX_ITEMS = 25
+DEFAULT_BATCH_CONCURRENCY = 8
 
+_executor = None
 
+_in_flight = SingleFlight()
 
 
-# This registry maps action names to their handler functions
+# This registry maps action names to the dotted path of their handler
 HANDLER_REGISTRY = {
     # Agent actions
-    'code': coding_agent.handle_code_request,
-    'email': email_agent.handle_email_request,
-    'text': texts_agent.handle_texts_request,
-    'trade': trading_agent.handle_trade_request,
-    'priority': priority_agent.handle_priority_request,
-    'news': news_agent.handle_news_request,
-    'alert': alert_agent.handle_alert_request,
-    'portfolio': portfolio_agent.handle_portfolio_request,
-    'notes': notes_agent.handle_notes_request,
-    'expense': financial_agent.handle_request,
-    'social': social_agent.handle_social_request,
-    'voice': voice_agent.handle_voice_request,
-    'key': key_agent.handle_key_request,
-    'update': update_agent.handle_update_request,
-    'financial_plan': financial_agent.handle_request,
+    'code': 'src.agents.coding.coding_agent:handle_code_request',
+    'email': 'src.agents.communication.email_agent:handle_email_request',
+    'text': 'src.agents.communication.texts_agent:handle_texts_request',
+    'trade': 'src.agents.financial.trading_agent:handle_trade_request',
+    'priority': 'src.agents.priority_agent:handle_priority_request',
+    'news': 'src.agents.news_agent:handle_news_request',
+    'alert': 'src.agents.alert_agent:handle_alert_request',
+    'portfolio': (
+        'src.agents.financial.portfolio_agent:handle_portfolio_request'
+    ),
+    'notes': 'src.agents.communication.notes_agent:handle_notes_request',
+    'expense': 'src.agents.financial.financial_agent:handle_request',
+    'social': 'src.agents.communication.social_agent:handle_social_request',
+    'voice': 'src.agents.communication.voice_agent:handle_voice_request',
+    'key': 'src.agents.key_agent:handle_key_request',
+    'update': 'src.agents.update_agent:handle_update_request',
+    'financial_plan': 'src.agents.financial.financial_agent:handle_request',
 
     # Platform and other actions
-    'coordinate': execute_workflow,
-    'dashboard': render_dashboard,
+    'coordinate': 'src.workflows:execute_workflow',
+    'dashboard': 'src.backend.dashboard:render_dashboard',
+    'audit': 'src.utils.audit_query:handle_audit_request',
 }
 
 
-def get_handler(action_name):
-    """Retrieve handler function for a given action."""
-    return HANDLER_REGISTRY.get(action_name)
+# Tasks without side effects, per action; concurrent identical requests
+# for these are coalesced by dispatch(). Tasks that store shared data, like
+# the expense listings, do not belong here even though they only read
+READ_ONLY_TASKS = {
+    'news': {'fetch_news', 'fetch_m2'},
+    'portfolio': {'view_portfolio'},
+    'priority': {'prioritize'},
+    'dashboard': {'view'},
+    'update': {'view_updates'},
+    'audit': {'query_audit'},
+}
 
 
-# This registry maps agent module names to the modules themselves
+# This registry maps agent names to the dotted path of their module
 # This is needed for the SQS and delegate actions that refer to agents by name
 AGENT_MODULES = {
-    'coding_agent': coding_agent,
-    'trading_agent': trading_agent,
-    'priority_agent': priority_agent,
-    'news_agent': news_agent,
-    'alert_agent': alert_agent,
-    'portfolio_agent': portfolio_agent,
-    'notes_agent': notes_agent,
-    'voice_agent': voice_agent,
-    'key_agent': key_agent,
-    'update_agent': update_agent,
-    'financial_agent': financial_agent,
-    'email_agent': email_agent,
-    'social_agent': social_agent,
-    'texts_agent': texts_agent
+    'coding_agent': 'src.agents.coding.coding_agent',
+    'trading_agent': 'src.agents.financial.trading_agent',
+    'priority_agent': 'src.agents.priority_agent',
+    'news_agent': 'src.agents.news_agent',
+    'sentiment_agent': 'src.agents.sentiment_agent',
+    'alert_agent': 'src.agents.alert_agent',
+    'portfolio_agent': 'src.agents.financial.portfolio_agent',
+    'notes_agent': 'src.agents.communication.notes_agent',
+    'voice_agent': 'src.agents.communication.voice_agent',
+    'key_agent': 'src.agents.key_agent',
+    'update_agent': 'src.agents.update_agent',
+    'financial_agent': 'src.agents.financial.financial_agent',
+    'expense_report': 'src.agents.financial.expense_report',
+    'email_agent': 'src.agents.communication.email_agent',
+    'social_agent': 'src.agents.communication.social_agent',
+    'texts_agent': 'src.agents.communication.texts_agent',
 }
 
 
-def get_agent_module(agent_name):
-    """Retrieve agent module by name."""
-    return AGENT_MODULES.get(agent_name)
-
-
-# This registry maps agent names to their handler functions
+# This registry maps agent names to the dotted path of their handler
 AGENT_HANDLERS = {
-    'coding_agent': coding_agent.handle_code_request,
-    'email_agent': email_agent.handle_email_request,
-    'texts_agent': texts_agent.handle_texts_request,
-    'trading_agent': trading_agent.handle_trade_request,
-    'priority_agent': priority_agent.handle_priority_request,
-    'news_agent': news_agent.handle_news_request,
-    'alert_agent': alert_agent.handle_alert_request,
-    'portfolio_agent': portfolio_agent.handle_portfolio_request,
-    'notes_agent': notes_agent.handle_notes_request,
-    'financial_agent': financial_agent.handle_request,
-    'social_agent': social_agent.handle_social_request,
-    'voice_agent': voice_agent.handle_voice_request,
-    'key_agent': key_agent.handle_key_request,
-    'update_agent': update_agent.handle_update_request
+    'coding_agent': 'src.agents.coding.coding_agent:handle_code_request',
+    'email_agent': 'src.agents.communication.email_agent:handle_email_request',
+    'texts_agent': 'src.agents.communication.texts_agent:handle_texts_request',
+    'trading_agent': 'src.agents.financial.trading_agent:handle_trade_request',
+    'priority_agent': 'src.agents.priority_agent:handle_priority_request',
+    'news_agent': 'src.agents.news_agent:handle_news_request',
+    'sentiment_agent': 'src.agents.sentiment_agent:handle_sentiment_request',
+    'alert_agent': 'src.agents.alert_agent:handle_alert_request',
+    'portfolio_agent': (
+        'src.agents.financial.portfolio_agent:handle_portfolio_request'
+    ),
+    'notes_agent': 'src.agents.communication.notes_agent:handle_notes_request',
+    'financial_agent': 'src.agents.financial.financial_agent:handle_request',
+    'expense_report': 'src.agents.financial.expense_report:generate_report',
+    'social_agent': (
+        'src.agents.communication.social_agent:handle_social_request'
+    ),
+    'voice_agent': 'src.agents.communication.voice_agent:handle_voice_request',
+    'key_agent': 'src.agents.key_agent:handle_key_request',
+    'update_agent': 'src.agents.update_agent:handle_update_request',
 }
 
 
-def get_agent_handler(agent_name):
+@lru_cache(maxsize=None)
+def resolve(path: str) -> Any:
+    """Import and return the object referenced by a dotted path.
+
+    Args:
+        path: Either ``package.module`` or ``package.module:attribute``
+
+    Returns:
+        The imported module, or the named attribute of that module
+    """
+    module_name, _, attribute = path.partition(':')
+    module = importlib.import_module(module_name)
+    return getattr(module, attribute) if attribute else module
+
+
+def list_actions() -> List[str]:
+    """List registered action names without importing any handler."""
+    return sorted(HANDLER_REGISTRY)
+
+
+def list_agents() -> List[str]:
+    """List registered agent names without importing any agent module."""
+    return sorted(AGENT_MODULES)
+
+
+def get_handler(action_name: str) -> Optional[Callable]:
+    """Retrieve handler function for a given action."""
+    path = HANDLER_REGISTRY.get(action_name)
+    return resolve(path) if path else None
+
+
+def get_agent_module(agent_name: str) -> Optional[Any]:
+    """Retrieve agent module by name."""
+    path = AGENT_MODULES.get(agent_name)
+    return resolve(path) if path else None
+
+
+def get_agent_handler(agent_name: str) -> Optional[Callable]:
     """Retrieve handler function for a given agent."""
-    return AGENT_HANDLERS.get(agent_name)
+    path = AGENT_HANDLERS.get(agent_name)
+    return resolve(path) if path else None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Return the shared thread pool used for synchronous handlers."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=EXECUTOR_WORKERS, thread_name_prefix='agent-handler'
+        )
+    return _executor
+
+
+def to_async(handler: Callable) -> Callable[..., Awaitable[Any]]:
+    """Adapt a handler to the async protocol.
+
+    Coroutine functions are returned unchanged. Synchronous handlers are
+    wrapped so that each call runs in the shared thread pool, carrying the
+    caller's context variables with it.
+
+    Args:
+        handler: A sync or async callable taking ``(data, user_id)``
+
+    Returns:
+        A coroutine function with the same call signature
+    """
+    if inspect.iscoroutinefunction(handler):
+        return handler
+
+    @functools.wraps(handler)
+    async def run_in_executor(*args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            _get_executor(), context.run, handler, *args
+        )
+
+    return run_in_executor
+
+
+@lru_cache(maxsize=None)
+def _resolve_async(path: str) -> Callable[..., Awaitable[Any]]:
+    """Resolve a handler path, preferring the module's native async handle."""
+    module = resolve(path.partition(':')[0])
+    native = getattr(module, 'handle', None)
+    if inspect.iscoroutinefunction(native):
+        return native
+    return to_async(resolve(path))
+
+
+def get_async_handler(action_name: str) -> Optional[Callable]:
+    """Retrieve an awaitable handler for a given action."""
+    path = HANDLER_REGISTRY.get(action_name)
+    return _resolve_async(path) if path else None
+
+
+def get_async_agent_handler(agent_name: str) -> Optional[Callable]:
+    """Retrieve an awaitable handler for a given agent."""
+    path = AGENT_HANDLERS.get(agent_name)
+    return _resolve_async(path) if path else None
+
+
+def message_handler(agent_module: Any, agent_name: str) -> Callable:
+    """Return an awaitable handling queued messages for an agent.
+
+    Only a module's explicit ``handle_message`` takes messages; its request
+    handler is never run for one, so a message cannot start arbitrary
+    tasks. Handlers report errors as results rather than raising, so an
+    error result raises here and the message is retried.
+
+    Raises:
+        ValueError: If the agent does not handle messages
+    """
+    handle_message = getattr(agent_module, 'handle_message', None)
+    if handle_message is None:
+        raise ValueError(f'Agent {agent_name} does not handle messages')
+    handle = to_async(handle_message)
+
+    async def run(message: Dict[str, Any], user_id: str) -> Any:
+        result = await handle(message, user_id)
+        # The results that are never cached are the error results
+        if not is_cacheable_result(result):
+            raise RuntimeError(
+                f'Agent {agent_name} failed to handle a message: {result}'
+            )
+        return result
+    return run
+
+
+def get_cache_policy(action_name: str,
+                     data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Return the cache policy the action's agent declares for a task."""
+    path = HANDLER_REGISTRY.get(action_name)
+    if not path:
+        return None
+    module = resolve(path.partition(':')[0])
+    return getattr(module, 'CACHEABLE_TASKS', {}).get(data.get('task'))
+
+
+async def _dispatch_cached(action_name: str, data: Dict[str, Any],
+                           user_id: str, handler: Callable,
+                           policy: Dict[str, Any]) -> Any:
+    """Serve a cacheable task from the response cache, filling it on a miss."""
+    cache = get_response_cache()
+    key = cache_key(action_name, data, user_id, policy)
+    with span('cache.read') as record:
+        value = cache.get_local(key)
+        if value is MISS and cache.shared is not None:
+            value = await to_async(cache.get)(key)
+        record['hit'] = value is not MISS
+    if value is not MISS:
+        return value
+
+    async def fetch():
+        with span('handler'):
+            result = await handler(data, user_id)
+        if is_cacheable_result(result):
+            if cache.shared is None:
+                cache.set(key, result, policy['ttl'])
+            else:
+                await to_async(cache.set)(key, result, policy['ttl'])
+        return result
+
+    return await _in_flight.do_async(key, fetch)
+
+
+async def dispatch(action_name: str, data: Dict[str, Any],
+                   user_id: str) -> Any:
+    """Run an action's handler, using the response cache and coalescing
+    identical read-only requests.
+
+    Args:
+        action_name: Name of the action to dispatch
+        data: Request payload passed to the handler
+        user_id: ID of the user making the request
+
+    Returns:
+        The handler result, or an error dict for unknown actions
+    """
+    handler = get_async_handler(action_name)
+    if not handler:
+        return {'error': 'Invalid action'}
+    # Imported on use so the Supabase client stays off the cold path
+    from src.utils.aws_clients import write_behind
+    from src.utils.database import audit_scope
+
+    task = data.get('task')
+    with span('dispatch', action=action_name, task=task), \
+            audit_scope(user_id, action_name, task) as scope:
+        # Shared-data writes of the action are flushed before it returns
+        async with write_behind():
+            scope['result'] = await _dispatch_to(
+                action_name, data, user_id, handler
+            )
+        return scope['result']
+
+
+async def _dispatch_to(action_name: str, data: Dict[str, Any], user_id: str,
+                       handler: Callable) -> Any:
+    """Run a resolved handler through the response cache or coalescing."""
+    policy = get_cache_policy(action_name, data)
+    if policy:
+        return await _dispatch_cached(
+            action_name, data, user_id, handler, policy
+        )
+
+    async def call():
+        with span('handler'):
+            return await handler(data, user_id)
+
+    if data.get('task') not in READ_ONLY_TASKS.get(action_name, ()):
+        return await call()
+    key = request_key(action_name, data, user_id)
+    return await _in_flight.do_async(key, call)
+
+
+def dispatch_sync(action_name: str, data: Dict[str, Any],
+                  user_id: str) -> Any:
+    """Dispatch an action from synchronous code, such as a Flask view."""
+    return asyncio.run(dispatch(action_name, data, user_id))
+
+
+def validate_batch(items: Any) -> None:
+    """Check that a batch is a bounded list of ``{action, data}`` items.
+
+    Raises:
+        ValueError: If the batch is malformed or too large
+    """
+    max_items = get_config('batch_requests', {}).get(
+        'max_items', DEFAULT_BATCH_MAX_ITEMS
+    )
+    if not isinstance(items, list) or not items:
+        raise ValueError('Batch must be a non-empty list of requests')
+    if len(items) > max_items:
+        raise ValueError(f'Batch exceeds {max_items} requests')
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(
+                item.get('action'), str):
+            raise ValueError(f'Batch request {index} has no action')
+        if not isinstance(item.get('data', {}), dict):
+            raise ValueError(f'Batch request {index} data must be an object')
+
+
+async def dispatch_batch(items: List[Dict[str, Any]],
+                         user_id: str) -> List[Dict[str, Any]]:
+    """Dispatch several independent actions concurrently.
+
+    Args:
+        items: Requests of the form ``{"action", "data", "id"}``; ``id`` is
+            optional and echoed back to help clients match results
+        user_id: ID of the user making the requests
+
+    Returns:
+        One entry per request, in order, holding ``id``, ``action`` and
+        either ``result`` or ``error``
+
+    Raises:
+        ValueError: If the batch is malformed or too large
+    """
+    validate_batch(items)
+    concurrency = get_config('batch_requests', {}).get(
+        'max_concurrency', DEFAULT_BATCH_CONCURRENCY
+    )
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def bounded(item):
+        async with semaphore:
+            return await dispatch(
+                item['action'], item.get('data') or {}, user_id
+            )
+
+    outcomes = await asyncio.gather(
+        *(bounded(item) for item in items), return_exceptions=True
+    )
+    results = []
+    for index, (item, outcome) in enumerate(zip(items, outcomes)):
+        entry = {'id': item.get('id', index), 'action': item['action']}
+        if isinstance(outcome, Exception):
+            logger.error("Batch request %s (%s) failed: %s",
+                         entry['id'], item['action'], str(outcome))
+            entry['error'] = str(outcome)
+        else:
+            entry['result'] = outcome
+        results.append(entry)
+    return results
+
+
+def dispatch_batch_sync(items: List[Dict[str, Any]],
+                        user_id: str) -> List[Dict[str, Any]]:
+    """Dispatch a batch from synchronous code, such as a Flask view."""
+    return asyncio.run(dispatch_batch(items, user_id))
 
 
 if __name__ == '__main__':
@@ -1,6 +1,7 @@
 import requests
 import time
-from src.utils import log_audit, send_message, store_shared_data, get_shared_data
+from src.agents.agent_bus import send_to_agent
+from src.utils import log_audit, store_shared_data, get_shared_data
 from src.config_manager import get_config
 
 
@@ -38,7 +39,7 @@ contract {spec.replace(' ', '_')} {{
 }}
             """
             message_body = {"code": response["result"], "task_id": task_id}
-            send_message(message_body, "smart_contract_ai_agent", user_id)
+            send_to_agent("smart_contract_ai_agent", message_body, user_id)
 
         elif task == "grok_suggest":
             code = data.get("code", "")
@@ -68,7 +69,7 @@ contract {spec.replace(' ', '_')} {{
         store_shared_data(f'coding_{task_id}', response["result"], user_id)
         if task in ["generate_rust", "generate_python", "generate_solidity"]:
             message_body = {"code": response["result"], "task_id": task_id}
-            send_message(message_body, "smart_contract_ai_agent", user_id)
+            send_to_agent("smart_contract_ai_agent", message_body, user_id)
 
         log_audit(user_id, f"code_{task}", response)
         return response
@@ -1,6 +1,11 @@
 from src.utils.database import log_audit
+from src.utils.cache import cacheable
 import ccxt
 
+CACHEABLE_TASKS = {
+    'view_portfolio': cacheable(ttl=60),
+}
+
 
 def handle_portfolio_request(data, user_id):
     """Handles portfolio-related tasks."""
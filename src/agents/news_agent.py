@@ -1,5 +1,12 @@
 import requests
 from src.utils import log_audit
+from src.utils.cache import cacheable, shared_across_users
+
+# News and M2 data are the same for every user
+CACHEABLE_TASKS = {
+    'fetch_news': cacheable(ttl=300, key=shared_across_users),
+    'fetch_m2': cacheable(ttl=3600, key=shared_across_users),
+}
 
 
 def handle_news_request(data, user_id):
@@ -1,6 +1,11 @@
 from src.utils import log_audit
+from src.utils.cache import cacheable
 import googleapiclient.discovery
 
+CACHEABLE_TASKS = {
+    'prioritize': cacheable(ttl=120),
+}
+
 
 def handle_priority_request(data, user_id):
     """Handles priority-related tasks."""
@@ -1,5 +1,6 @@
 import sys
 import os
+import atexit
 import logging
 from logging.handlers import RotatingFileHandler
 
@@ -23,12 +24,23 @@ app.logger.info('Flask application starting up...')
 CORS(app)
 
 try:
-    from dashboard import render_dashboard
-    app.logger.info('Successfully imported render_dashboard.')
+    from src.agents.agent_bus import drain
+    from src.agents.agent_registry import (
+        READ_ONLY_TASKS, dispatch_batch_sync, dispatch_sync
+    )
+    from src.utils.aws_clients import flush_messages
+    from src.utils.database import flush_audit
+    app.logger.info('Successfully imported the agent registry.')
 except Exception as e:
     app.logger.critical(f'Failed during import or initial setup: {e}', exc_info=True)
     raise
 
+# Finish in-process agent messages, then write any buffered audit records
+# and messages before the server process exits (handlers run in reverse)
+atexit.register(flush_audit, final=True)
+atexit.register(flush_messages)
+atexit.register(drain)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
@@ -47,13 +59,59 @@ def api_dashboard():
         return jsonify({'error': 'User not authenticated'}), 401
     
     app.logger.debug(f'Calling render_dashboard for user: {user_id}')
-    response = render_dashboard(data, user_id)
+    response = dispatch_sync('dashboard', data, user_id)
     
     if 'error' in response:
         app.logger.error(f"Error processing dashboard request for user {user_id}: {response.get('error')}")
     
     return jsonify(response)
 
+
+# The backend takes the user ID from the request body and has no
+# authentication, so batches may only hold what /api/dashboard already
+# serves; other read-only tasks return a user's private data
+BATCH_TASKS = {'dashboard': READ_ONLY_TASKS['dashboard']}
+
+
+def _batch_allowed(item):
+    """Whether a batched request is for a task the backend may serve."""
+    if not isinstance(item, dict):
+        # Left to dispatch_batch_sync to reject as malformed
+        return True
+    task = (item.get('data') or {}).get('task')
+    return task in BATCH_TASKS.get(item.get('action'), ())
+
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    app.logger.info('Received request for /api/batch')
+    data = request.json or {}
+    user_id = data.get('user_id')
+    if not user_id:
+        app.logger.warning('Batch request failed: User not authenticated')
+        return jsonify({'error': 'User not authenticated'}), 401
+
+    items = data.get('requests')
+    if isinstance(items, list) and not all(
+            _batch_allowed(item) for item in items):
+        app.logger.warning('Batch request for user %s rejected: task '
+                           'not allowed', user_id)
+        return jsonify({'error': 'Only dashboard views can be batched'}), 403
+
+    try:
+        results = dispatch_batch_sync(items, user_id)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    for entry in results:
+        if 'error' in entry:
+            app.logger.error('Error processing batched %s request for '
+                             'user %s: %s', entry['action'], user_id,
+                             entry['error'])
+
+    return jsonify({'results': results})
+
+
 if __name__ == '__main__':
     from waitress import serve
     app.logger.info('Starting server with waitress on port 5002.')
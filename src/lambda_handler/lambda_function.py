@@ -1,10 +1,17 @@
+import asyncio
 import json
 import os
-from core_platform.agent_registry import (
-    get_handler, get_agent_module, get_agent_handler
+from src.agents import agent_bus
+from src.agents.agent_registry import (
+    HANDLER_REGISTRY, dispatch, dispatch_batch, get_agent_module,
+    get_async_agent_handler, get_async_handler, message_handler, to_async
 )
-from workflows import execute_workflow
-from utils import log_audit, parse_task
+from src.utils import get_config, log_audit, logger
+from src.utils.aws_clients import flush_messages, write_behind
+from src.utils.claim_check import fetch, get_pointer
+from src.utils.database import flush_audit
+from src.utils.tracing import flush_metrics, instrument_http, span
+from src.workflows import set_deadline
 
 # Mock boto3 and missing modules for non-AWS environment
 if os.getenv('TESTING') == 'True':
@@ -12,68 +19,186 @@ if os.getenv('TESTING') == 'True':
     from unittest.mock import MagicMock
     sys.modules['boto3'] = MagicMock()
 
+instrument_http()
+
+# Upper bound on SQS records handled concurrently in one invocation
+DEFAULT_RECORD_WORKERS = 10
+
+# Actions invocation metrics are reported under; any other action is
+# reported as 'other', so callers cannot create new metrics
+METRIC_ACTIONS = frozenset(HANDLER_REGISTRY) | {
+    'archive_audit', 'batch', 'delegate', 'sqs'
+}
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'Content-Type,Authorization',
+    'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
+}
+
+
+async def process_record(record, user_id):
+    """Deliver one SQS record to its target agent.
+
+    Args:
+        record: SQS record from the Lambda event
+        user_id: Fallback user ID when the message does not carry one
+
+    Raises:
+        Exception: Any error raised while handling the message, so the
+            record can be reported as a batch item failure
+    """
+    message = json.loads(record.get('body') or '{}')
+    agent_name = message.get('target_agent')
+    agent_module = get_agent_module(agent_name)
+    if not agent_module:
+        logger.warning("Dropping message for unknown agent: %s", agent_name)
+        return
+    pointer = get_pointer(message)
+    if pointer:
+        message = json.loads(await to_async(fetch)(pointer))
+    handle_message = message_handler(agent_module, agent_name)
+    await handle_message(message, message.get('user_id', user_id))
+
+
+async def process_records(records, user_id):
+    """Process SQS records concurrently with per-record error isolation.
+
+    Args:
+        records: SQS records from the Lambda event
+        user_id: Fallback user ID for messages without one
+
+    Returns:
+        SQS partial batch response listing only the failed message IDs
+    """
+    max_workers = get_config('sqs_consumer', {}).get(
+        'max_workers', DEFAULT_RECORD_WORKERS
+    )
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+
+    async def bounded(record):
+        async with semaphore:
+            await process_record(record, user_id)
+
+    outcomes = await asyncio.gather(
+        *(bounded(record) for record in records), return_exceptions=True
+    )
+    failures = []
+    for record, outcome in zip(records, outcomes):
+        if isinstance(outcome, Exception):
+            logger.error(
+                "Failed to process message %s: %s",
+                record.get('messageId'), str(outcome)
+            )
+            failures.append({'itemIdentifier': record.get('messageId')})
+    return {'batchItemFailures': failures}
+
 
 def lambda_handler(event, context):
+    """Lambda entry point; runs the async dispatcher on a fresh event loop."""
+    return asyncio.run(handle_event(event, context))
+
+
+async def handle_event(event, context):
+    """Handle one invocation inside a root span and a shared-data
+    write-behind scope, then finish its in-process agent messages, send its
+    buffered messages, write its buffered audit records and emit its
+    metrics."""
+    if hasattr(context, 'get_remaining_time_in_millis'):
+        # Long workflows checkpoint and suspend before Lambda cuts them off
+        set_deadline(context.get_remaining_time_in_millis() / 1000)
+    action = event.get('action') or ('sqs' if event.get('Records') else None)
+    if action and not (isinstance(action, str) and action in METRIC_ACTIONS):
+        action = 'other'
+    try:
+        with span('invocation', action=action):
+            # Shared-data writes are durable before the response is returned
+            async with write_behind():
+                return await route_event(event)
+    finally:
+        # The execution environment may be frozen once the handler returns.
+        # Messages go out after the shared data they refer to is written;
+        # if they cannot be sent the invocation fails, so it is retried.
+        try:
+            agent_bus.drain()
+            flush_messages()
+        finally:
+            flush_audit()
+            flush_metrics()
+
+
+async def route_event(event):
     try:
         request_context = event.get('requestContext', {})
         authorizer = request_context.get('authorizer', {})
         claims = authorizer.get('claims', {})
         user_id = claims.get('sub', 'anonymous')
         action = event.get('action')
-        data = json.loads(event.get('body', '{}'))
+        data = json.loads(event.get('body') or '{}')
 
         if event.get('Records'):
-            for record in event['Records']:
-                message = json.loads(record.get('body', '{}'))
-                agent_name = message.get('target_agent')
-                agent_module = get_agent_module(agent_name)
-                if agent_module:
-                    agent_module.handle_message(message, user_id)
-            response_body = json.dumps({'status': 'messages_processed'})
-            return {'statusCode': 200, 'body': response_body}
+            return await process_records(event['Records'], user_id)
 
         if action == 'delegate':
+            # Imported on use so the task parser stays off the cold path
+            from src.utils.log_utils import parse_task
             task_plan = parse_task(data.get('request', ''), user_id)
             if task_plan.get('workflow'):
                 workflow_params = {
                     'workflow': task_plan['workflow'], **task_plan['params']
                 }
-                result = execute_workflow(workflow_params, user_id)
+                execute_workflow = get_async_handler('coordinate')
+                result = await execute_workflow(workflow_params, user_id)
             elif task_plan.get('agent'):
                 agent_name = task_plan['agent']
-                handler = get_agent_handler(agent_name)
+                handler = get_async_agent_handler(agent_name)
                 if handler:
-                    result = handler(task_plan['params'], user_id)
+                    result = await handler(task_plan['params'], user_id)
                 else:
                     result = {'error': f'Unknown agent: {agent_name}'}
             else:
                 result = {'error': 'Invalid task'}
             return {'statusCode': 200, 'body': json.dumps(result)}
 
-        handler = get_handler(action)
-        if handler:
-            result = handler(data, user_id)
-        else:
-            result = {'error': 'Invalid action'}
-        log_audit(user_id, action, result)
+        if action == 'archive_audit' and not request_context:
+            # Scheduled job input; API Gateway events carry a requestContext
+            from src.utils.audit_archive import archive_audit_logs
+            result = await to_async(archive_audit_logs)()
+            return {'statusCode': 200, 'body': json.dumps(result)}
+
+        if action == 'batch':
+            try:
+                results = await dispatch_batch(data.get('requests'), user_id)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': CORS_HEADERS,
+                    'body': json.dumps({'error': str(e)})
+                }
+            return {
+                'statusCode': 200,
+                'headers': CORS_HEADERS,
+                'body': json.dumps({'results': results})
+            }
+
+        # dispatch() writes the audit record for the action
+        result = await dispatch(action, data, user_id)
 
         return {
             'statusCode': 200,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-            },
+            'headers': CORS_HEADERS,
             'body': json.dumps(result)
         }
     except Exception as e:
         log_audit(user_id, action or 'unknown', {'error': str(e)})
+        if event.get('Records'):
+            # Any other response would tell SQS the whole batch succeeded
+            return {'batchItemFailures': [
+                {'itemIdentifier': record.get('messageId')}
+                for record in event['Records']
+            ]}
         return {
             'statusCode': 500,
-            'headers': {
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': 'Content-Type,Authorization',
-                'Access-Control-Allow-Methods': 'GET,POST,OPTIONS'
-            },
+            'headers': CORS_HEADERS,
             'body': json.dumps({'error': str(e)})
         }
\ No newline at end of file
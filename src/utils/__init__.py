@@ -5,19 +5,43 @@ This module provides various utility functions including logging, data storage,
 and configuration management.
 """
 
+from importlib import import_module
+
 # Re-export commonly used functions
-from .aws_clients import dynamodb, sqs, store_shared_data, get_shared_data, send_message
+from .aws_clients import (
+    dynamodb, sqs, store_shared_data, get_shared_data, store_many, get_many,
+    send_message, flush_messages, write_behind
+)
 from .config_manager import get_config
-from .database import supabase_client, log_audit
-from .encryption import encrypt_data, decrypt_data
 from .logging_config import logger
 
+# Imported on first use, so importing any src.utils module does not load
+# supabase or cryptography
+_LAZY = {
+    'supabase_client': 'database',
+    'log_audit': 'database',
+    'encrypt_data': 'encryption',
+    'decrypt_data': 'encryption',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = import_module(f'.{_LAZY[name]}', __name__)
+        return getattr(module, name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
 __all__ = [
     'dynamodb',
     'sqs',
     'store_shared_data',
     'get_shared_data',
+    'store_many',
+    'get_many',
     'send_message',
+    'flush_messages',
+    'write_behind',
     'get_config',
     'supabase_client',
     'log_audit',
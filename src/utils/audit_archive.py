@@ -0,0 +1,288 @@
+"""Cold-storage archive for aged audit records.
+
+archive_audit_logs() moves audit_logs rows older than
+``audit_archive.max_age_days`` into zstd-compressed Parquet files. Files are
+hive-partitioned by day and user (``date=2026-01-31/user_id=<id>/``). A row
+is only deleted from Supabase after the file holding it has been written.
+The destination is an ``s3://bucket/prefix`` URI. A local directory is
+only accepted from the command line and for local use: a Lambda's local
+disk does not outlive it, and the rows are gone from Supabase once moved.
+
+read_audit_archive() queries the archive with predicate pushdown. Filters
+on user and time prune partitions by path. The remaining filters are
+checked against Parquet row-group statistics before any data is read.
+
+pyarrow is only needed here, so it is imported on use.
+"""
+
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.utils import database
+from src.utils.config_manager import get_config
+from src.utils.logging_config import logger
+
+# Defaults for the "audit_archive" config section
+DEFAULT_MAX_AGE_DAYS = 90
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_DESTINATION = None
+DEFAULT_COMPRESSION = 'zstd'
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.fs
+    except ImportError as e:
+        raise RuntimeError(
+            'The audit archive requires pyarrow: pip install pyarrow'
+        ) from e
+    return pyarrow
+
+
+def _schema():
+    pa = _pyarrow()
+    return pa.schema([
+        ('id', pa.int64()),
+        ('action', pa.string()),
+        ('details', pa.string()),
+        ('timestamp', pa.timestamp('us', tz='UTC')),
+        ('date', pa.string()),
+        ('user_id', pa.string()),
+    ])
+
+
+def _partitioning():
+    pa = _pyarrow()
+    return pa.dataset.partitioning(
+        pa.schema([('date', pa.string()), ('user_id', pa.string())]),
+        flavor='hive'
+    )
+
+
+def _filesystem(destination: str):
+    """Resolve a destination URI or local path to a filesystem and root."""
+    pa = _pyarrow()
+    if '://' not in destination:
+        destination = os.path.abspath(destination)
+        os.makedirs(destination, exist_ok=True)
+        return pa.fs.LocalFileSystem(), destination
+    return pa.fs.FileSystem.from_uri(destination)
+
+
+def _parse_timestamp(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def write_archive(rows: Sequence[Dict[str, Any]], destination: str) -> int:
+    """Append audit rows to the archive.
+
+    Args:
+        rows: audit_logs rows
+        destination: ``s3://`` URI or local directory of the archive
+
+    Returns:
+        Number of rows written
+    """
+    if not rows:
+        return 0
+    pa = _pyarrow()
+    columns: Dict[str, List[Any]] = {name: [] for name in _schema().names}
+    for row in rows:
+        timestamp = _parse_timestamp(row['timestamp'])
+        columns['id'].append(row['id'])
+        columns['action'].append(row.get('action'))
+        columns['details'].append(row.get('details'))
+        columns['timestamp'].append(timestamp)
+        columns['date'].append(timestamp.date().isoformat())
+        columns['user_id'].append(str(row.get('user_id')))
+    table = pa.Table.from_pydict(columns, schema=_schema())
+
+    filesystem, root = _filesystem(destination)
+    compression = get_config('audit_archive', {}).get(
+        'compression', DEFAULT_COMPRESSION
+    )
+    file_format = pa.dataset.ParquetFileFormat()
+    pa.dataset.write_dataset(
+        table.sort_by([('timestamp', 'ascending'), ('id', 'ascending')]),
+        root,
+        filesystem=filesystem,
+        format=file_format,
+        file_options=file_format.make_write_options(compression=compression),
+        partitioning=_partitioning(),
+        # A unique name per run, so earlier files are never overwritten
+        basename_template=f'part-{uuid.uuid4().hex}-{{i}}.parquet',
+        existing_data_behavior='overwrite_or_ignore',
+    )
+    return table.num_rows
+
+
+def _destination(destination: Optional[str]) -> str:
+    destination = destination or get_config('audit_archive', {}).get(
+        'destination', DEFAULT_DESTINATION
+    )
+    if not destination:
+        raise ValueError('audit_archive.destination is not set')
+    return destination
+
+
+def archive_audit_logs(max_age_days: Optional[float] = None,
+                       destination: Optional[str] = None,
+                       batch_size: Optional[int] = None,
+                       allow_local: bool = False) -> Dict[str, Any]:
+    """Move audit rows older than the cutoff from Supabase to the archive.
+
+    Rows are moved oldest first, one batch at a time. Each batch is deleted
+    only after it has been written, so a failure leaves it in audit_logs
+    for the next run.
+
+    Args:
+        max_age_days: Age after which rows are archived
+        destination: ``s3://`` URI of the archive, or a local directory
+            when ``allow_local`` is set
+        batch_size: Rows fetched, written and deleted per round
+        allow_local: Accept a local directory, for command-line and local
+            use only
+
+    Returns:
+        Summary with the cutoff, destination and number of rows archived
+
+    Raises:
+        ValueError: If the destination is not set, or is local without
+            ``allow_local``
+        RuntimeError: If Supabase deleted fewer rows than were archived,
+            as when row-level security blocks deletes
+    """
+    settings = get_config('audit_archive', {})
+    if max_age_days is None:
+        max_age_days = settings.get('max_age_days', DEFAULT_MAX_AGE_DAYS)
+    destination = _destination(destination)
+    if not destination.startswith('s3://') and not allow_local:
+        raise ValueError(
+            f'Audit archive destination {destination} is not an s3:// URI'
+        )
+    batch_size = batch_size or settings.get('batch_size', DEFAULT_BATCH_SIZE)
+    cutoff = (
+        datetime.now(timezone.utc) - timedelta(days=max_age_days)
+    ).isoformat()
+
+    client = database.supabase_client
+    archived = 0
+    while client:
+        rows = (
+            client.table('audit_logs')
+            .select('id,user_id,action,details,timestamp')
+            .lt('timestamp', cutoff)
+            .order('timestamp')
+            .order('id')
+            .limit(batch_size)
+            .execute()
+        ).data or []
+        if not rows:
+            break
+        write_archive(rows, destination)
+        deleted = client.table('audit_logs').delete().in_(
+            'id', [row['id'] for row in rows]
+        ).execute().data or []
+        if len(deleted) < len(rows):
+            # Rows left behind would be fetched and archived again forever
+            raise RuntimeError(
+                f'Archived {len(rows)} audit records but deleted only '
+                f'{len(deleted)}; stopping after {archived + len(deleted)}'
+            )
+        archived += len(rows)
+        logger.info("Archived %d audit records to %s", len(rows), destination)
+        if len(rows) < batch_size:
+            break
+    return {'cutoff': cutoff, 'destination': destination,
+            'archived': archived}
+
+
+def read_audit_archive(user_id: Optional[str] = None,
+                       action: Optional[str] = None,
+                       start: Optional[str] = None,
+                       end: Optional[str] = None,
+                       columns: Optional[List[str]] = None,
+                       source: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Query archived audit records with predicate pushdown.
+
+    Args:
+        user_id: Only records of this user
+        action: Only records of this action
+        start: Inclusive lower bound on the timestamp, ISO 8601
+        end: Exclusive upper bound on the timestamp, ISO 8601
+        columns: Columns to read; all by default
+        source: ``s3://`` URI or local directory of the archive
+
+    Returns:
+        Matching records, oldest first, with ISO 8601 timestamps
+
+    Raises:
+        ValueError: If no source is given or configured
+    """
+    pa = _pyarrow()
+    source = _destination(source)
+    filesystem, root = _filesystem(source)
+    dataset = pa.dataset.dataset(
+        root, filesystem=filesystem, format='parquet',
+        partitioning=_partitioning(), schema=_schema(),
+    )
+
+    field = pa.dataset.field
+    conditions = []
+    if user_id is not None:
+        conditions.append(field('user_id') == str(user_id))
+    if action is not None:
+        conditions.append(field('action') == action)
+    if start is not None:
+        start_at = _parse_timestamp(start)
+        conditions.append(field('date') >= start_at.date().isoformat())
+        conditions.append(field('timestamp') >= pa.scalar(
+            start_at, type=pa.timestamp('us', tz='UTC')))
+    if end is not None:
+        end_at = _parse_timestamp(end)
+        conditions.append(field('date') <= end_at.date().isoformat())
+        conditions.append(field('timestamp') < pa.scalar(
+            end_at, type=pa.timestamp('us', tz='UTC')))
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else (
+            expression & condition
+        )
+
+    read_columns = list(columns) if columns else None
+    if read_columns and 'timestamp' not in read_columns:
+        read_columns.append('timestamp')
+    table = dataset.to_table(columns=read_columns, filter=expression)
+    records = sorted(table.to_pylist(), key=lambda row: row['timestamp'])
+    for record in records:
+        record['timestamp'] = record['timestamp'].isoformat()
+        if columns and 'timestamp' not in columns:
+            del record['timestamp']
+    return records
+
+
+if __name__ == '__main__':
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description='Archive aged audit_logs rows to Parquet.'
+    )
+    parser.add_argument('--max-age-days', type=float)
+    parser.add_argument('--destination')
+    parser.add_argument('--batch-size', type=int)
+    args = parser.parse_args()
+    print(json.dumps(archive_audit_logs(
+        args.max_age_days, args.destination, args.batch_size,
+        allow_local=True
+    )))
@@ -0,0 +1,101 @@
+"""In-memory buffering of audit records.
+
+Audit records are queued instead of being written one HTTP round trip at a
+time. The queue is written as one bulk insert when it reaches
+``max_batch`` records, when its oldest record has waited
+``flush_interval_seconds``, or when ``flush()`` is called. The Lambda
+handler calls flush() before each invocation returns, and the Flask backend
+calls it at shutdown.
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from src.utils.logging_config import logger
+
+# Defaults for the "audit_log" config section
+DEFAULT_MAX_BATCH = 50
+DEFAULT_FLUSH_INTERVAL = 2.0
+
+
+class AuditBuffer:
+    """Thread-safe queue of audit rows written in batches.
+
+    Args:
+        write_batch: Callable writing a list of rows in one request
+        max_batch: Queue length that triggers an immediate flush
+        flush_interval: Seconds a record may wait before a timed flush
+    """
+
+    def __init__(self, write_batch: Callable[[List[Dict[str, Any]]], None],
+                 max_batch: int = DEFAULT_MAX_BATCH,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.write_batch = write_batch
+        self.max_batch = max(1, max_batch)
+        self.flush_interval = flush_interval
+        self._rows: List[Dict[str, Any]] = []
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+        # Serializes writers so batches reach the sink in queue order
+        self._write_lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Queue a row, flushing if the batch is full."""
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            full = len(self._rows) >= self.max_batch
+        if full:
+            self.flush()
+        else:
+            self._ensure_flusher()
+
+    def flush(self) -> int:
+        """Write every queued row.
+
+        Returns:
+            Number of rows handed to the writer
+        """
+        with self._write_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self.write_batch(rows)
+            except Exception as e:
+                logger.error("Failed to write %d audit records: %s",
+                             len(rows), str(e))
+            return len(rows)
+
+    def pending(self) -> int:
+        """Number of rows waiting to be written."""
+        with self._lock:
+            return len(self._rows)
+
+    def _due(self) -> bool:
+        with self._lock:
+            return bool(self._rows) and (
+                time.monotonic() - self._oldest >= self.flush_interval
+            )
+
+    def _ensure_flusher(self) -> None:
+        """Start the background thread that enforces flush_interval."""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name='audit-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            time.sleep(max(self.flush_interval / 2, 0.05))
+            if self._due():
+                self.flush()
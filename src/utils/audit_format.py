@@ -0,0 +1,212 @@
+"""Compact audit record format.
+
+Audit details are often whole handler responses: generated code, expense
+lists, OHLCV candles with every indicator. Before a record is serialized,
+compact_details() keeps only the fields named by the action's audit schema
+and caps what remains:
+
+* strings longer than ``max_string_length`` become a SHA-256 digest and
+  their length
+* lists and dicts keep their first ``max_items`` entries and record how
+  many were dropped
+* nesting below ``max_depth`` is replaced by the container's size
+
+Top-level fields left out by the schema are listed under ``_omitted`` so the
+record still shows what the response contained. Records collapsed into one
+by an audit scope are kept, each compacted, under ``_events``.
+"""
+
+import fnmatch
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.config_manager import get_config
+
+# Defaults for the "audit_log" config section
+DEFAULT_MAX_STRING_LENGTH = 256
+DEFAULT_MAX_ITEMS = 20
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_MAX_DETAILS_BYTES = 4096
+
+# Fields worth keeping per audit action, as dotted paths into the details.
+# Keys may be fnmatch patterns; entries in the ``audit_log.schemas`` config
+# section take precedence. Actions without a schema keep every field.
+AUDIT_SCHEMAS: Dict[str, List[str]] = {
+    'trade': [
+        'status', 'error', 'order.id', 'order.symbol', 'order.type',
+        'order.side', 'order.amount', 'order.price', 'order.status',
+    ],
+    'code': ['status', 'task_id', 'error'],
+    'code_*': ['status', 'task_id', 'error'],
+    'expense': ['status', 'task_id', 'error'],
+    'financial_plan': ['status', 'task_id', 'error', 'result'],
+    'financial_*': ['status', 'task_id', 'error', 'result'],
+    'news': ['status', 'error'],
+    'portfolio': ['status', 'error'],
+    'priority': ['status', 'error'],
+    'dashboard': ['status', 'error'],
+    'audit': ['status', 'error'],
+    'coordinate': [
+        'status', 'result.workflow_name', 'result.run_id', 'result.failed',
+        'result.skipped', 'result.pending',
+    ],
+}
+
+
+# Schema lookups by action, valid for the config overrides they were built from
+_schema_cache: Dict[str, Optional[List[str]]] = {}
+_schema_overrides: Optional[Dict[str, List[str]]] = None
+
+
+def get_schema(action: str) -> Optional[List[str]]:
+    """Return the fields kept for an action, or None to keep everything."""
+    global _schema_overrides
+    overrides = get_config('audit_log', {}).get('schemas', {})
+    if overrides is not _schema_overrides:
+        _schema_cache.clear()
+        _schema_overrides = overrides
+    if action in _schema_cache:
+        return _schema_cache[action]
+    schemas = {**AUDIT_SCHEMAS, **overrides}
+    fields = schemas.get(action)
+    if fields is None:
+        for pattern, pattern_fields in schemas.items():
+            if fnmatch.fnmatchcase(action, pattern):
+                fields = pattern_fields
+                break
+    _schema_cache[action] = fields
+    return fields
+
+
+def digest(text: str) -> Dict[str, Any]:
+    """Stand-in for a string too large to keep."""
+    return {
+        '_sha256': hashlib.sha256(text.encode()).hexdigest(),
+        '_length': len(text),
+    }
+
+
+def _pick(details: Dict[str, Any], fields: List[str]) -> Dict[str, Any]:
+    """Copy the values at dotted paths into a nested dict."""
+    picked: Dict[str, Any] = {}
+    for path in fields:
+        value = details
+        parts = path.split('.')
+        for part in parts:
+            if not isinstance(value, dict) or part not in value:
+                break
+            value = value[part]
+        else:
+            target = picked
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = value
+    return picked
+
+
+def cap(value: Any, settings: Dict[str, Any]) -> Any:
+    """Apply the size caps to a value, recursively.
+
+    Args:
+        value: JSON-like value to cap
+        settings: The ``audit_log`` config section
+
+    Returns:
+        A JSON-serializable copy within the caps
+    """
+    return _cap(
+        value,
+        settings.get('max_string_length', DEFAULT_MAX_STRING_LENGTH),
+        settings.get('max_items', DEFAULT_MAX_ITEMS),
+        settings.get('max_depth', DEFAULT_MAX_DEPTH),
+    )
+
+
+def _cap(value: Any, max_string: int, max_items: int, depth: int) -> Any:
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        if depth <= 0:
+            return {'_keys': len(value)}
+        capped = {}
+        for key, item in value.items():
+            if len(capped) == max_items:
+                capped['_truncated'] = len(value) - max_items
+                break
+            capped[str(key)] = _cap(item, max_string, max_items, depth - 1)
+        return capped
+    if isinstance(value, (list, tuple, set)):
+        if depth <= 0:
+            return {'_items': len(value)}
+        items = list(value) if isinstance(value, set) else value
+        capped = [_cap(item, max_string, max_items, depth - 1)
+                  for item in items[:max_items]]
+        if len(items) > max_items:
+            capped.append({'_truncated': len(items) - max_items})
+        return capped
+    text = value if isinstance(value, str) else str(value)
+    return digest(text) if len(text) > max_string else text
+
+
+def compact_details(action: str, details: Any) -> Dict[str, Any]:
+    """Reduce audit details to the compact record format.
+
+    Args:
+        action: Audit action, used to look up its schema
+        details: Details passed to log_audit
+
+    Returns:
+        Compacted details, safe to serialize
+    """
+    settings = get_config('audit_log', {})
+    if not isinstance(details, dict):
+        details = {'value': details}
+    fields = get_schema(action)
+    if fields is None:
+        return cap(details, settings)
+    compact = cap(_pick(details, fields), settings)
+    covered = {path.split('.')[0] for path in fields}
+    omitted = sorted(str(key) for key in details if key not in covered)
+    if omitted:
+        compact['_omitted'] = omitted
+    return compact
+
+
+def encode_details(action: str, details: Any,
+                   events: Optional[List[Tuple[str, Any]]] = None) -> str:
+    """Serialize compacted details, digesting records still over the cap.
+
+    Args:
+        action: Audit action
+        details: Details passed to log_audit
+        events: ``(action, details)`` of records collapsed into this one,
+            kept compacted under ``_events``
+
+    Returns:
+        JSON text for the ``audit_logs.details`` column
+    """
+    compact = compact_details(action, details)
+    if events:
+        max_items = get_config('audit_log', {}).get(
+            'max_items', DEFAULT_MAX_ITEMS
+        )
+        compact['_events'] = [
+            {'action': event_action,
+             **compact_details(event_action, event_details)}
+            for event_action, event_details in events[:max_items]
+        ]
+        if len(events) > max_items:
+            compact['_events'].append(
+                {'_truncated': len(events) - max_items}
+            )
+    encoded = json.dumps(compact, separators=(',', ':'), default=str)
+    max_bytes = get_config('audit_log', {}).get(
+        'max_details_bytes', DEFAULT_MAX_DETAILS_BYTES
+    )
+    if len(encoded) > max_bytes:
+        encoded = json.dumps({
+            **digest(encoded),
+            '_keys': sorted(compact)[:DEFAULT_MAX_ITEMS],
+        }, separators=(',', ':'))
+    return encoded
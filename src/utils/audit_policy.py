@@ -0,0 +1,138 @@
+"""Per-action audit policy.
+
+Each audit action, optionally narrowed to a task, is logged in one of
+three modes:
+
+* ``always``: every record is written
+* ``sampled``: a ``rate`` fraction of records is written, each tagged with
+  ``_sample_rate`` so counts can be scaled back up
+* ``aggregated``: records only increment per-user counters, written as
+  ``audit_aggregate`` records when the window closes or audits are flushed
+
+Records describing an error are always written, whatever the mode.
+Built-in policies are in AUDIT_POLICIES. The ``audit_log.policies`` config
+section overrides them per action, and ``audit_log.default_mode`` applies to
+actions without a policy.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.utils.config_manager import get_config
+
+ALWAYS = 'always'
+SAMPLED = 'sampled'
+AGGREGATED = 'aggregated'
+
+# Defaults for the "audit_log" config section
+DEFAULT_MODE = ALWAYS
+DEFAULT_SAMPLE_RATE = 0.1
+DEFAULT_AGGREGATE_WINDOW = 60.0
+
+AGGREGATE_ACTION = 'audit_aggregate'
+
+# Policies by action; "tasks" entries override the action-level mode.
+# High-frequency read tasks are the candidates; writes, trades and key
+# operations keep the default of "always".
+AUDIT_POLICIES: Dict[str, Dict[str, Any]] = {
+    'news': {'tasks': {
+        'fetch_news': {'mode': AGGREGATED},
+        'fetch_m2': {'mode': AGGREGATED},
+    }},
+    'dashboard': {'tasks': {'view': {'mode': AGGREGATED}}},
+    'update': {'tasks': {'view_updates': {'mode': AGGREGATED}}},
+    'priority': {'tasks': {'prioritize': {'mode': SAMPLED}}},
+    'portfolio': {'tasks': {'view_portfolio': {'mode': SAMPLED}}},
+    'expense': {'tasks': {
+        'list_expenses': {'mode': SAMPLED},
+        'expense_summary': {'mode': SAMPLED},
+    }},
+    'audit': {'tasks': {'query_audit': {'mode': AGGREGATED}}},
+}
+
+
+def get_policy(action: str, task: Optional[str] = None) -> Dict[str, Any]:
+    """Resolve the audit policy for an action and task.
+
+    Returns:
+        Dict with ``mode`` and, for sampled policies, ``rate``
+    """
+    settings = get_config('audit_log', {})
+    policies = {**AUDIT_POLICIES, **settings.get('policies', {})}
+    policy = {'mode': settings.get('default_mode', DEFAULT_MODE)}
+    action_policy = policies.get(action, {})
+    policy.update({k: v for k, v in action_policy.items() if k != 'tasks'})
+    policy.update(action_policy.get('tasks', {}).get(task, {}))
+    if policy['mode'] == SAMPLED:
+        policy.setdefault('rate', settings.get('sample_rate',
+                                               DEFAULT_SAMPLE_RATE))
+    return policy
+
+
+def is_error(details: Any) -> bool:
+    """Whether audit details describe a failure."""
+    return isinstance(details, dict) and (
+        'error' in details or details.get('status') == 'error'
+    )
+
+
+def sampled(policy: Dict[str, Any]) -> bool:
+    """Draw whether a record under a sampled policy is written."""
+    return random.random() < policy['rate']
+
+
+class AuditAggregator:
+    """Per-user counters for actions audited in aggregate.
+
+    Args:
+        window: Seconds after which the counters should be written out
+    """
+
+    def __init__(self, window: float = DEFAULT_AGGREGATE_WINDOW) -> None:
+        self.window = window
+        self._counts: Dict[Tuple[str, str, Optional[str]], int] = {}
+        self._started = time.monotonic()
+        self._window_start = datetime.now(timezone.utc)
+        self._lock = threading.Lock()
+
+    def add(self, user_id: str, action: str, task: Optional[str]) -> bool:
+        """Count one record.
+
+        Returns:
+            Whether the window has closed and drain() should be called
+        """
+        with self._lock:
+            key = (user_id, action, task)
+            self._counts[key] = self._counts.get(key, 0) + 1
+            return time.monotonic() - self._started >= self.window
+
+    def expired(self) -> bool:
+        """Whether the current window has closed."""
+        with self._lock:
+            return time.monotonic() - self._started >= self.window
+
+    def drain(self) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Take the counters and start a new window.
+
+        Returns:
+            ``(user_id, action, details)`` for one summary record per
+            counted user, action and task
+        """
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            window_start, self._window_start = self._window_start, now
+            self._started = time.monotonic()
+        return [
+            (user_id, AGGREGATE_ACTION, {
+                'action': action,
+                'task': task,
+                'count': count,
+                'window_start': window_start.isoformat(),
+                'window_end': now.isoformat(),
+            })
+            for (user_id, action, task), count in counts.items()
+        ]
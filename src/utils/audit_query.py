@@ -0,0 +1,141 @@
+"""Paginated queries over a user's audit history.
+
+Pages are ordered newest first by ``(timestamp, id)`` and use keyset
+pagination. The cursor encodes the last row of a page, and the next page
+starts strictly after it. Every page is then one range scan on the
+``(user_id, timestamp, id)`` or ``(user_id, action, timestamp, id)`` index
+added by the audit_logs migration, however deep the client pages.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from src.utils import database
+from src.utils.config_manager import get_config
+from src.utils.logging_config import logger
+
+# Defaults for the "audit_query" config section
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+COLUMNS = 'id,user_id,action,details,timestamp'
+
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    """Build the cursor for the page after ``row``."""
+    raw = json.dumps([row['timestamp'], row['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """Return the ``(timestamp, id)`` a cursor points after.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor))
+        return _timestamp(timestamp), int(row_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def _timestamp(value: str) -> str:
+    """Normalize an ISO 8601 timestamp, rejecting anything else."""
+    return datetime.fromisoformat(value).isoformat()
+
+
+def _decode_details(details: Any) -> Any:
+    if isinstance(details, str):
+        try:
+            return json.loads(details)
+        except ValueError:
+            return details
+    return details
+
+
+def query_audit_logs(user_id: str, action: Optional[str] = None,
+                     start: Optional[str] = None, end: Optional[str] = None,
+                     limit: Optional[int] = None,
+                     cursor: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch one page of a user's audit records, newest first.
+
+    Args:
+        user_id: User whose records to return
+        action: Only return records for this action
+        start: Inclusive lower bound on the timestamp, ISO 8601
+        end: Exclusive upper bound on the timestamp, ISO 8601
+        limit: Page size, capped at ``audit_query.max_page_size``
+        cursor: ``next_cursor`` from the previous page
+
+    Returns:
+        Dict with ``items`` and ``next_cursor``, which is None on the last
+        page
+
+    Raises:
+        ValueError: If a timestamp, the limit or the cursor is invalid
+    """
+    settings = get_config('audit_query', {})
+    max_page = settings.get('max_page_size', MAX_PAGE_SIZE)
+    if limit is None:
+        limit = settings.get('page_size', DEFAULT_PAGE_SIZE)
+    limit = int(limit)
+    if limit < 1:
+        raise ValueError('Limit must be positive')
+    limit = min(limit, max_page)
+
+    client = database.supabase_client
+    if not client:
+        return {'items': [], 'next_cursor': None}
+    query = client.table('audit_logs').select(COLUMNS).eq('user_id', user_id)
+    if action:
+        query = query.eq('action', action)
+    if start:
+        query = query.gte('timestamp', _timestamp(start))
+    if end:
+        query = query.lt('timestamp', _timestamp(end))
+    if cursor:
+        timestamp, row_id = decode_cursor(cursor)
+        # Row-value comparison (timestamp, id) < (cursor), in PostgREST form
+        query = query.or_(
+            f'timestamp.lt."{timestamp}",'
+            f'and(timestamp.eq."{timestamp}",id.lt.{row_id})'
+        )
+    rows = (
+        query.order('timestamp', desc=True)
+        .order('id', desc=True)
+        .limit(limit + 1)
+        .execute()
+    ).data or []
+
+    items = [
+        {**row, 'details': _decode_details(row.get('details'))}
+        for row in rows[:limit]
+    ]
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {'items': items, 'next_cursor': next_cursor}
+
+
+def handle_audit_request(data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Registry handler for the ``audit`` action."""
+    task = data.get('task', 'query_audit')
+    if task != 'query_audit':
+        return {'status': 'error', 'result': f'Unknown task: {task}'}
+    try:
+        page = query_audit_logs(
+            user_id,
+            action=data.get('action'),
+            start=data.get('start'),
+            end=data.get('end'),
+            limit=data.get('limit'),
+            cursor=data.get('cursor'),
+        )
+    except ValueError as e:
+        return {'status': 'error', 'result': str(e)}
+    except Exception as e:
+        logger.error("Audit query failed for user=%s: %s", user_id, str(e))
+        return {'status': 'error', 'result': 'Audit query failed'}
+    return {'status': 'success', 'result': page}
@@ -0,0 +1,266 @@
+"""Durable local spool for audit records that could not be written.
+
+When a bulk audit insert fails, its rows are appended to a SQLite file in
+WAL mode instead of being dropped. A SpoolReplayer drains the spool back to
+Supabase in batches from a background thread. After a failure it backs off
+exponentially. While it is backing off, new batches go straight to the spool
+so requests do not wait on a database that is known to be down.
+
+A batch the database rejects would otherwise block the spool for good, since
+later rows queue behind it. After a failed replay the replayer halves its
+batch size, down to single rows, so a rejected row is isolated. A row that
+still fails on its own after ``max_attempts`` tries is moved to the
+``audit_dead_letter`` table of the spool file for inspection.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from src.utils.logging_config import logger
+
+# Defaults for the spool settings in the "audit_log" config section
+DEFAULT_SPOOL_PATH = '/tmp/audit_spool.db'
+DEFAULT_REPLAY_BATCH = 100
+DEFAULT_REPLAY_INTERVAL = 5.0
+DEFAULT_MAX_BACKOFF = 300.0
+DEFAULT_MAX_ATTEMPTS = 5
+
+
+class AuditSpool:
+    """Append-only queue of audit rows in a local SQLite file."""
+
+    def __init__(self, path: str = DEFAULT_SPOOL_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # WAL with synchronous=NORMAL survives process crashes, which is
+        # what the spool is for, without an fsync on every append
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS audit_spool ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, row TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0)'
+        )
+        # Spools created before dead-lettering lack the attempt counter
+        existing = {row[1] for row in self._conn.execute(
+            'PRAGMA table_info(audit_spool)'
+        )}
+        if 'attempts' not in existing:
+            self._conn.execute('ALTER TABLE audit_spool ADD COLUMN '
+                               'attempts INTEGER NOT NULL DEFAULT 0')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS audit_dead_letter ('
+            'id INTEGER PRIMARY KEY, row TEXT NOT NULL, error TEXT, '
+            'failed_at REAL NOT NULL)'
+        )
+
+    def append(self, rows: List[Dict[str, Any]]) -> None:
+        """Add rows to the end of the spool."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT INTO audit_spool (row) VALUES (?)',
+                [(json.dumps(row, default=str),) for row in rows]
+            )
+
+    def peek(self, limit: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Return up to ``limit`` of the oldest rows with their spool IDs."""
+        with self._lock:
+            found = self._conn.execute(
+                'SELECT id, row FROM audit_spool ORDER BY id LIMIT ?',
+                (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(row)) for row_id, row in found]
+
+    def ack(self, ids: List[int]) -> None:
+        """Remove rows that have been written."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'DELETE FROM audit_spool WHERE id = ?',
+                [(row_id,) for row_id in ids]
+            )
+
+    def pending(self) -> int:
+        """Number of rows waiting to be replayed."""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM audit_spool'
+            ).fetchone()[0]
+
+    def record_attempt(self, row_id: int) -> int:
+        """Count a failed write of one row.
+
+        Returns:
+            The row's failed attempts so far
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE audit_spool SET attempts = attempts + 1 WHERE id = ?',
+                (row_id,)
+            )
+            found = self._conn.execute(
+                'SELECT attempts FROM audit_spool WHERE id = ?', (row_id,)
+            ).fetchone()
+        return found[0] if found else 0
+
+    def dead_letter(self, row_id: int, error: str) -> None:
+        """Move a row that cannot be written to the dead-letter table."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO audit_dead_letter '
+                '(id, row, error, failed_at) '
+                'SELECT id, row, ?, ? FROM audit_spool WHERE id = ?',
+                (error, time.time(), row_id)
+            )
+            self._conn.execute('DELETE FROM audit_spool WHERE id = ?',
+                               (row_id,))
+
+    def dead_letters(self) -> List[Dict[str, Any]]:
+        """Rows moved to the dead-letter table, oldest first."""
+        with self._lock:
+            found = self._conn.execute(
+                'SELECT row FROM audit_dead_letter ORDER BY id'
+            ).fetchall()
+        return [json.loads(row) for row, in found]
+
+
+class SpoolReplayer:
+    """Drains an AuditSpool through a batch writer with exponential backoff.
+
+    Args:
+        spool: Spool to drain
+        write_batch: Callable writing a list of rows in one request
+        batch_size: Rows written per request
+        interval: Seconds between background drain attempts
+        max_backoff: Upper bound on the delay after repeated failures
+        max_attempts: Failed writes of a single row before it is moved to
+            the dead-letter table
+    """
+
+    def __init__(self, spool: AuditSpool,
+                 write_batch: Callable[[List[Dict[str, Any]]], None],
+                 batch_size: int = DEFAULT_REPLAY_BATCH,
+                 interval: float = DEFAULT_REPLAY_INTERVAL,
+                 max_backoff: float = DEFAULT_MAX_BACKOFF,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> None:
+        self.spool = spool
+        self.write_batch = write_batch
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        # Rows per replay, halved after each failure to isolate bad rows
+        self._limit = self.batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self._retry_at = 0.0
+        # Held for the whole of a replay, including its write
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._thread = None
+
+    def available(self) -> bool:
+        """Whether the writer is not currently backing off."""
+        return time.monotonic() >= self._retry_at
+
+    def record_failure(self) -> float:
+        """Back off after a failed write.
+
+        Returns:
+            Seconds until the next attempt
+        """
+        self.failures += 1
+        delay = min(self.max_backoff,
+                    self.interval * 2 ** (self.failures - 1))
+        self._retry_at = time.monotonic() + delay
+        return delay
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._retry_at = 0.0
+
+    def replay_once(self, blocking: bool = True) -> int:
+        """Write the oldest batch in the spool unless backing off.
+
+        Args:
+            blocking: Wait for a replay already running on another thread;
+                when False, return without replaying instead
+
+        Returns:
+            Number of rows written
+        """
+        if not self.available():
+            return 0
+        if not self._lock.acquire(blocking):
+            return 0
+        try:
+            batch = self.spool.peek(min(self._limit, self.batch_size))
+            if not batch:
+                return 0
+            try:
+                self.write_batch([row for _, row in batch])
+            except Exception as e:
+                self._replay_failed(batch, e)
+                return 0
+            self.spool.ack([row_id for row_id, _ in batch])
+            self.record_success()
+            self._limit = min(self.batch_size, self._limit * 2)
+            return len(batch)
+        finally:
+            self._lock.release()
+
+    def _replay_failed(self, batch: List[Tuple[int, Dict[str, Any]]],
+                       error: Exception) -> None:
+        if len(batch) > 1:
+            # Retry in smaller batches, so one rejected row cannot hold
+            # back the rest of the spool
+            self._limit = max(1, len(batch) // 2)
+        else:
+            row_id = batch[0][0]
+            if self.spool.record_attempt(row_id) >= self.max_attempts:
+                self.spool.dead_letter(row_id, str(error))
+                logger.error(
+                    "Audit record %d failed %d times and was moved to the "
+                    "dead-letter table: %s", row_id, self.max_attempts,
+                    str(error)
+                )
+                self._limit = self.batch_size
+                return
+        delay = self.record_failure()
+        logger.warning(
+            "Audit replay of %d records failed, retrying in %.0fs: %s",
+            len(batch), delay, str(error)
+        )
+
+    def drain(self) -> int:
+        """Replay batches until the spool is empty or a write fails.
+
+        Returns:
+            Number of rows written
+        """
+        total = 0
+        while True:
+            written = self.replay_once()
+            if not written:
+                return total
+            total += written
+
+    def start(self) -> None:
+        """Start the background drain thread if it is not running."""
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='audit-replayer', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(max(self.interval, 0.05))
+            try:
+                self.drain()
+            except Exception as e:
+                logger.error("Audit replayer error: %s", str(e))
@@ -1,10 +1,26 @@
 """Initializes and configures AWS clients for the application."""
 
+import asyncio
 import boto3
 import json
+import threading
+import time
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from src.utils import claim_check
+from src.utils.cache import LRUCache, MISS
+from src.utils.local_store import DEFAULT_PATH, get_local_store
 from src.utils.logging_config import logger
+from src.utils.message_buffer import (
+    DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_BATCH, DEFAULT_MAX_BATCH_BYTES,
+    Message, MessageBuffer, SendError
+)
+from src.utils.shared_codec import decode, encode, to_json
+from src.utils.storage_usage import (
+    DynamoDBUsage, QuotaExceededError, expired, item_deltas, total
+)
+from src.utils.tracing import span
 from src.config_manager import get_config
 from src.config_manager import get_config
 
@@ -12,8 +28,210 @@ from src.config_manager import get_config
 dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
 sqs = boto3.client('sqs', region_name='us-east-1')
 
+# Defaults for the "shared_data_cache" config section
+DEFAULT_SHARED_CACHE_BYTES = 4 * 1024 * 1024
+DEFAULT_SHARED_CACHE_TTL = 30
+
+# Defaults for the expiry and accounting settings in the "shared_data"
+# config section
+DEFAULT_USAGE_TABLE = 'SharedDataUsage'
+DEFAULT_USAGE_CACHE_SECONDS = 10
+
+# DynamoDB limits on the items in one BatchWriteItem and BatchGetItem call
+BATCH_WRITE_LIMIT = 25
+BATCH_GET_LIMIT = 100
+# Attempts at unprocessed items before a bulk operation gives up
+BATCH_MAX_ATTEMPTS = 5
+BATCH_RETRY_DELAY = 0.05
+
+_shared_data_cache = None
+_message_buffer = None
+# Users' storage totals by user ID, each entry charged one unit
+_usage_totals = LRUCache(max_bytes=10000)
+_write_behind: ContextVar[Optional['WriteBehind']] = ContextVar(
+    'shared_data_write_behind', default=None
+)
+
+
+def get_shared_data_cache() -> LRUCache:
+    """Get or create the per-container cache in front of SharedData.
+
+    Entries hold the stored JSON text, so every hit returns a fresh copy.
+    Items written from other containers are seen once the local entry
+    expires, after at most ``ttl_seconds``.
+    """
+    global _shared_data_cache
+    if _shared_data_cache is None:
+        settings = get_config('shared_data_cache', {})
+        _shared_data_cache = LRUCache(
+            settings.get('max_bytes', DEFAULT_SHARED_CACHE_BYTES)
+        )
+    return _shared_data_cache
+
+
+def _resource() -> Any:
+    """The SharedData backend selected by ``shared_data.backend``: the
+    DynamoDB resource, or a local SQLite store with the same API."""
+    settings = get_config('shared_data', {})
+    if settings.get('backend', 'dynamodb') == 'sqlite':
+        return get_local_store(settings.get('sqlite_path', DEFAULT_PATH),
+                               settings.get('sweep_interval_seconds'))
+    return dynamodb
+
+
+def _cache_settings() -> Dict[str, Any]:
+    settings = get_config('shared_data_cache', {})
+    return {
+        'enabled': settings.get('enabled', True),
+        'ttl': settings.get('ttl_seconds', DEFAULT_SHARED_CACHE_TTL),
+    }
+
+
+def get_ttl(key: str) -> Optional[int]:
+    """Seconds a key is kept, from the longest matching prefix in
+    ``shared_data.ttl_seconds``, else ``shared_data.default_ttl_seconds``.
+
+    Returns:
+        The TTL, or None for keys that never expire
+    """
+    settings = get_config('shared_data', {})
+    prefixes = settings.get('ttl_seconds', {})
+    matches = [prefix for prefix in prefixes if key.startswith(prefix)]
+    if matches:
+        return prefixes[max(matches, key=len)]
+    return settings.get('default_ttl_seconds')
+
+
+def _to_item(item_key: str, text: str, timestamp: str) -> Dict[str, Any]:
+    """Build the SharedData item for a value's JSON text, offloading it to
+    the claim-check store when it is too large to keep inline.
+
+    Items carry their stored ``size`` for usage accounting and, when their
+    key has a TTL, an ``expires_at`` Unix time for DynamoDB TTL.
+    """
+    stored = encode(text)
+    data = stored.encode() if isinstance(stored, str) else stored
+    item = {'key': item_key, 'timestamp': timestamp, 'size': len(data)}
+    ttl = get_ttl(item_key.split(':', 1)[1])
+    if ttl is not None:
+        item['expires_at'] = int(time.time() + ttl)
+    if len(data) > claim_check.threshold('shared_data'):
+        pointer = claim_check.offload(data, 'shared_data')
+        item['value_ref'] = json.dumps(pointer)
+    else:
+        item['value'] = stored
+    return item
+
+
+def _expired(item: Dict[str, Any]) -> bool:
+    """DynamoDB deletes expired items lazily, so reads check expiry too."""
+    return 'expires_at' in item and float(item['expires_at']) <= time.time()
+
+
+def _tracking() -> bool:
+    return get_config('shared_data', {}).get('track_usage', False)
+
+
+def _usage_store() -> Any:
+    resource = _resource()
+    if resource is dynamodb:
+        return DynamoDBUsage(dynamodb.Table(
+            get_config('shared_data', {}).get('usage_table',
+                                              DEFAULT_USAGE_TABLE)
+        ))
+    return resource.usage
+
+
+def _cache_usage(user_id: str, counters: Dict[str, int]) -> int:
+    used = total(counters)
+    seconds = get_config('shared_data', {}).get(
+        'usage_cache_seconds', DEFAULT_USAGE_CACHE_SECONDS
+    )
+    _usage_totals.set(user_id, used, seconds, 1)
+    return used
+
+
+def get_storage_usage(user_id: str, refresh: bool = False) -> int:
+    """Bytes of unexpired shared data a user has stored.
+
+    Totals are cached in-process for ``shared_data.usage_cache_seconds``
+    and refreshed by every write the process makes.
+
+    Args:
+        user_id: ID of the user
+        refresh: Read the counters even if a cached total is fresh
+    """
+    if not refresh:
+        used = _usage_totals.get(user_id)
+        if used is not MISS:
+            return used
+    usage = _usage_store()
+    counters = usage.get(user_id)
+    stale = expired(counters)
+    if stale:
+        usage.prune(user_id, stale)
+    return _cache_usage(user_id, counters)
+
+
+def _check_quota(user_id: str) -> None:
+    """Refuse writes from users at or over ``shared_data.quota_bytes``.
+
+    Raises:
+        QuotaExceededError: If the user is over quota
+    """
+    quota = get_config('shared_data', {}).get('quota_bytes')
+    if quota is None:
+        return
+    try:
+        used = get_storage_usage(user_id)
+    except Exception as e:
+        # Accounting is best effort; an unreadable total allows the write
+        logger.error("Failed to read storage usage for user=%s: %s",
+                     user_id, str(e))
+        return
+    if used >= quota:
+        logger.warning("Shared data quota exceeded: user=%s, %d/%d bytes",
+                       user_id, used, quota)
+        raise QuotaExceededError(
+            f'Shared data quota of {quota} bytes exceeded'
+        )
+
+
+def _record_usage(replaced: List[Tuple[Optional[Dict[str, Any]],
+                                       Dict[str, Any]]]) -> None:
+    """Apply the counter changes of ``(old, new)`` item replacements."""
+    per_user: Dict[str, Dict[str, int]] = {}
+    for old, new in replaced:
+        deltas = per_user.setdefault(new['key'].split(':', 1)[0], {})
+        for name, delta in item_deltas(old, new).items():
+            deltas[name] = deltas.get(name, 0) + delta
+    usage = _usage_store()
+    for user_id, deltas in per_user.items():
+        deltas = {name: delta for name, delta in deltas.items() if delta}
+        if not deltas:
+            continue
+        try:
+            _cache_usage(user_id, usage.add(user_id, deltas))
+        except Exception as e:
+            logger.error("Failed to record storage usage for user=%s: %s",
+                         user_id, str(e))
+
+
+def _item_text(item: Dict[str, Any]) -> str:
+    """Return the JSON text of a SharedData item's value."""
+    if 'value_ref' in item:
+        return decode(claim_check.fetch(json.loads(item['value_ref'])))
+    return decode(item['value'])
+
+
 def store_shared_data(key: str, value: Dict[str, Any], user_id: str) -> None:
     """Store data in DynamoDB with user-specific key.
+
+    The value is written through to the shared data cache. The write
+    always reaches DynamoDB: the cache may be behind writes from other
+    containers, so it cannot tell an unchanged value. Inside a
+    write_behind() scope the write is deferred to the end of the scope,
+    and repeated writes to a key within the scope coalesce into one.
     
     Args:
         key: The key under which to store the data
@@ -21,43 +239,493 @@ def store_shared_data(key: str, value: Dict[str, Any], user_id: str) -> None:
         user_id: ID of the user the data belongs to
         
     Raises:
+        QuotaExceededError: If the user is over their storage quota
         Exception: If there's an error storing the data
     """
+    item_key = f'{user_id}:{key}'
+    encoded = to_json(value)
+    scope = _write_behind.get()
+    if scope is not None:
+        scope.add(item_key, encoded)
+        return
+    cache_settings = _cache_settings()
+    cache = get_shared_data_cache()
+    tracking = _tracking()
+    if tracking:
+        _check_quota(user_id)
     try:
-        table = dynamodb.Table('SharedData')
-        table.put_item(Item={
-            'key': f'{user_id}:{key}',
-            'value': json.dumps(value),
-            'timestamp': datetime.now(timezone.utc).isoformat(),
-        })
+        table = _resource().Table('SharedData')
+        item = _to_item(
+            item_key, encoded, datetime.now(timezone.utc).isoformat()
+        )
+        with span('shared_data.write'):
+            if tracking:
+                response = table.put_item(Item=item, ReturnValues='ALL_OLD')
+            else:
+                response = table.put_item(Item=item)
         logger.info("Stored data: key=%s, user=%s", key, user_id)
     except Exception as e:
+        # The item may or may not have been written, so forget it
+        cache.delete(item_key)
         logger.error("Failed to store data: %s", str(e))
         raise
+    if tracking:
+        _record_usage([(response.get('Attributes'), item)])
+    if cache_settings['enabled']:
+        cache.set(item_key, encoded, cache_settings['ttl'], len(encoded))
 
 
-def get_shared_data(key: str, user_id: str) -> Dict[str, Any]:
-    """Retrieve data from DynamoDB.
+def get_shared_data(key: str, user_id: str,
+                    bypass_cache: bool = False) -> Dict[str, Any]:
+    """Retrieve data, from the shared data cache when fresh, else DynamoDB.
     
     Args:
         key: The key of the data to retrieve
         user_id: ID of the user the data belongs to
+        bypass_cache: Read from DynamoDB even on a cache hit, refreshing
+            the cached entry
         
     Returns:
         The retrieved data or an empty dict if not found
     """
+    item_key = f'{user_id}:{key}'
+    scope = _write_behind.get()
+    buffered = scope.lookup(item_key) if scope is not None else None
+    if buffered is not None:
+        return json.loads(buffered)
+    cache_settings = _cache_settings()
+    cache = get_shared_data_cache()
+    if cache_settings['enabled'] and not bypass_cache:
+        encoded = cache.get(item_key)
+        if encoded is not MISS:
+            return json.loads(encoded)
     try:
-        table = dynamodb.Table('SharedData')
-        response = table.get_item(Key={'key': f'{user_id}:{key}'})
-        if 'Item' in response:
-            return json.loads(response['Item']['value'])
+        table = _resource().Table('SharedData')
+        with span('shared_data.read'):
+            response = table.get_item(Key={'key': item_key})
+        if 'Item' in response and not _expired(response['Item']):
+            encoded = _item_text(response['Item'])
+            value = json.loads(encoded)
+            if cache_settings['enabled']:
+                cache.set(item_key, encoded, cache_settings['ttl'],
+                          len(encoded))
+            return value
+        cache.delete(item_key)
         return {}
     except Exception as e:
         logger.error("Failed to retrieve data for key=%s, user=%s: %s", key, user_id, str(e))
         return {}
 
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _backoff(attempt: int) -> None:
+    time.sleep(BATCH_RETRY_DELAY * 2 ** attempt)
+
+
+def store_many(values: Dict[str, Dict[str, Any]], user_id: str) -> None:
+    """Store several keys with BatchWriteItem, like store_shared_data.
+
+    Keys are written in chunks of 25. Items DynamoDB leaves unprocessed
+    are retried with exponential backoff.
+
+    Args:
+        values: Data to store by key (each must be JSON-serializable)
+        user_id: ID of the user the data belongs to
+
+    Raises:
+        Exception: If items could not be stored
+    """
+    encoded = {
+        f'{user_id}:{key}': to_json(value) for key, value in values.items()
+    }
+    scope = _write_behind.get()
+    if scope is not None:
+        for item_key, text in encoded.items():
+            scope.add(item_key, text)
+        return
+    _write_items(encoded)
+
+
+def _write_items(texts: Dict[str, str]) -> int:
+    """Write JSON texts by item key in batches.
+
+    Returns:
+        Number of items written
+
+    Raises:
+        QuotaExceededError: If a user is over their storage quota
+        Exception: If items could not be stored
+    """
+    cache_settings = _cache_settings()
+    cache = get_shared_data_cache()
+    timestamp = datetime.now(timezone.utc).isoformat()
+    encoded = texts
+    if not encoded:
+        return 0
+    tracking = _tracking()
+    old_items: Optional[Dict[str, Dict[str, Any]]] = None
+    if tracking:
+        for user_id in {item_key.split(':', 1)[0] for item_key in encoded}:
+            _check_quota(user_id)
+        try:
+            # BatchWriteItem cannot return the items it replaces
+            old_items = {
+                item['key']: item for item in _batch_get(
+                    list(encoded), '#k, #s, expires_at',
+                    {'#k': 'key', '#s': 'size'}
+                )
+            }
+        except Exception as e:
+            logger.error("Failed to read replaced items for accounting: %s",
+                         str(e))
+    items = {}
+    try:
+        with span('shared_data.write_many', items=len(encoded)):
+            for chunk in _chunks(list(encoded), BATCH_WRITE_LIMIT):
+                requests = []
+                for item_key in chunk:
+                    items[item_key] = _to_item(
+                        item_key, encoded[item_key], timestamp
+                    )
+                    requests.append({'PutRequest': {'Item': items[item_key]}})
+                for attempt in range(BATCH_MAX_ATTEMPTS):
+                    response = _resource().batch_write_item(
+                        RequestItems={'SharedData': requests}
+                    )
+                    requests = response.get('UnprocessedItems', {}).get(
+                        'SharedData', []
+                    )
+                    if not requests:
+                        break
+                    _backoff(attempt)
+                else:
+                    raise RuntimeError(
+                        f'{len(requests)} items left unprocessed'
+                    )
+        logger.info("Stored %d shared data keys", len(encoded))
+    except Exception as e:
+        for item_key in encoded:
+            cache.delete(item_key)
+        logger.error("Failed to store data: %s", str(e))
+        raise
+    if old_items is not None:
+        _record_usage([(old_items.get(item_key), item)
+                       for item_key, item in items.items()])
+    if cache_settings['enabled']:
+        for item_key, text in encoded.items():
+            cache.set(item_key, text, cache_settings['ttl'], len(text))
+    return len(encoded)
+
+
+def _batch_get(item_keys: List[str], projection: Optional[str] = None,
+               names: Optional[Dict[str, str]] = None
+               ) -> List[Dict[str, Any]]:
+    """Read items with BatchGetItem in chunks of 100, retrying keys left
+    unprocessed with exponential backoff.
+
+    Args:
+        item_keys: Full item keys, with the user prefix
+        projection: Optional ProjectionExpression
+        names: ExpressionAttributeNames used by the projection
+
+    Returns:
+        The items found, in no particular order
+    """
+    found = []
+    for chunk in _chunks(item_keys, BATCH_GET_LIMIT):
+        request: Dict[str, Any] = {'Keys': [{'key': k} for k in chunk]}
+        if projection:
+            request['ProjectionExpression'] = projection
+            request['ExpressionAttributeNames'] = names or {}
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            response = _resource().batch_get_item(
+                RequestItems={'SharedData': request}
+            )
+            found.extend(response.get('Responses', {}).get('SharedData', []))
+            request = response.get('UnprocessedKeys', {}).get('SharedData')
+            if not request:
+                break
+            _backoff(attempt)
+        else:
+            logger.error("%d shared data keys left unprocessed",
+                         len(request['Keys']))
+    return found
+
+
+def get_many(keys: Iterable[str], user_id: str,
+             bypass_cache: bool = False) -> Dict[str, Dict[str, Any]]:
+    """Retrieve several keys with BatchGetItem, like get_shared_data.
+
+    Buffered and cached keys are served locally. The rest are read in
+    chunks of 100, retrying keys DynamoDB leaves unprocessed with
+    exponential backoff.
+
+    Args:
+        keys: Keys of the data to retrieve
+        user_id: ID of the user the data belongs to
+        bypass_cache: Read every key from DynamoDB, refreshing the cache
+
+    Returns:
+        The retrieved data by key, with an empty dict for keys not found
+    """
+    cache_settings = _cache_settings()
+    cache = get_shared_data_cache()
+    scope = _write_behind.get()
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for key in dict.fromkeys(keys):
+        item_key = f'{user_id}:{key}'
+        encoded = MISS
+        buffered = scope.lookup(item_key) if scope is not None else None
+        if buffered is not None:
+            encoded = buffered
+        elif cache_settings['enabled'] and not bypass_cache:
+            encoded = cache.get(item_key)
+        if encoded is MISS:
+            missing.append(key)
+        else:
+            found[key] = json.loads(encoded)
+    if not missing:
+        return found
+
+    prefix = f'{user_id}:'
+    try:
+        with span('shared_data.read_many', items=len(missing)):
+            items = _batch_get([prefix + key for key in missing])
+        for item in items:
+            if _expired(item):
+                continue
+            encoded = _item_text(item)
+            found[item['key'][len(prefix):]] = json.loads(encoded)
+            if cache_settings['enabled']:
+                cache.set(item['key'], encoded, cache_settings['ttl'],
+                          len(encoded))
+    except Exception as e:
+        logger.error("Failed to retrieve %d keys for user=%s: %s",
+                     len(missing), user_id, str(e))
+    for key in missing:
+        found.setdefault(key, {})
+    return found
+
+
+class WriteBehind:
+    """Scope deferring shared-data writes until it exits.
+
+    Use write_behind() to open one. Writes to the same key coalesce, and on
+    exit the remaining values are written with BatchWriteItem before
+    control returns, so data is durable by the time a response is sent.
+    Reads inside the scope see its buffered values. A nested scope flushes
+    on its own exit and takes its keys out of the enclosing scopes, so an
+    older value is never written over a newer one.
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.enabled = enabled
+        self.parent: Optional[WriteBehind] = None
+        self.pending: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._token = None
+
+    def add(self, item_key: str, text: str) -> None:
+        with self._lock:
+            self.pending[item_key] = text
+
+    def lookup(self, item_key: str) -> Optional[str]:
+        """Buffered JSON text for an item key, in this or an outer scope."""
+        scope = self
+        while scope is not None:
+            with scope._lock:
+                text = scope.pending.get(item_key)
+            if text is not None:
+                return text
+            scope = scope.parent
+        return None
+
+    def flush(self) -> int:
+        """Write the buffered values.
+
+        Returns:
+            Number of items written
+
+        Raises:
+            Exception: If the values could not be stored
+        """
+        with self._lock:
+            pending, self.pending = self.pending, {}
+        if not pending:
+            return 0
+        scope = self.parent
+        while scope is not None:
+            with scope._lock:
+                for item_key in pending:
+                    scope.pending.pop(item_key, None)
+            scope = scope.parent
+        return _write_items(pending)
+
+    def __enter__(self) -> 'WriteBehind':
+        if self.enabled:
+            self.parent = _write_behind.get()
+            self._token = _write_behind.set(self)
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if not self.enabled:
+            return
+        _write_behind.reset(self._token)
+        # Flushed on errors too: writes made before the error stand, as
+        # they would without the buffer
+        self.flush()
+
+    async def __aenter__(self) -> 'WriteBehind':
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        if not self.enabled:
+            return
+        _write_behind.reset(self._token)
+        await asyncio.get_running_loop().run_in_executor(None, self.flush)
+
+
+def write_behind(enabled: Optional[bool] = None) -> WriteBehind:
+    """Open a write-behind scope for shared-data writes.
+
+    Usable with ``with`` and ``async with``. The async form flushes in a
+    worker thread so it does not block the event loop.
+
+    Args:
+        enabled: Whether to buffer writes; defaults to the
+            ``shared_data.write_behind`` config setting, so scopes are
+            opt-in and do nothing unless it is on
+    """
+    if enabled is None:
+        enabled = get_config('shared_data', {}).get('write_behind', False)
+    return WriteBehind(enabled)
+
+
+def flush_write_behind() -> int:
+    """Write the values buffered by the open write-behind scopes now, for
+    readers that cannot see them, such as other threads.
+
+    Returns:
+        Number of items written
+
+    Raises:
+        Exception: If the values could not be stored
+    """
+    written = 0
+    scope = _write_behind.get()
+    while scope is not None:
+        written += scope.flush()
+        scope = scope.parent
+    return written
+
+
+def get_message_buffer() -> MessageBuffer:
+    """Get or create the process-wide outbound message buffer from
+    config."""
+    global _message_buffer
+    if _message_buffer is None:
+        settings = get_config('outbound_messages', {})
+        _message_buffer = MessageBuffer(
+            _send_batch,
+            settings.get('max_batch', DEFAULT_MAX_BATCH),
+            settings.get('max_batch_bytes', DEFAULT_MAX_BATCH_BYTES),
+            settings.get('flush_interval_seconds', DEFAULT_FLUSH_INTERVAL),
+        )
+    return _message_buffer
+
+
+def flush_messages() -> int:
+    """Send any buffered outbound messages now.
+
+    Returns:
+        Number of messages sent
+
+    Raises:
+        Exception: If messages could not be sent; they stay buffered
+    """
+    if _message_buffer is None:
+        return 0
+    return _message_buffer.flush()
+
+
+def _message_batches(messages: List[Message]) -> Iterable[List[Message]]:
+    """Split messages into SendMessageBatch calls: one queue, at most 10
+    messages and 256 KiB per call."""
+    by_queue: Dict[str, List[Message]] = {}
+    for message in messages:
+        by_queue.setdefault(message[0], []).append(message)
+    for queued in by_queue.values():
+        batch: List[Message] = []
+        size = 0
+        for message in queued:
+            length = len(message[1].encode())
+            if batch and (len(batch) >= DEFAULT_MAX_BATCH
+                          or size + length > DEFAULT_MAX_BATCH_BYTES):
+                yield batch
+                batch, size = [], 0
+            batch.append(message)
+            size += length
+        if batch:
+            yield batch
+
+
+def _send_batch(messages: List[Message]) -> None:
+    """Send messages with SendMessageBatch.
+
+    Entries SQS fails on its side are retried with exponential backoff.
+    Entries it rejects as the sender's fault cannot succeed and are
+    dropped with an error log.
+
+    Raises:
+        SendError: If entries failed, with those still worth retrying
+    """
+    unsent: List[Message] = []
+    rejected = 0
+    for batch in _message_batches(messages):
+        pending = dict(enumerate(batch))
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                _backoff(attempt - 1)
+            with span('sqs.send_batch', messages=len(pending)):
+                response = sqs.send_message_batch(
+                    QueueUrl=batch[0][0],
+                    Entries=[{'Id': str(i), 'MessageBody': message[1]}
+                             for i, message in pending.items()],
+                )
+            failed = response.get('Failed', [])
+            for entry in failed:
+                if entry.get('SenderFault'):
+                    rejected += 1
+                    logger.error("SQS rejected message %s: %s",
+                                 pending[int(entry['Id'])][1],
+                                 entry.get('Message', entry.get('Code')))
+            pending = {int(entry['Id']): pending[int(entry['Id'])]
+                       for entry in failed if not entry.get('SenderFault')}
+            if not pending:
+                break
+        unsent.extend(pending.values())
+    if unsent or rejected:
+        raise SendError(
+            f'{len(unsent)} messages failed and {rejected} were rejected',
+            unsent
+        )
+    logger.info("Sent %d messages to SQS", len(messages))
+
+
 def send_message(message: Dict[str, Any]) -> None:
     """Send message to SQS queue.
+
+    Messages over the claim-check threshold are offloaded, and the queue
+    carries a pointer along with the message's routing fields.
+
+    Unless ``outbound_messages.buffered`` is off, the message is queued
+    and sent with others in one SendMessageBatch call; see message_buffer.
+    Call flush_messages() before the process may be frozen or exit.
     
     Args:
         message: The message to send (must be JSON-serializable)
@@ -71,10 +739,20 @@ def send_message(message: Dict[str, Any]) -> None:
         if not queue_url:
             raise ValueError("SQS queue URL not set in config")
             
-        sqs.send_message(
-            QueueUrl=queue_url,
-            MessageBody=json.dumps(message)
-        )
+        body = json.dumps(message)
+        if len(body.encode()) > claim_check.threshold('message'):
+            pointer = claim_check.offload(body.encode(), 'messages')
+            body = json.dumps({
+                claim_check.POINTER_KEY: pointer,
+                **{k: message[k] for k in ('target_agent', 'user_id')
+                   if k in message},
+            })
+        if get_config('outbound_messages', {}).get('buffered', True):
+            get_message_buffer().add(queue_url, body)
+            logger.info("Queued message for SQS: %s", message)
+            return
+        with span('sqs.send'):
+            sqs.send_message(QueueUrl=queue_url, MessageBody=body)
         logger.info("Sent message to SQS: %s", message)
     except Exception as e:
         logger.error("Failed to send message: %s", str(e))
@@ -0,0 +1,254 @@
+"""Response caching for read-only agent tasks.
+
+Agents declare which of their tasks are cacheable with a module-level
+``CACHEABLE_TASKS`` mapping of task name to ``cacheable(ttl, key)``. The
+dispatcher serves those tasks from an in-process LRU tier, bounded by the
+total size of the cached responses, backed by an optional shared tier in
+DynamoDB or a local SQLite file.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.utils.config_manager import get_config
+from src.utils.logging_config import logger
+
+# Defaults for the "response_cache" config section
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DEFAULT_SQLITE_PATH = '/tmp/response_cache.db'
+DEFAULT_DYNAMODB_TABLE = 'ResponseCache'
+
+# Returned by cache lookups that find nothing, since None is a valid value
+MISS = object()
+
+
+def cacheable(ttl: int,
+              key: Optional[Callable[[Dict[str, Any], str], str]] = None
+              ) -> Dict[str, Any]:
+    """Declare a task as cacheable.
+
+    Args:
+        ttl: Seconds a cached response stays fresh
+        key: Optional ``key(data, user_id)`` returning the cache key; by
+            default the key covers the whole payload and the user
+
+    Returns:
+        Cache policy for use in an agent's ``CACHEABLE_TASKS``
+    """
+    return {'ttl': ttl, 'key': key}
+
+
+def shared_across_users(data: Dict[str, Any], user_id: str) -> str:
+    """Cache key for responses that do not depend on the user."""
+    return json.dumps(data, sort_keys=True, default=str)
+
+
+def cache_key(action: str, data: Dict[str, Any], user_id: str,
+              policy: Dict[str, Any]) -> str:
+    """Build the cache key for a request under a cache policy.
+
+    The key is a digest, so credentials in the payload never reach the cache.
+    """
+    if policy.get('key'):
+        raw = policy['key'](data, user_id)
+    else:
+        raw = json.dumps([data, user_id], sort_keys=True, default=str)
+    digest = hashlib.sha256(raw.encode()).hexdigest()
+    return f'{action}:{data.get("task")}:{digest}'
+
+
+def is_cacheable_result(result: Any) -> bool:
+    """Errors are never cached."""
+    return not (isinstance(result, dict) and (
+        'error' in result or result.get('status') == 'error'
+    ))
+
+
+class LRUCache:
+    """Thread-safe LRU cache with per-entry TTLs and a total size bound."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        """Return the fresh value for a key, or MISS."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS
+            value, expires_at, size = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.size -= size
+                return MISS
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: float, size: int) -> None:
+        """Store a value, evicting least recently used entries to fit.
+
+        Args:
+            key: Cache key
+            value: Value to store
+            ttl: Seconds until the entry expires
+            size: Size charged against max_bytes for this entry
+        """
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, time.time() + ttl, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.size -= evicted
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old[2]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheTier:
+    """Shared cache tier in a local SQLite file, for local and dev setups."""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH) -> None:
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS response_cache ('
+            'key TEXT PRIMARY KEY, value TEXT, expires_at REAL)'
+        )
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return the encoded value and its expiry time, if still fresh."""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT value, expires_at FROM response_cache '
+                'WHERE key = ? AND expires_at > ?',
+                (key, time.time())
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO response_cache VALUES (?, ?, ?)',
+                (key, value, time.time() + ttl)
+            )
+
+
+class DynamoDBCacheTier:
+    """Shared cache tier in a DynamoDB table with a TTL attribute.
+
+    The table is keyed by ``key`` and should have DynamoDB TTL enabled on
+    ``expires_at``; reads also check it, since TTL deletion is lazy.
+    """
+
+    def __init__(self, table_name: str = DEFAULT_DYNAMODB_TABLE) -> None:
+        from src.utils.aws_clients import dynamodb
+        self._table = dynamodb.Table(table_name)
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Return the encoded value and its expiry time, if still fresh."""
+        item = self._table.get_item(Key={'key': key}).get('Item')
+        if not item or float(item['expires_at']) <= time.time():
+            return None
+        return item['value'], float(item['expires_at'])
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._table.put_item(Item={
+            'key': key,
+            'value': value,
+            'expires_at': int(time.time() + ttl),
+        })
+
+
+class ResponseCache:
+    """Two-tier response cache storing JSON-encoded responses.
+
+    Responses are held as JSON text so that every hit returns a fresh copy
+    and entries are charged their encoded size against the memory bound.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES,
+                 shared: Optional[Any] = None) -> None:
+        self.local = LRUCache(max_bytes)
+        self.shared = shared
+
+    def get_local(self, key: str) -> Any:
+        """Look a key up in the in-process tier only."""
+        encoded = self.local.get(key)
+        return MISS if encoded is MISS else json.loads(encoded)
+
+    def get(self, key: str) -> Any:
+        """Look a key up in both tiers, promoting shared hits to local."""
+        value = self.get_local(key)
+        if value is not MISS or self.shared is None:
+            return value
+        try:
+            found = self.shared.get(key)
+        except Exception as e:
+            logger.error("Shared cache read failed for %s: %s", key, str(e))
+            return MISS
+        if found is None:
+            return MISS
+        encoded, expires_at = found
+        self.local.set(key, encoded, expires_at - time.time(), len(encoded))
+        return json.loads(encoded)
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        """Store a response in both tiers."""
+        encoded = json.dumps(value, default=str)
+        self.local.set(key, encoded, ttl, len(encoded))
+        if self.shared is None:
+            return
+        try:
+            self.shared.set(key, encoded, ttl)
+        except Exception as e:
+            logger.error("Shared cache write failed for %s: %s", key, str(e))
+
+
+_response_cache = None
+
+
+def get_response_cache() -> ResponseCache:
+    """Get or create the process-wide response cache from config."""
+    global _response_cache
+    if _response_cache is None:
+        settings = get_config('response_cache', {})
+        tier = settings.get('shared_tier')
+        shared = None
+        if tier == 'sqlite':
+            shared = SQLiteCacheTier(
+                settings.get('sqlite_path', DEFAULT_SQLITE_PATH)
+            )
+        elif tier == 'dynamodb':
+            shared = DynamoDBCacheTier(
+                settings.get('dynamodb_table', DEFAULT_DYNAMODB_TABLE)
+            )
+        _response_cache = ResponseCache(
+            settings.get('max_bytes', DEFAULT_MAX_BYTES), shared
+        )
+    return _response_cache
@@ -0,0 +1,148 @@
+"""Claim-check offload for payloads too large to send or store inline.
+
+DynamoDB items are limited to 400 KB and SQS messages to 256 KB. A
+SharedData value or SQS message over its ``claim_check`` threshold is
+written to an object store instead. Only a small pointer travels inline,
+and readers fetch the payload when they actually read the value or handle
+the message.
+
+Objects are content-addressed by SHA-256, so storing the same payload twice
+writes one object. Objects are never deleted here; expire them with a
+bucket lifecycle rule on ``claim_check.prefix``.
+
+The ``store`` setting picks where payloads go:
+
+* ``s3``: the ``claim_check.bucket`` S3 bucket, for deployments
+* ``local``: files under ``claim_check.local_path``, for local and dev
+  setups where every reader shares a disk
+
+It defaults to ``local`` with the SQLite shared-data backend and to ``s3``
+otherwise. The local store is refused with the DynamoDB backend: other
+containers could not read its files, and the data would be lost.
+"""
+
+import hashlib
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+import boto3
+
+from src.config_manager import get_config
+from src.utils.logging_config import logger
+from src.utils.tracing import span
+
+# Marks a pointer in place of an offloaded payload
+POINTER_KEY = '_claim_check'
+
+# Defaults for the "claim_check" config section; the thresholds leave room
+# under the DynamoDB item and SQS message limits for the rest of the item
+DEFAULT_PREFIX = 'claim-check/'
+DEFAULT_LOCAL_PATH = '/tmp/claim_check'
+DEFAULT_SHARED_DATA_THRESHOLD = 350 * 1024
+DEFAULT_MESSAGE_THRESHOLD = 240 * 1024
+
+_s3_client = None
+
+
+def _s3():
+    global _s3_client
+    if _s3_client is None:
+        _s3_client = boto3.client('s3', region_name='us-east-1')
+    return _s3_client
+
+
+def threshold(kind: str) -> int:
+    """Inline size limit in bytes for ``shared_data`` or ``message``."""
+    settings = get_config('claim_check', {})
+    if kind == 'message':
+        return settings.get('message_threshold_bytes',
+                            DEFAULT_MESSAGE_THRESHOLD)
+    return settings.get('shared_data_threshold_bytes',
+                        DEFAULT_SHARED_DATA_THRESHOLD)
+
+
+def _store(settings: Dict[str, Any]) -> str:
+    backend = get_config('shared_data', {}).get('backend', 'dynamodb')
+    store = settings.get('store') or (
+        'local' if backend == 'sqlite' else 's3'
+    )
+    if store == 'local' and backend != 'sqlite':
+        raise ValueError(
+            'claim_check.store local needs the sqlite shared_data backend'
+        )
+    return store
+
+
+def offload(data: bytes, namespace: str) -> Dict[str, Any]:
+    """Write a payload to the configured store.
+
+    Args:
+        data: Payload bytes
+        namespace: Folder for the object, such as ``shared_data``
+
+    Returns:
+        Pointer to pass to fetch()
+
+    Raises:
+        ValueError: If the S3 store has no bucket configured, or the local
+            store is used with the DynamoDB backend
+        Exception: If the payload could not be written
+    """
+    settings = get_config('claim_check', {})
+    store = _store(settings)
+    sha256 = hashlib.sha256(data).hexdigest()
+    name = f"{settings.get('prefix', DEFAULT_PREFIX)}{namespace}/{sha256}"
+    with span('claim_check.put', store=store, bytes=len(data)):
+        if store == 's3':
+            bucket = settings.get('bucket')
+            if not bucket:
+                raise ValueError('claim_check.bucket is not set')
+            _s3().put_object(Bucket=bucket, Key=name, Body=data)
+            location = f's3://{bucket}/{name}'
+        else:
+            location = os.path.join(
+                settings.get('local_path', DEFAULT_LOCAL_PATH), name
+            )
+            _write_file(location, data)
+    logger.info("Offloaded %d bytes to %s", len(data), location)
+    return {'location': location, 'size': len(data), 'sha256': sha256}
+
+
+def _write_file(path: str, data: bytes) -> None:
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Write then rename, so readers never see a partial object
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def fetch(pointer: Dict[str, Any]) -> bytes:
+    """Read the payload a pointer refers to.
+
+    Raises:
+        ValueError: If the payload does not match its digest
+        Exception: If the payload could not be read
+    """
+    location = pointer['location']
+    with span('claim_check.get', bytes=pointer.get('size')):
+        if location.startswith('s3://'):
+            bucket, _, key = location[len('s3://'):].partition('/')
+            data = _s3().get_object(Bucket=bucket, Key=key)['Body'].read()
+        else:
+            with open(location, 'rb') as f:
+                data = f.read()
+    if hashlib.sha256(data).hexdigest() != pointer['sha256']:
+        raise ValueError(f'Claim-check payload at {location} is corrupt')
+    return data
+
+
+def get_pointer(message: Any) -> Optional[Dict[str, Any]]:
+    """Return the claim-check pointer of a message, if it has one."""
+    if isinstance(message, dict) and isinstance(message.get(POINTER_KEY),
+                                                dict):
+        return message[POINTER_KEY]
+    return None
@@ -1,15 +1,38 @@
-"""Handles database connections and operations for Supabase."""
+"""Handles database connections and operations for Supabase.
+
+The Supabase client is created on first use of ``supabase_client``, so
+importing this module does not load the supabase package.
+"""
 
 import os
-from supabase import create_client, Client
-import json
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
 
 from src.config_manager import get_config
+from src.utils.audit_buffer import (
+    AuditBuffer, DEFAULT_FLUSH_INTERVAL, DEFAULT_MAX_BATCH
+)
+from src.utils.audit_format import encode_details
+from src.utils.audit_policy import (
+    AGGREGATED, AuditAggregator, DEFAULT_AGGREGATE_WINDOW, SAMPLED,
+    get_policy, is_error, sampled
+)
+from src.utils.audit_spool import (
+    AuditSpool, DEFAULT_MAX_ATTEMPTS, DEFAULT_MAX_BACKOFF,
+    DEFAULT_REPLAY_BATCH, DEFAULT_REPLAY_INTERVAL, DEFAULT_SPOOL_PATH,
+    SpoolReplayer
+)
 from src.utils.logging_config import logger
+from src.utils.tracing import span
+
+if TYPE_CHECKING:
+    from supabase import Client
 
-def get_supabase_client() -> Optional[Client]:
+
+def get_supabase_client() -> Optional['Client']:
     """Initializes and returns the Supabase client.
 
     Returns:
@@ -19,32 +42,256 @@ def get_supabase_client() -> Optional[Client]:
     key = get_config('SUPABASE_ANON_KEY')
 
     if url and key:
+        # Imported here: supabase and its HTTP stack take a good part of a
+        # cold start
+        from supabase import create_client
         return create_client(url, key)
     
     logger.warning("Supabase credentials not found. Supabase client not initialized.")
     return None
 
-supabase_client = get_supabase_client()
+
+def __getattr__(name: str) -> Any:
+    """Create ``supabase_client`` on first access."""
+    if name == 'supabase_client':
+        client = globals()['supabase_client'] = get_supabase_client()
+        return client
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _client() -> Optional['Client']:
+    # Through the module, so the lazy attribute and test patches apply
+    return sys.modules[__name__].supabase_client
+
+
+def write_audit_rows(rows: List[Dict[str, Any]]) -> None:
+    """Insert a batch of audit rows into Supabase in one request."""
+    client = _client()
+    if not client:
+        return
+    with span('audit.write', records=len(rows)):
+        client.table('audit_logs').insert(rows).execute()
+
+
+_audit_buffer = None
+
+# Spool replayers by spool path
+_spool_replayers: Dict[str, SpoolReplayer] = {}
+
+
+def get_spool_replayer() -> Optional[SpoolReplayer]:
+    """Get or create the replayer for the configured audit spool.
+
+    Returns:
+        The replayer, or None when ``audit_log.spool_path`` is null
+    """
+    settings = get_config('audit_log', {})
+    path = settings.get('spool_path', DEFAULT_SPOOL_PATH)
+    if not path:
+        return None
+    replayer = _spool_replayers.get(path)
+    if replayer is None:
+        replayer = _spool_replayers[path] = SpoolReplayer(
+            AuditSpool(path),
+            write_audit_rows,
+            settings.get('replay_batch_size', DEFAULT_REPLAY_BATCH),
+            settings.get('replay_interval_seconds', DEFAULT_REPLAY_INTERVAL),
+            settings.get('max_backoff_seconds', DEFAULT_MAX_BACKOFF),
+            settings.get('max_replay_attempts', DEFAULT_MAX_ATTEMPTS),
+        )
+    return replayer
+
+
+def write_or_spool_audit_rows(rows: List[Dict[str, Any]]) -> None:
+    """Write a batch of audit rows, spooling them locally if that fails.
+
+    Rows also go straight to the spool while older rows are waiting there,
+    to keep them in order, and while the replayer is backing off.
+    """
+    replayer = get_spool_replayer()
+    if replayer is None:
+        write_audit_rows(rows)
+        return
+    if replayer.available() and not replayer.spool.pending():
+        try:
+            write_audit_rows(rows)
+            return
+        except Exception as e:
+            delay = replayer.record_failure()
+            logger.warning(
+                "Audit write failed, spooling %d records and retrying in "
+                "%.0fs: %s", len(rows), delay, str(e)
+            )
+    replayer.spool.append(rows)
+    replayer.start()
+
+
+def get_audit_buffer() -> AuditBuffer:
+    """Get or create the process-wide audit buffer from config."""
+    global _audit_buffer
+    if _audit_buffer is None:
+        settings = get_config('audit_log', {})
+        _audit_buffer = AuditBuffer(
+            write_or_spool_audit_rows,
+            settings.get('max_batch', DEFAULT_MAX_BATCH),
+            settings.get('flush_interval_seconds', DEFAULT_FLUSH_INTERVAL),
+        )
+    return _audit_buffer
+
+
+_audit_aggregator = None
+
+# Open audit scope for the action being dispatched, if any
+_audit_scope: ContextVar = ContextVar('audit_scope', default=None)
+
+
+def get_audit_aggregator() -> AuditAggregator:
+    """Get or create the process-wide aggregator for aggregated actions."""
+    global _audit_aggregator
+    if _audit_aggregator is None:
+        _audit_aggregator = AuditAggregator(
+            get_config('audit_log', {}).get(
+                'aggregate_window_seconds', DEFAULT_AGGREGATE_WINDOW
+            )
+        )
+    return _audit_aggregator
+
+
+def _write_record(user_id: str, action: str, details: Any,
+                  events: Optional[List[Tuple[str, Any]]] = None) -> None:
+    """Encode one audit record and queue it for writing."""
+    row = {
+        'user_id': user_id,
+        'action': action,
+        'details': encode_details(action, details, events),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+    }
+    logger.info(
+        "Audit log: user=%s, action=%s, details=%s",
+        user_id, action, row['details']
+    )
+    if not get_config('audit_log', {}).get('buffered', True):
+        write_or_spool_audit_rows([row])
+        return
+    get_audit_buffer().add(row)
+
+
+def _write_aggregates(final: bool = False) -> None:
+    """Write the aggregated counters if their window has closed, or
+    unconditionally when ``final``."""
+    if _audit_aggregator is None:
+        return
+    if not final and not _audit_aggregator.expired():
+        return
+    for user_id, action, details in _audit_aggregator.drain():
+        _write_record(user_id, action, details)
+
+
+def record_audit(user_id: str, action: str, details: Any,
+                 task: Optional[str] = None,
+                 events: Optional[List[Tuple[str, Any]]] = None) -> None:
+    """Write an audit record as the action's audit policy directs.
+
+    Args:
+        user_id: ID of the user performing the action
+        action: Audit action
+        details: Details of the action
+        task: Task used to look up the policy; read from ``details`` when
+            not given
+        events: ``(action, details)`` of records collapsed into this one
+    """
+    if task is None and isinstance(details, dict):
+        task = details.get('task')
+    policy = get_policy(action, task)
+    failed = is_error(details) or any(
+        is_error(event) for _, event in events or ()
+    )
+    if not failed and policy['mode'] == AGGREGATED:
+        if get_audit_aggregator().add(user_id, action, task):
+            _write_aggregates()
+        return
+    if not failed and policy['mode'] == SAMPLED:
+        if not sampled(policy):
+            return
+        if isinstance(details, dict):
+            details = {**details, '_sample_rate': policy['rate']}
+    _write_record(user_id, action, details, events)
+
+
+def flush_audit(final: bool = False) -> int:
+    """Write any buffered audit records now, then replay one batch of
+    spooled records.
+
+    Aggregated counters are written only once their window has closed, so
+    that counts from many invocations share one record; pass ``final`` at
+    process shutdown to write them regardless.
+
+    The replay is skipped while the replayer is backing off or another
+    thread is replaying; the background thread drains the rest, so a
+    request after an outage does not wait for the whole spool.
+
+    Args:
+        final: Whether the process is about to exit
+
+    Returns:
+        Number of buffered records flushed
+    """
+    _write_aggregates(final)
+    flushed = _audit_buffer.flush() if _audit_buffer is not None else 0
+    replayer = get_spool_replayer()
+    if replayer is not None and replayer.replay_once(blocking=False):
+        replayer.start()
+    return flushed
+
+
+@contextmanager
+def audit_scope(user_id: str, action: str,
+                task: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Collapse the audit records made while handling one action.
+
+    Records logged inside the scope, including from handler threads, are
+    collected instead of written. On exit a single record is written for
+    the action, with ``scope['result']`` as its details and the collected
+    records as ``_events``.
+
+    Yields:
+        The scope; set its ``result`` to the action's result
+    """
+    scope = {'result': None, 'events': []}
+    token = _audit_scope.set(scope)
+    try:
+        yield scope
+    except Exception as e:
+        scope['result'] = {'error': str(e)}
+        raise
+    finally:
+        _audit_scope.reset(token)
+        try:
+            record_audit(user_id, action, scope['result'] or {}, task,
+                         scope['events'])
+        except Exception as e:
+            logger.error("Failed to log audit: %s", str(e))
+
 
 def log_audit(user_id: str, action: str, details: Dict[str, Any]) -> None:
     """Log user actions to Supabase and logger.
-    
+
+    Inside an audit_scope() the record is folded into the scope's record.
+    Otherwise it is written according to the action's audit policy, with
+    details compacted per its audit schema and size caps. Records are
+    buffered and written in batches; call flush_audit() before the process
+    or invocation ends.
+
     Args:
         user_id: ID of the user performing the action
         action: Description of the action being performed
         details: Additional details about the action
     """
+    scope = _audit_scope.get()
+    if scope is not None:
+        scope['events'].append((action, details))
+        return
     try:
-        if supabase_client:
-            supabase_client.table('audit_logs').insert({
-                'user_id': user_id,
-                'action': action,
-                'details': json.dumps(details),
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-            }).execute()
-        logger.info(
-            "Audit log: user=%s, action=%s, details=%s",
-            user_id, action, details
-        )
+        record_audit(user_id, action, details)
     except Exception as e:
         logger.error("Failed to log audit: %s", str(e))
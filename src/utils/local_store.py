@@ -0,0 +1,251 @@
+"""SharedData backend in a local SQLite file, for local and dev deployments.
+
+SQLiteSharedStore implements the part of the boto3 DynamoDB API that
+aws_clients uses for the SharedData table: get_item, put_item, delete_item,
+batch_get_item and batch_write_item. aws_clients uses it in place of
+DynamoDB when ``shared_data.backend`` is ``sqlite``, so the cache, codec
+and claim-check layers behave the same in both modes.
+
+Each operation touches one indexed row. The file is in WAL mode, so readers
+never block the writer and several processes can share one store.
+
+SQLite has no TTL deletion, so sweep() deletes expired items in its place;
+start_sweeper() runs it periodically from a background thread. The store
+also keeps the per-user storage counters in its ``usage`` attribute.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional
+
+from src.utils.logging_config import logger
+
+DEFAULT_PATH = '/tmp/shared_data.db'
+
+# Item attributes stored as columns; values may be TEXT or BLOB
+COLUMNS = ('key', 'value', 'value_ref', 'timestamp', 'expires_at', 'size')
+
+
+class SQLiteSharedStore:
+    """SharedData items in a SQLite file.
+
+    It stands in for both the DynamoDB resource and its SharedData table,
+    so ``Table()`` returns the store itself.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False,
+                                     timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS shared_data ('
+            'key TEXT PRIMARY KEY, value, value_ref TEXT, timestamp TEXT, '
+            'expires_at INTEGER, size INTEGER)'
+        )
+        # Stores created before expiry and accounting lack these columns
+        existing = {row[1] for row in self._conn.execute(
+            'PRAGMA table_info(shared_data)'
+        )}
+        for column in ('expires_at', 'size'):
+            if column not in existing:
+                self._conn.execute(
+                    f'ALTER TABLE shared_data ADD COLUMN {column} INTEGER'
+                )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS shared_data_expires_at '
+            'ON shared_data (expires_at) WHERE expires_at IS NOT NULL'
+        )
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS shared_data_usage ('
+            'user_id TEXT, bucket TEXT, bytes INTEGER NOT NULL, '
+            'PRIMARY KEY (user_id, bucket))'
+        )
+        self.usage = SQLiteUsage(self)
+        self._sweeper = None
+
+    def Table(self, name: str) -> 'SQLiteSharedStore':
+        return self
+
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM shared_data WHERE key = ?",
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {name: v for name, v in zip(COLUMNS, row) if v is not None}
+
+    def _put(self, item: Dict[str, Any]) -> None:
+        self._conn.execute(
+            f"INSERT OR REPLACE INTO shared_data ({', '.join(COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in COLUMNS)})",
+            tuple(item.get(name) for name in COLUMNS)
+        )
+
+    def get_item(self, Key: Dict[str, str], **kwargs: Any) -> Dict[str, Any]:
+        with self._lock:
+            item = self._get(Key['key'])
+        return {'Item': item} if item else {}
+
+    def put_item(self, Item: Dict[str, Any], **kwargs: Any) -> Dict[str, Any]:
+        with self._lock, self._conn:
+            old = self._get(Item['key']) if kwargs.get(
+                'ReturnValues') == 'ALL_OLD' else None
+            self._put(Item)
+        return {'Attributes': old} if old else {}
+
+    def delete_item(self, Key: Dict[str, str],
+                    **kwargs: Any) -> Dict[str, Any]:
+        with self._lock, self._conn:
+            old = self._get(Key['key']) if kwargs.get(
+                'ReturnValues') == 'ALL_OLD' else None
+            self._conn.execute('DELETE FROM shared_data WHERE key = ?',
+                               (Key['key'],))
+        return {'Attributes': old} if old else {}
+
+    def batch_get_item(self, RequestItems: Dict[str, Any],
+                       **kwargs: Any) -> Dict[str, Any]:
+        responses = {}
+        with self._lock:
+            for name, request in RequestItems.items():
+                items = [self._get(key['key']) for key in request['Keys']]
+                responses[name] = [item for item in items if item]
+        return {'Responses': responses, 'UnprocessedKeys': {}}
+
+    def batch_write_item(self, RequestItems: Dict[str, Any],
+                         **kwargs: Any) -> Dict[str, Any]:
+        # One transaction for the whole batch
+        with self._lock, self._conn:
+            for requests in RequestItems.values():
+                for request in requests:
+                    if 'PutRequest' in request:
+                        self._put(request['PutRequest']['Item'])
+                    else:
+                        self._conn.execute(
+                            'DELETE FROM shared_data WHERE key = ?',
+                            (request['DeleteRequest']['Key']['key'],)
+                        )
+        return {'UnprocessedItems': {}}
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Delete expired items.
+
+        Returns:
+            Number of items deleted
+        """
+        now = time.time() if now is None else now
+        with self._lock, self._conn:
+            deleted = self._conn.execute(
+                'DELETE FROM shared_data WHERE expires_at <= ?', (now,)
+            ).rowcount
+        if deleted:
+            logger.info("Swept %d expired shared data items", deleted)
+        return deleted
+
+    def start_sweeper(self, interval: float) -> None:
+        """Sweep every ``interval`` seconds from a daemon thread."""
+        with self._lock:
+            if self._sweeper is not None and self._sweeper.is_alive():
+                return
+            self._sweeper = threading.Thread(
+                target=self._run_sweeper, args=(interval,),
+                name='shared-data-sweeper', daemon=True
+            )
+            self._sweeper.start()
+
+    def _run_sweeper(self, interval: float) -> None:
+        while True:
+            time.sleep(max(interval, 1.0))
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error("Shared data sweep failed: %s", str(e))
+
+    def import_json(self, path: str) -> int:
+        """Load the items of a legacy ``{key: value}`` JSON file.
+
+        Keys already in the store are kept. The file is renamed to
+        ``<path>.imported`` so it is only loaded once.
+
+        Returns:
+            Number of keys read from the file
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            legacy = json.load(f)
+        timestamp = datetime.now(timezone.utc).isoformat()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO shared_data (key, value, timestamp) '
+                'VALUES (?, ?, ?)',
+                [(key, json.dumps(value), timestamp)
+                 for key, value in legacy.items()]
+            )
+        os.replace(path, f'{path}.imported')
+        logger.info("Imported %d shared data keys from %s", len(legacy), path)
+        return len(legacy)
+
+
+class SQLiteUsage:
+    """Usage counters in the store's ``shared_data_usage`` table, with the
+    interface of storage_usage.DynamoDBUsage."""
+
+    def __init__(self, store: SQLiteSharedStore) -> None:
+        self._store = store
+
+    def add(self, user_id: str, deltas: Dict[str, int]) -> Dict[str, int]:
+        with self._store._lock, self._store._conn as conn:
+            conn.executemany(
+                'INSERT INTO shared_data_usage VALUES (?, ?, ?) '
+                'ON CONFLICT (user_id, bucket) '
+                'DO UPDATE SET bytes = bytes + excluded.bytes',
+                [(user_id, name, delta) for name, delta in deltas.items()]
+            )
+            return self._select(user_id)
+
+    def get(self, user_id: str) -> Dict[str, int]:
+        with self._store._lock:
+            return self._select(user_id)
+
+    def prune(self, user_id: str, names: Iterable[str]) -> None:
+        with self._store._lock, self._store._conn as conn:
+            conn.executemany(
+                'DELETE FROM shared_data_usage '
+                'WHERE user_id = ? AND bucket = ?',
+                [(user_id, name) for name in names]
+            )
+
+    def _select(self, user_id: str) -> Dict[str, int]:
+        return dict(self._store._conn.execute(
+            'SELECT bucket, bytes FROM shared_data_usage WHERE user_id = ?',
+            (user_id,)
+        ).fetchall())
+
+
+_stores: Dict[str, SQLiteSharedStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_local_store(path: str = DEFAULT_PATH,
+                    sweep_interval: Optional[float] = None
+                    ) -> SQLiteSharedStore:
+    """Get or create the store for a file, one per path per process.
+
+    Args:
+        path: SQLite file
+        sweep_interval: Seconds between sweeps of expired items; None
+            leaves sweeping to the caller
+    """
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = SQLiteSharedStore(path)
+            if sweep_interval:
+                store.start_sweeper(sweep_interval)
+        return store
@@ -7,10 +7,16 @@ that are used throughout the application.
 import json
 import logging
 import os
+from datetime import datetime, timezone
 from typing import Any, Dict, Optional
 
 from cryptography.fernet import Fernet
 
+from src.utils.config_manager import get_config
+from src.utils.local_store import (
+    DEFAULT_PATH, SQLiteSharedStore, get_local_store
+)
+
 # Configure logging
 LOG_FILE = "app.log"
 logging.basicConfig(
@@ -22,8 +28,10 @@ logging.basicConfig(
     ]
 )
 
-# Storage path for shared data
-STORAGE_PATH = "shared_data.json"
+# Local shared-data store used unless the sqlite backend is configured,
+# and the JSON file it replaced
+STORAGE_PATH = "shared_data.db"
+LEGACY_STORAGE_PATH = "shared_data.json"
 
 # Encryption key (for testing, generate a static key; in production, store securely)
 ENCRYPTION_KEY = Fernet.generate_key()
@@ -42,28 +50,45 @@ def log_audit(user: str, event_type: str, data: Dict[str, Any]) -> None:
     logging.info(log_message)
 
 
+def _store() -> SQLiteSharedStore:
+    """Open the local store, importing the legacy JSON file once.
+
+    With the ``sqlite`` shared_data backend this is the store at
+    ``shared_data.sqlite_path`` that aws_clients uses. Otherwise it is a
+    file of its own: these helpers never write to DynamoDB, where items
+    go through the aws_clients codec.
+    """
+    settings = get_config('shared_data', {})
+    if settings.get('backend', 'dynamodb') == 'sqlite':
+        store = get_local_store(settings.get('sqlite_path', DEFAULT_PATH),
+                                settings.get('sweep_interval_seconds'))
+    else:
+        store = get_local_store(STORAGE_PATH)
+    if os.path.exists(LEGACY_STORAGE_PATH):
+        store.import_json(LEGACY_STORAGE_PATH)
+    return store
+
+
 def store_shared_data(key: str, data: Dict[str, Any]) -> None:
-    """Store data in a local JSON file.
+    """Store data in the local SQLite store.
     
     Args:
         key: Data identifier
         data: Data to store (must be JSON-serializable)
     """
     try:
-        shared_data = {}
-        if os.path.exists(STORAGE_PATH):
-            with open(STORAGE_PATH, 'r', encoding='utf-8') as f:
-                shared_data = json.load(f)
-        shared_data[key] = data
-        with open(STORAGE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(shared_data, f, indent=2)
+        _store().put_item(Item={
+            'key': key,
+            'value': json.dumps(data),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        })
         logging.info("Stored data with key: %s", key)
     except Exception as e:
         logging.error("Failed to store data: %s", str(e))
 
 
 def get_shared_data(key: str) -> Optional[Dict[str, Any]]:
-    """Retrieve data from local JSON file.
+    """Retrieve data from the local SQLite store.
     
     Args:
         key: Data identifier
@@ -72,11 +97,8 @@ def get_shared_data(key: str) -> Optional[Dict[str, Any]]:
         Stored data or None if not found
     """
     try:
-        if os.path.exists(STORAGE_PATH):
-            with open(STORAGE_PATH, 'r', encoding='utf-8') as f:
-                shared_data = json.load(f)
-                return shared_data.get(key)
-        return None
+        item = _store().get_item(Key={'key': key}).get('Item')
+        return json.loads(item['value']) if item else None
     except Exception as e:
         logging.error("Failed to retrieve data: %s", str(e))
         return None
@@ -0,0 +1,159 @@
+"""In-memory buffering of outbound SQS messages.
+
+Messages are queued instead of being sent one SendMessage call at a time.
+The queue is sent with SendMessageBatch when it holds ``max_batch``
+messages (SQS allows at most 10 per call), when the next message would
+take the batch over ``max_batch_bytes``, when its oldest message has waited
+``flush_interval_seconds``, or when ``flush()`` is called. The Lambda
+handler calls flush() before each invocation returns, and the Flask backend
+calls it at shutdown.
+"""
+
+import threading
+import time
+from typing import Callable, List, Tuple
+
+from src.utils.logging_config import logger
+
+# Defaults for the "outbound_messages" config section; SQS limits a batch
+# to 10 messages and 256 KiB in total
+DEFAULT_MAX_BATCH = 10
+DEFAULT_MAX_BATCH_BYTES = 256 * 1024
+DEFAULT_FLUSH_INTERVAL = 0.2
+
+# (queue URL, message body)
+Message = Tuple[str, str]
+
+
+class SendError(Exception):
+    """Some messages of a batch could not be sent.
+
+    Args:
+        message: Description of the failure
+        unsent: The messages that were not sent
+    """
+
+    def __init__(self, message: str, unsent: List[Message]) -> None:
+        super().__init__(message)
+        self.unsent = unsent
+
+
+class MessageBuffer:
+    """Thread-safe queue of SQS messages sent in batches.
+
+    Args:
+        send_batch: Callable sending a list of messages in one request per
+            queue, raising SendError if some could not be sent
+        max_batch: Queue length that triggers an immediate flush
+        max_batch_bytes: Total body size a batch may not exceed
+        flush_interval: Seconds a message may wait before a timed flush
+    """
+
+    def __init__(self, send_batch: Callable[[List[Message]], None],
+                 max_batch: int = DEFAULT_MAX_BATCH,
+                 max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL) -> None:
+        self.send_batch = send_batch
+        self.max_batch = min(max(1, max_batch), DEFAULT_MAX_BATCH)
+        self.max_batch_bytes = max_batch_bytes
+        self.flush_interval = flush_interval
+        self._messages: List[Message] = []
+        self._bytes = 0
+        self._oldest = 0.0
+        self._lock = threading.Lock()
+        # Serializes senders so batches reach the queue in send order
+        self._send_lock = threading.Lock()
+        self._flusher = None
+
+    def add(self, queue_url: str, body: str) -> None:
+        """Queue a message, flushing when the batch is full.
+
+        A flush that fails here only logs: its messages stay queued, and
+        the next flush sends them or raises.
+        """
+        size = len(body.encode())
+        with self._lock:
+            overflow = (self._messages
+                        and self._bytes + size > self.max_batch_bytes)
+        if overflow:
+            self._try_flush()
+        with self._lock:
+            if not self._messages:
+                self._oldest = time.monotonic()
+            self._messages.append((queue_url, body))
+            self._bytes += size
+            full = len(self._messages) >= self.max_batch
+        if full:
+            self._try_flush()
+        # Requeued messages still need a timed flush
+        self._ensure_flusher()
+
+    def flush(self) -> int:
+        """Send every queued message.
+
+        Returns:
+            Number of messages sent
+
+        Raises:
+            Exception: If messages could not be sent. They stay queued for
+                the next flush, so a message may be sent more than once
+                but is not dropped.
+        """
+        with self._send_lock:
+            with self._lock:
+                messages, self._messages = self._messages, []
+                self._bytes = 0
+            if not messages:
+                return 0
+            try:
+                self.send_batch(messages)
+            except SendError as e:
+                self._requeue(e.unsent)
+                raise
+            except Exception:
+                self._requeue(messages)
+                raise
+            return len(messages)
+
+    def _try_flush(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Message flush failed, %d messages queued: %s",
+                         self.pending(), str(e))
+
+    def _requeue(self, messages: List[Message]) -> None:
+        with self._lock:
+            if not self._messages:
+                self._oldest = time.monotonic()
+            self._messages[:0] = messages
+            self._bytes += sum(len(body.encode()) for _, body in messages)
+
+    def pending(self) -> int:
+        """Number of messages waiting to be sent."""
+        with self._lock:
+            return len(self._messages)
+
+    def _due(self) -> bool:
+        with self._lock:
+            return bool(self._messages) and (
+                time.monotonic() - self._oldest >= self.flush_interval
+            )
+
+    def _ensure_flusher(self) -> None:
+        """Start the background thread that enforces flush_interval."""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name='message-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        while True:
+            time.sleep(max(self.flush_interval / 2, 0.01))
+            if self._due():
+                self._try_flush()
@@ -0,0 +1,115 @@
+"""Encoding of values in the SharedData table.
+
+Values are serialized as compact JSON. Below
+``shared_data_codec.threshold_bytes`` the JSON text is stored as a string
+attribute, which is also how every item written before this codec looks.
+Larger values are compressed and stored as a binary attribute with a
+three-byte header:
+
+* ``SD``: marks a codec-encoded value
+* a format version, currently 1
+* the ID of the compression codec in CODECS
+
+Readers decode both forms, so the codec and its settings can change without
+rewriting existing items. Binary values without the header are read as
+UTF-8 JSON text.
+"""
+
+import json
+import zlib
+from typing import Any, Callable, Dict, NamedTuple, Union
+
+from src.config_manager import get_config
+
+MAGIC = b'SD'
+VERSION = 1
+
+# Defaults for the "shared_data_codec" config section
+DEFAULT_COMPRESSION = 'zlib'
+DEFAULT_THRESHOLD_BYTES = 1024
+DEFAULT_LEVEL = 6
+
+
+class Codec(NamedTuple):
+    codec_id: int
+    compress: Callable[[bytes, int], bytes]
+    decompress: Callable[[bytes], bytes]
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError(
+            'zstd compression requires zstandard: pip install zstandard'
+        ) from e
+    return zstandard
+
+
+CODECS: Dict[str, Codec] = {
+    'none': Codec(0, lambda data, level: data, lambda data: data),
+    'zlib': Codec(1, lambda data, level: zlib.compress(data, level),
+                  zlib.decompress),
+    'zstd': Codec(
+        2,
+        lambda data, level: _zstd().ZstdCompressor(level=level).compress(data),
+        lambda data: _zstd().ZstdDecompressor().decompress(data),
+    ),
+}
+
+
+def register_codec(name: str, codec_id: int,
+                   compress: Callable[[bytes, int], bytes],
+                   decompress: Callable[[bytes], bytes]) -> None:
+    """Add a compression codec, selectable as ``compression: <name>``.
+
+    Raises:
+        ValueError: If the name or ID is already taken
+    """
+    if name in CODECS or any(c.codec_id == codec_id for c in CODECS.values()):
+        raise ValueError(f'Codec {name} ({codec_id}) is already registered')
+    if not 0 <= codec_id <= 255:
+        raise ValueError('Codec IDs must fit in one byte')
+    CODECS[name] = Codec(codec_id, compress, decompress)
+
+
+def to_json(value: Any) -> str:
+    """Serialize a value as compact JSON."""
+    return json.dumps(value, separators=(',', ':'))
+
+
+def encode(text: str) -> Union[str, bytes]:
+    """Encode the JSON text of a value for storage.
+
+    Returns:
+        The text itself when under the threshold, else the header followed
+        by the compressed text
+    """
+    settings = get_config('shared_data_codec', {})
+    data = text.encode()
+    if len(data) < settings.get('threshold_bytes', DEFAULT_THRESHOLD_BYTES):
+        return text
+    name = settings.get('compression', DEFAULT_COMPRESSION)
+    codec = CODECS[name]
+    payload = codec.compress(data, settings.get('level', DEFAULT_LEVEL))
+    return MAGIC + bytes([VERSION, codec.codec_id]) + payload
+
+
+def decode(stored: Any) -> str:
+    """Return the JSON text of a stored value, in either form.
+
+    Raises:
+        ValueError: If a binary value has an unknown header
+    """
+    if isinstance(stored, str):
+        return stored
+    # boto3 wraps binary attributes in a Binary object
+    data = bytes(getattr(stored, 'value', stored))
+    if data[:2] != MAGIC:
+        return data.decode()
+    if len(data) < 4 or data[2] != VERSION:
+        raise ValueError('Unknown shared data encoding')
+    for codec in CODECS.values():
+        if codec.codec_id == data[3]:
+            return codec.decompress(data[4:]).decode()
+    raise ValueError(f'Unknown shared data codec: {data[3]}')
@@ -0,0 +1,114 @@
+"""In-flight request coalescing.
+
+Concurrent callers asking for the same key share a single execution: the
+first caller runs the work and every caller that arrives while it is still
+running waits for, and receives, the same result or exception.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from src.utils.logging_config import logger
+
+
+def request_key(action: str, data: Dict[str, Any], user_id: str) -> str:
+    """Build a coalescing key from an action, its payload and the user.
+
+    Args:
+        action: Action or agent name
+        data: Request payload; key order does not affect the result
+        user_id: ID of the user making the request
+
+    Returns:
+        A hex digest identifying identical requests
+    """
+    normalized = json.dumps(
+        {'action': action, 'data': data, 'user_id': user_id},
+        sort_keys=True, separators=(',', ':'), default=str
+    )
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls that share a key.
+
+    Works across threads and event loops: followers wait on a
+    ``concurrent.futures.Future`` owned by the leader.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+
+    def _join(self, key: str) -> Tuple[Future, bool]:
+        """Return the in-flight future for a key and whether we lead it."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _finish(self, key: str, future: Future, result: Any = None,
+                error: BaseException = None) -> None:
+        with self._lock:
+            self._calls.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run ``fn`` once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument callable producing the result
+
+        Returns:
+            The result of the shared call
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logger.debug("Coalesced in-flight request: %s", key)
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    async def do_async(self, key: str,
+                       fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``fn`` once for all concurrent callers with the same key.
+
+        Args:
+            key: Coalescing key
+            fn: Zero-argument callable returning an awaitable result
+
+        Returns:
+            The result of the shared call
+        """
+        future, leader = self._join(key)
+        if not leader:
+            logger.debug("Coalesced in-flight request: %s", key)
+            return await asyncio.wrap_future(future)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result=result)
+        return result
+
+    def in_flight(self) -> int:
+        """Number of keys currently being executed."""
+        with self._lock:
+            return len(self._calls)
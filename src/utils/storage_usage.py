@@ -0,0 +1,116 @@
+"""Per-user storage accounting for the SharedData table.
+
+Each user's usage is kept as byte counters bucketed by the UTC day their
+items expire, plus one bucket for items that never expire. Writes add an
+item's size to its bucket and take the size of the item it replaced out of
+that item's bucket. A user's usage is the sum of the buckets that have not
+yet expired, so expired items stop counting without having to be found and
+deleted first. Expired buckets are pruned when usage is read.
+
+Accounting is off unless ``shared_data.track_usage`` is true, since it adds
+a read of the replaced items to every write; ``shared_data.quota_bytes`` is
+only enforced while it is on. Counters live in the ``shared_data.usage_table``
+DynamoDB table, or in the local SQLite store when that backend is used. The
+DynamoDB table has to be created before opting in::
+
+    aws dynamodb create-table --table-name SharedDataUsage \\
+        --attribute-definitions AttributeName=user_id,AttributeType=S \\
+        --key-schema AttributeName=user_id,KeyType=HASH \\
+        --billing-mode PAY_PER_REQUEST
+"""
+
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+PERMANENT = 'b_permanent'
+
+
+class QuotaExceededError(Exception):
+    """A user's shared data is over their storage quota."""
+
+
+def bucket(expires_at: Optional[float]) -> str:
+    """Counter bucket for an item expiring at a Unix time, or never."""
+    if expires_at is None:
+        return PERMANENT
+    day = datetime.fromtimestamp(float(expires_at), timezone.utc)
+    return f'b_{day:%Y%m%d}'
+
+
+def live_buckets(counters: Dict[str, Any]) -> Dict[str, int]:
+    """Buckets whose items have not all expired yet."""
+    today = bucket(datetime.now(timezone.utc).timestamp())
+    return {name: int(value) for name, value in counters.items()
+            if name == PERMANENT or name >= today}
+
+
+def item_deltas(old: Optional[Dict[str, Any]],
+                new: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    """Counter changes for replacing the ``old`` item with ``new``."""
+    deltas: Dict[str, int] = {}
+    for item, sign in ((old, -1), (new, 1)):
+        if item and 'size' in item:
+            name = bucket(item.get('expires_at'))
+            deltas[name] = deltas.get(name, 0) + sign * int(item['size'])
+    return {name: delta for name, delta in deltas.items() if delta}
+
+
+class DynamoDBUsage:
+    """Usage counters in a DynamoDB table keyed by ``user_id``."""
+
+    def __init__(self, table: Any) -> None:
+        self._table = table
+
+    def add(self, user_id: str, deltas: Dict[str, int]) -> Dict[str, int]:
+        """Apply counter changes.
+
+        Returns:
+            The user's counters after the change
+        """
+        names = {f'#b{i}': name for i, name in enumerate(deltas)}
+        values = {f':b{i}': delta for i, delta in enumerate(deltas.values())}
+        response = self._table.update_item(
+            Key={'user_id': user_id},
+            UpdateExpression='ADD ' + ', '.join(
+                f'#b{i} :b{i}' for i in range(len(deltas))
+            ),
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW',
+        )
+        return self._counters(response.get('Attributes', {}))
+
+    def get(self, user_id: str) -> Dict[str, int]:
+        item = self._table.get_item(Key={'user_id': user_id}).get('Item', {})
+        return self._counters(item)
+
+    def prune(self, user_id: str, names: Iterable[str]) -> None:
+        """Drop expired buckets."""
+        names = list(names)
+        if not names:
+            return
+        self._table.update_item(
+            Key={'user_id': user_id},
+            UpdateExpression='REMOVE ' + ', '.join(
+                f'#b{i}' for i in range(len(names))
+            ),
+            ExpressionAttributeNames={
+                f'#b{i}': name for i, name in enumerate(names)
+            },
+        )
+
+    @staticmethod
+    def _counters(item: Dict[str, Any]) -> Dict[str, int]:
+        return {name: int(value) for name, value in item.items()
+                if name.startswith('b_')}
+
+
+def total(counters: Dict[str, int]) -> int:
+    """Bytes counted against a user's quota."""
+    return sum(live_buckets(counters).values())
+
+
+def expired(counters: Dict[str, int]) -> List[str]:
+    """Names of buckets that can be pruned."""
+    live = live_buckets(counters)
+    return [name for name in counters if name not in live]
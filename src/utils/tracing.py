@@ -0,0 +1,207 @@
+"""Lightweight tracing spans and latency metrics.
+
+``span()`` times a block of code and nests under the span that is active in
+the current context, including across the thread pool used for synchronous
+handlers. Every finished span feeds a per-(span, action) latency window;
+``flush_metrics()`` emits the raw samples of each window as one ``Latency``
+metric in CloudWatch Embedded Metric Format (EMF) and resets it, so
+CloudWatch computes percentiles over every sample rather than over
+per-invocation percentiles. Individual spans can also be logged as
+structured JSON.
+"""
+
+import contextvars
+import json
+import math
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from src.utils.config_manager import get_config
+from src.utils.logging_config import logger
+
+# Defaults for the "tracing" config section
+DEFAULT_NAMESPACE = 'AIAssistant'
+
+# Samples kept per (span, action) window between flushes
+MAX_SAMPLES = 2048
+
+PERCENTILES = (50, 95, 99)
+
+# EMF accepts at most 100 distinct values per metric in one record
+MAX_EMF_VALUES = 100
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    'current_span', default=None
+)
+
+_metrics_lock = threading.Lock()
+_samples: Dict[Tuple[str, str], Deque[float]] = {}
+_counts: Dict[Tuple[str, str], int] = {}
+
+
+def current_span() -> Optional[Dict[str, Any]]:
+    """Return the span active in the current context, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Dict[str, Any]]:
+    """Time a block of code as a span nested under the current one.
+
+    Args:
+        name: Span name, such as ``dispatch`` or ``audit.write``
+        **attributes: Extra attributes; ``action`` is inherited from the
+            parent span when not given
+
+    Yields:
+        The span record, to which the block may add attributes
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        attributes.setdefault('action', parent.get('action'))
+    record = {
+        'name': name,
+        'trace_id': parent['trace_id'] if parent else uuid.uuid4().hex,
+        'span_id': uuid.uuid4().hex[:16],
+        'parent_id': parent['span_id'] if parent else None,
+        **attributes,
+    }
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+        record.setdefault('status', 'ok')
+    except BaseException as e:
+        record['status'] = 'error'
+        record['error'] = str(e)
+        raise
+    finally:
+        record['duration_ms'] = (time.perf_counter() - start) * 1000
+        _current_span.reset(token)
+        _finish(record)
+
+
+def _finish(record: Dict[str, Any]) -> None:
+    """Record a finished span's latency and optionally log it."""
+    record_latency(
+        record['name'], record.get('action'), record['duration_ms']
+    )
+    if get_config('tracing', {}).get('emit_spans', False):
+        logger.info(json.dumps({'span': record}, default=str))
+
+
+def record_latency(name: str, action: Optional[str],
+                   duration_ms: float) -> None:
+    """Add a latency sample to the window for a span name and action."""
+    key = (name, action or 'none')
+    with _metrics_lock:
+        samples = _samples.get(key)
+        if samples is None:
+            samples = _samples[key] = deque(maxlen=MAX_SAMPLES)
+        samples.append(duration_ms)
+        _counts[key] = _counts.get(key, 0) + 1
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Summarize the current latency windows without resetting them.
+
+    Returns:
+        Mapping of span name to action to count and p50/p95/p99 in ms
+    """
+    with _metrics_lock:
+        windows = {key: list(values) for key, values in _samples.items()}
+        counts = dict(_counts)
+    summary: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for (name, action), values in windows.items():
+        stats = {'count': counts[(name, action)]}
+        for pct in PERCENTILES:
+            stats[f'p{pct}'] = round(percentile(values, pct), 3)
+        summary.setdefault(name, {})[action] = stats
+    return summary
+
+
+def flush_metrics() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Emit the latency windows as EMF records and reset them.
+
+    Each window's samples are written as the ``Values`` and ``Counts`` of
+    a single ``Latency`` metric, in as many records as EMF needs.
+
+    Returns:
+        The summary of the windows, as from metrics_snapshot()
+    """
+    summary = metrics_snapshot()
+    with _metrics_lock:
+        windows = {key: list(values) for key, values in _samples.items()}
+        _samples.clear()
+        _counts.clear()
+
+    settings = get_config('tracing', {})
+    if not windows or not settings.get('emit_metrics', True):
+        return summary
+    namespace = settings.get('namespace', DEFAULT_NAMESPACE)
+    timestamp = int(time.time() * 1000)
+    for (name, action), values in windows.items():
+        histogram = sorted(Counter(round(v, 3) for v in values).items())
+        for start in range(0, len(histogram), MAX_EMF_VALUES):
+            chunk = histogram[start:start + MAX_EMF_VALUES]
+            record = {
+                '_aws': {
+                    'Timestamp': timestamp,
+                    'CloudWatchMetrics': [{
+                        'Namespace': namespace,
+                        'Dimensions': [['Span', 'Action']],
+                        'Metrics': [
+                            {'Name': 'Latency', 'Unit': 'Milliseconds'}
+                        ],
+                    }],
+                },
+                'Span': name,
+                'Action': action,
+                'Latency': {
+                    'Values': [value for value, _ in chunk],
+                    'Counts': [count for _, count in chunk],
+                },
+            }
+            # EMF records must be written as bare JSON lines to stdout
+            sys.stdout.write(json.dumps(record) + '\n')
+    sys.stdout.flush()
+    return summary
+
+
+_http_instrumented = False
+
+
+def instrument_http() -> None:
+    """Wrap ``requests`` so every outbound HTTP call is recorded as a span.
+
+    Safe to call more than once.
+    """
+    global _http_instrumented
+    if _http_instrumented:
+        return
+    import requests
+    from urllib.parse import urlsplit
+
+    send = requests.Session.send
+
+    def traced_send(session, request, **kwargs):
+        with span('http', method=request.method,
+                  host=urlsplit(request.url).netloc) as record:
+            response = send(session, request, **kwargs)
+            record['status_code'] = response.status_code
+            return response
+
+    requests.Session.send = traced_send
+    _http_instrumented = True
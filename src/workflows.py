@@ -1,35 +1,470 @@
 """Workflow execution for the AI Assistant Project.
 
-This module provides functionality to execute predefined workflows
-consisting of multiple tasks.
+Workflows are DAGs of agent steps. Each step names an agent from
+``AGENT_HANDLERS``, the params to call it with and the steps it depends on.
+Steps whose dependencies are complete run concurrently, so a workflow takes
+as long as its critical path rather than the sum of its steps.
+
+Step params may reference the workflow input as ``$input.<key>`` and the
+output of another step as ``$steps.<step_id>`` or
+``$steps.<step_id>.<key>...``. Referenced steps are added to the step's
+dependencies automatically. A param written as ``{'$join': <reference>,
+'field': <key>}`` becomes a string: the referenced list's items, or the
+``field`` of each, one per line, for agents that take text.
+
+Every run has a ``run_id`` and is checkpointed in shared data: a manifest
+with the definition and input when the run starts, and each step's output as
+soon as it completes. Near the invocation deadline no new steps are started
+and the run is returned as ``suspended``; calling again with the same
+``run_id`` resumes it without rerunning completed steps.
+
+Secret inputs such as API keys and credentials are never checkpointed. The
+manifest only records their names, and a resuming call must pass them again.
 """
-from typing import Any, Dict
+import asyncio
+import contextvars
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 
+from src.agents.agent_registry import get_async_agent_handler, to_async
+from src.utils import (
+    get_config, get_many, get_shared_data, store_shared_data, write_behind
+)
 from src.utils.database import log_audit
 
+# Seconds kept in reserve before the deadline to finish running steps
+DEFAULT_DEADLINE_MARGIN = 10
 
-def execute_workflow(data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
-    """Execute a predefined workflow of tasks.
+# Monotonic time after which a workflow stops starting new steps
+deadline: contextvars.ContextVar = contextvars.ContextVar(
+    'workflow_deadline', default=None
+)
+
+# Workflow inputs that are left out of checkpoints, by name or name suffix
+SECRET_INPUTS = {'api_key', 'api_secret', 'credentials', 'password', 'token'}
+SECRET_SUFFIXES = ('_key', '_secret', '_password', '_token', '_credentials')
+
+# Built-in workflows; entries under the "workflows" config key override these
+WORKFLOWS = {
+    'default': {'steps': []},
+    'nightly_finance': {
+        'steps': [
+            {'id': 'expenses', 'agent': 'expense_report', 'params': {}},
+            {'id': 'portfolio', 'agent': 'portfolio_agent',
+             'params': {
+                 'task': 'view_portfolio',
+                 'api_key': '$input.api_key',
+                 'api_secret': '$input.api_secret',
+             }},
+            {'id': 'summary', 'agent': 'email_agent',
+             'params': {
+                 'task': 'send',
+                 'credentials': '$input.credentials',
+                 'to': '$input.email',
+                 'subject': 'Nightly financial summary',
+                 'body': {
+                     'expenses': '$steps.expenses.result',
+                     'portfolio': '$steps.portfolio.portfolio',
+                 },
+             }},
+        ]
+    },
+    'market_watch': {
+        'steps': [
+            {'id': 'news', 'agent': 'news_agent',
+             'params': {'task': 'fetch_news'}},
+            {'id': 'm2', 'agent': 'news_agent',
+             'params': {'task': 'fetch_m2'}},
+            {'id': 'sentiment', 'agent': 'sentiment_agent',
+             'params': {'text': {'$join': '$steps.news.news',
+                                 'field': 'title'}}},
+            {'id': 'alert', 'agent': 'alert_agent',
+             'params': {
+                 'task': 'set_alert',
+                 'topic_arn': '$input.topic_arn',
+                 'message': '$steps.sentiment.result',
+             }},
+        ]
+    },
+}
+
+
+def set_deadline(seconds_remaining: float) -> None:
+    """Set the time budget for workflows run in the current context.
+
+    Args:
+        seconds_remaining: Seconds left before the invocation is cut off
+    """
+    deadline.set(time.monotonic() + seconds_remaining)
+
+
+def _out_of_time() -> bool:
+    """Tell whether the current deadline leaves no room for another step."""
+    limit = deadline.get()
+    if limit is None:
+        return False
+    margin = get_config('workflow_runner', {}).get(
+        'deadline_margin_seconds', DEFAULT_DEADLINE_MARGIN
+    )
+    return time.monotonic() >= limit - margin
+
+
+def _checkpoint_key(run_id: str, step_id: Optional[str] = None) -> str:
+    """Build the shared-data key for a run manifest or a step output."""
+    key = f'workflow_{run_id}'
+    return f'{key}_step_{step_id}' if step_id else key
+
+
+def get_workflow(name: str) -> Optional[Dict[str, Any]]:
+    """Look up a workflow definition by name.
+
+    Args:
+        name: Name of the workflow
+
+    Returns:
+        The workflow definition, or None if no workflow has that name
+    """
+    configured = get_config('workflows', {})
+    return configured.get(name) or WORKFLOWS.get(name)
+
+
+def _references(value: Any) -> List[str]:
+    """Collect the step IDs referenced anywhere inside a params value."""
+    if isinstance(value, str) and value.startswith('$steps.'):
+        return [value.split('.')[1]]
+    if isinstance(value, dict):
+        return [ref for item in value.values() for ref in _references(item)]
+    if isinstance(value, list):
+        return [ref for item in value for ref in _references(item)]
+    return []
+
+
+def resolve_params(value: Any, inputs: Dict[str, Any],
+                   outputs: Dict[str, Any]) -> Any:
+    """Substitute ``$input`` and ``$steps`` references in step params.
+
+    Args:
+        value: Params value, possibly nested, containing references
+        inputs: Workflow input data
+        outputs: Outputs of completed steps keyed by step ID
+
+    Returns:
+        The params value with every reference replaced by its target
+    """
+    if isinstance(value, dict) and '$join' in value:
+        return _join(resolve_params(value['$join'], inputs, outputs),
+                     value.get('field'), value.get('separator', '\n'))
+    if isinstance(value, dict):
+        return {
+            k: resolve_params(v, inputs, outputs) for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [resolve_params(v, inputs, outputs) for v in value]
+    if not isinstance(value, str):
+        return value
+    if value.startswith('$input.'):
+        path, target = value.split('.')[1:], inputs
+    elif value.startswith('$steps.'):
+        parts = value.split('.')
+        path, target = parts[2:], outputs.get(parts[1])
+    else:
+        return value
+    for key in path:
+        target = target.get(key) if isinstance(target, dict) else None
+    return target
+
+
+def _join(items: Any, field: Optional[str], separator: str) -> str:
+    """Join a list, or a field of each of its items, into one string."""
+    if not isinstance(items, list):
+        return '' if items is None else str(items)
+    if field:
+        items = [item.get(field) for item in items
+                 if isinstance(item, dict)]
+    return separator.join(str(item) for item in items if item is not None)
+
+
+def build_graph(steps: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Validate workflow steps and return each step's dependencies.
+
+    Args:
+        steps: Step definitions with ``id``, ``agent``, ``params`` and
+            optional ``depends_on``
+
+    Returns:
+        Mapping of step ID to the IDs of the steps it depends on
+
+    Raises:
+        ValueError: If a step is malformed, duplicated, depends on an unknown
+            step or the steps form a cycle
+    """
+    graph = {}
+    for step in steps:
+        step_id = step.get('id')
+        if not step_id or not step.get('agent'):
+            raise ValueError(f"Workflow step needs an id and agent: {step}")
+        if step_id in graph:
+            raise ValueError(f"Duplicate workflow step: {step_id}")
+        depends_on = list(step.get('depends_on', []))
+        for ref in _references(step.get('params', {})):
+            if ref not in depends_on:
+                depends_on.append(ref)
+        graph[step_id] = depends_on
+
+    for step_id, depends_on in graph.items():
+        unknown = [dep for dep in depends_on if dep not in graph]
+        if unknown:
+            raise ValueError(
+                f"Step {step_id} depends on unknown steps: {unknown}"
+            )
+
+    visiting, done = set(), set()
+
+    def visit(step_id):
+        if step_id in done:
+            return
+        if step_id in visiting:
+            raise ValueError(f"Workflow has a cycle at step: {step_id}")
+        visiting.add(step_id)
+        for dep in graph[step_id]:
+            visit(dep)
+        visiting.discard(step_id)
+        done.add(step_id)
+
+    for step_id in graph:
+        visit(step_id)
+    return graph
+
+
+def _failed(result: Any) -> bool:
+    """Tell whether an agent result reports an error."""
+    return isinstance(result, dict) and (
+        'error' in result or result.get('status') == 'error'
+    )
+
+
+async def _run_step(step: Dict[str, Any], inputs: Dict[str, Any],
+                    outputs: Dict[str, Any], user_id: str) -> Any:
+    """Run a single workflow step through its agent's async handler."""
+    handler = get_async_agent_handler(step['agent'])
+    if not handler:
+        return {'error': f"Unknown agent: {step['agent']}"}
+    params = resolve_params(step.get('params', {}), inputs, outputs)
+    # The step's shared-data writes are flushed when it completes
+    async with write_behind():
+        return await handler(params, user_id)
+
+
+async def run_workflow(
+    steps: List[Dict[str, Any]],
+    inputs: Dict[str, Any],
+    user_id: str,
+    completed: Optional[Dict[str, Any]] = None,
+    on_step_done: Optional[Callable[[str, Any], Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """Run workflow steps, overlapping every step whose inputs are ready.
+
+    Args:
+        steps: Step definitions, see build_graph()
+        inputs: Workflow input data available as ``$input`` references
+        user_id: ID of the user executing the workflow
+        completed: Outputs of steps finished by an earlier invocation; these
+            steps are not run again
+        on_step_done: Awaited with the step ID and output after each step
+            succeeds, before any dependent step starts
+
+    Returns:
+        Dictionary with the outputs of completed steps, the errors of failed
+        steps, the IDs of steps skipped because a dependency failed and the
+        IDs of steps left pending because the deadline was reached
+    """
+    graph = build_graph(steps)
+    by_id = {step['id']: step for step in steps}
+    outputs = dict(completed or {})
+    failed, skipped = {}, []
+    pending = set(graph) - set(outputs)
+    running = {}
+
+    while pending or running:
+        if _out_of_time():
+            if not running:
+                break
+            pending_ready = []
+        else:
+            pending_ready = sorted(pending)
+        for step_id in pending_ready:
+            depends_on = graph[step_id]
+            if any(dep in failed or dep in skipped for dep in depends_on):
+                pending.discard(step_id)
+                skipped.append(step_id)
+            elif all(dep in outputs for dep in depends_on):
+                pending.discard(step_id)
+                task = asyncio.ensure_future(
+                    _run_step(by_id[step_id], inputs, outputs, user_id)
+                )
+                running[task] = step_id
+        if not running:
+            # Remaining steps were skipped while scanning; rescan them
+            continue
+
+        done, _ = await asyncio.wait(
+            running, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            step_id = running.pop(task)
+            try:
+                result = task.result()
+            except Exception as e:
+                result = {'error': str(e)}
+            if _failed(result):
+                failed[step_id] = result
+                continue
+            if on_step_done:
+                await on_step_done(step_id, result)
+            outputs[step_id] = result
+
+    return {
+        'steps': outputs,
+        'failed': failed,
+        'skipped': skipped,
+        'pending': sorted(pending),
+    }
+
+
+def _is_secret(name: str) -> bool:
+    return name in SECRET_INPUTS or name.endswith(SECRET_SUFFIXES)
+
+
+async def _load_run(run_id: str, user_id: str) -> Dict[str, Any]:
+    """Load a run manifest and the outputs of its completed steps.
+
+    Step checkpoints are fetched together, so loading a run takes two
+    reads however many steps it has.
+    """
+    manifest = await to_async(get_shared_data)(_checkpoint_key(run_id),
+                                               user_id)
+    if not manifest:
+        return {}
+    keys = {
+        _checkpoint_key(run_id, step['id']): step['id']
+        for step in manifest['steps']
+    }
+    saved = await to_async(get_many)(list(keys), user_id)
+    completed = {
+        keys[key]: checkpoint['output']
+        for key, checkpoint in saved.items() if 'output' in checkpoint
+    }
+    return {**manifest, 'completed': completed}
+
+
+async def handle(data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Execute a workflow on the running event loop.
 
     Args:
-        data: Dictionary containing workflow configuration
+        data: Either ``workflow`` (or ``workflow_name``) naming a declared
+            workflow, or inline ``steps``; the rest of the data is the
+            workflow input. Passing the ``run_id`` of an earlier run resumes
+            that run from its checkpoint instead, and must pass its secret
+            inputs again.
         user_id: ID of the user executing the workflow
 
     Returns:
         Dictionary containing the execution status and results
     """
-    workflow_name = data.get('workflow_name', 'default')
-    log_audit(user_id, 'execute_workflow', {'workflow_name': workflow_name})
+    run_id = data.get('run_id')
+    saved = await _load_run(run_id, user_id) if run_id else {}
+    if saved:
+        workflow_name = saved['workflow_name']
+        steps = saved['steps']
+        missing = [name for name in saved.get('secret_inputs', [])
+                   if name not in data]
+        if missing:
+            return {
+                'status': 'error',
+                'result': f"Resuming {run_id} needs {', '.join(missing)}"
+            }
+        inputs = {**saved['inputs'],
+                  **{name: data[name] for name in saved.get(
+                      'secret_inputs', [])}}
+    else:
+        workflow_name = (
+            data.get('workflow') or data.get('workflow_name', 'default')
+        )
+        steps = data.get('steps')
+        if steps is None:
+            workflow = get_workflow(workflow_name)
+            if workflow is None:
+                return {
+                    'status': 'error',
+                    'result': f'Unknown workflow: {workflow_name}'
+                }
+            steps = workflow.get('steps', [])
+        inputs = {k: v for k, v in data.items() if k != 'steps'}
+        run_id = run_id or f'{workflow_name}_{uuid.uuid4().hex[:12]}'
+
+    async def save(key, value):
+        # Checkpoints are written right away, even inside a write-behind
+        # scope, so a crashed run can resume from them
+        async with write_behind():
+            await to_async(store_shared_data)(key, value, user_id)
 
-    # In a real implementation, this would execute a series of tasks.
-    # For now, we just return a success message.
+    async def checkpoint_step(step_id, output):
+        await save(_checkpoint_key(run_id, step_id), {'output': output})
 
+    try:
+        build_graph(steps)
+        if not saved:
+            await save(_checkpoint_key(run_id), {
+                'run_id': run_id,
+                'workflow_name': workflow_name,
+                'steps': steps,
+                'inputs': {name: value for name, value in inputs.items()
+                           if not _is_secret(name)},
+                'secret_inputs': sorted(
+                    name for name in inputs if _is_secret(name)
+                ),
+            })
+        result = await run_workflow(
+            steps, inputs, user_id,
+            completed=saved.get('completed'),
+            on_step_done=checkpoint_step,
+        )
+    except ValueError as e:
+        log_audit(user_id, 'execute_workflow',
+                  {'workflow_name': workflow_name, 'error': str(e)})
+        return {'status': 'error', 'result': str(e)}
+
+    if result['failed']:
+        status = 'error'
+    elif result['pending']:
+        status = 'suspended'
+    else:
+        status = 'success'
+    log_audit(user_id, 'execute_workflow', {
+        'workflow_name': workflow_name,
+        'run_id': run_id,
+        'resumed': bool(saved),
+        'status': status,
+        'completed': sorted(result['steps']),
+        'failed': sorted(result['failed']),
+        'skipped': result['skipped'],
+        'pending': result['pending'],
+    })
     return {
-        'status': 'success',
-        'result': {
-            'message': (
-                f'Workflow {workflow_name} executed successfully '
-                '(placeholder).'
-            )
-        }
+        'status': status,
+        'result': {'workflow_name': workflow_name, 'run_id': run_id, **result}
     }
+
+
+def execute_workflow(data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Execute a workflow of agent steps from synchronous code.
+
+    Args:
+        data: Dictionary containing workflow configuration, see handle()
+        user_id: ID of the user executing the workflow
+
+    Returns:
+        Dictionary containing the execution status and results
+    """
+    return asyncio.run(handle(data, user_id))
@@ -0,0 +1,19 @@
+CREATE TABLE IF NOT EXISTS audit_logs (
+    id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    action TEXT NOT NULL,
+    details TEXT,
+    timestamp TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Keyset pagination over one user's history, newest first
+CREATE INDEX IF NOT EXISTS audit_logs_user_timestamp_idx
+    ON audit_logs (user_id, timestamp DESC, id DESC);
+
+-- The same, filtered to one action
+CREATE INDEX IF NOT EXISTS audit_logs_user_action_timestamp_idx
+    ON audit_logs (user_id, action, timestamp DESC, id DESC);
+
+-- Time-range scans across all users, such as archiving aged rows
+CREATE INDEX IF NOT EXISTS audit_logs_timestamp_idx
+    ON audit_logs (timestamp, id);
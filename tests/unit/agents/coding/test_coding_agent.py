@@ -5,7 +5,7 @@ from src.agents.coding import coding_agent
 class TestCodingAgent(unittest.TestCase):
 
     @patch('src.agents.coding.coding_agent.time.time', return_value=12345)
-    @patch('src.agents.coding.coding_agent.send_message')
+    @patch('src.agents.coding.coding_agent.send_to_agent')
     @patch('src.agents.coding.coding_agent.store_shared_data')
     @patch('src.agents.coding.coding_agent.log_audit')
     def test_generate_rust(self, mock_log, mock_store, mock_send, mock_time):
@@ -20,7 +20,7 @@ class TestCodingAgent(unittest.TestCase):
         mock_log.assert_called()
 
     @patch('src.agents.coding.coding_agent.time.time', return_value=12345)
-    @patch('src.agents.coding.coding_agent.send_message')
+    @patch('src.agents.coding.coding_agent.send_to_agent')
     @patch('src.agents.coding.coding_agent.store_shared_data')
     @patch('src.agents.coding.coding_agent.log_audit')
     def test_generate_python(self, mock_log, mock_store, mock_send, mock_time):
@@ -35,7 +35,7 @@ class TestCodingAgent(unittest.TestCase):
         mock_log.assert_called()
 
     @patch('src.agents.coding.coding_agent.time.time', return_value=12345)
-    @patch('src.agents.coding.coding_agent.send_message')
+    @patch('src.agents.coding.coding_agent.send_to_agent')
     @patch('src.agents.coding.coding_agent.store_shared_data')
     @patch('src.agents.coding.coding_agent.log_audit')
     def test_generate_solidity(self, mock_log, mock_store, mock_send, mock_time):
@@ -0,0 +1,208 @@
+import json
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from src.lambda_handler import lambda_function
+from src.utils import tracing
+from src.utils.cache import get_response_cache
+
+
+def sqs_record(message_id, message):
+    return {'messageId': message_id, 'body': json.dumps(message)}
+
+
+class TestSqsRecordProcessing(unittest.TestCase):
+
+    @patch('src.lambda_handler.lambda_function.get_agent_module')
+    def test_all_records_succeed(self, mock_get_module):
+        """Test that a fully successful batch reports no failures."""
+        agent = MagicMock()
+        mock_get_module.return_value = agent
+        event = {'Records': [
+            sqs_record('m1', {'target_agent': 'news_agent', 'user_id': 'u1'}),
+            sqs_record('m2', {'target_agent': 'news_agent'}),
+        ]}
+
+        result = lambda_function.lambda_handler(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': []})
+        self.assertEqual(agent.handle_message.call_count, 2)
+        users = {c.args[1] for c in agent.handle_message.call_args_list}
+        self.assertEqual(users, {'u1', 'anonymous'})
+
+    @patch('src.lambda_handler.lambda_function.get_agent_module')
+    def test_failed_record_is_isolated(self, mock_get_module):
+        """Test that only the failing message is reported for retry."""
+        def handle_message(message, user_id):
+            if message['n'] == 2:
+                raise RuntimeError('upstream timeout')
+
+        mock_get_module.return_value = MagicMock(handle_message=handle_message)
+        event = {'Records': [
+            sqs_record(f'm{n}', {'target_agent': 'voice_agent', 'n': n})
+            for n in range(1, 4)
+        ]}
+
+        result = lambda_function.lambda_handler(event, None)
+
+        self.assertEqual(result,
+                         {'batchItemFailures': [{'itemIdentifier': 'm2'}]})
+
+    @patch('src.lambda_handler.lambda_function.get_agent_module')
+    def test_records_run_concurrently(self, mock_get_module):
+        """Test that a slow record does not block the rest of the batch."""
+        barrier = threading.Barrier(3, timeout=5)
+        mock_get_module.return_value = MagicMock(
+            handle_message=lambda message, user_id: barrier.wait()
+        )
+        event = {'Records': [
+            sqs_record(f'm{n}', {'target_agent': 'coding_agent'})
+            for n in range(3)
+        ]}
+
+        result = lambda_function.lambda_handler(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': []})
+
+    @patch('src.lambda_handler.lambda_function.fetch')
+    @patch('src.lambda_handler.lambda_function.get_agent_module')
+    def test_claim_checked_message_is_resolved(self, mock_get_module,
+                                               mock_fetch):
+        agent = MagicMock()
+        mock_get_module.return_value = agent
+        full = {'target_agent': 'trading_agent', 'user_id': 'u1',
+                'candles': [[1, 2, 3]]}
+        mock_fetch.return_value = json.dumps(full).encode()
+        pointer = {'location': 's3://bucket/claim-check/messages/abc',
+                   'sha256': 'abc', 'size': 10}
+        event = {'Records': [sqs_record('m1', {
+            '_claim_check': pointer, 'target_agent': 'trading_agent',
+            'user_id': 'u1',
+        })]}
+
+        result = lambda_function.lambda_handler(event, None)
+
+        self.assertEqual(result, {'batchItemFailures': []})
+        mock_fetch.assert_called_once_with(pointer)
+        agent.handle_message.assert_called_once_with(full, 'u1')
+
+    @patch('src.lambda_handler.lambda_function.get_agent_module')
+    def test_error_result_is_reported(self, mock_get_module):
+        mock_get_module.return_value = MagicMock(
+            handle_message=lambda message, user_id: {'error': 'upstream'}
+        )
+        event = {'Records': [sqs_record('m1', {'target_agent': 'news_agent'})]}
+        result = lambda_function.lambda_handler(event, None)
+        self.assertEqual(result,
+                         {'batchItemFailures': [{'itemIdentifier': 'm1'}]})
+
+    @patch('src.agents.agent_registry.get_async_agent_handler')
+    @patch('src.lambda_handler.lambda_function.get_agent_module')
+    def test_message_is_not_run_as_request(self, mock_get_module,
+                                           mock_get_handler):
+        mock_get_module.return_value = object()
+        event = {'Records': [sqs_record('m1', {
+            'target_agent': 'trading_agent', 'task': 'execute_trade',
+        })]}
+        result = lambda_function.lambda_handler(event, None)
+        self.assertEqual(result,
+                         {'batchItemFailures': [{'itemIdentifier': 'm1'}]})
+        mock_get_handler.assert_not_called()
+
+    @patch('src.lambda_handler.lambda_function.log_audit')
+    @patch('src.lambda_handler.lambda_function.process_records',
+           side_effect=RuntimeError('boom'))
+    def test_unexpected_error_fails_every_record(self, mock_process,
+                                                 mock_log_audit):
+        event = {'Records': [sqs_record('m1', {}), sqs_record('m2', {})]}
+        result = lambda_function.lambda_handler(event, None)
+        self.assertEqual(result, {'batchItemFailures': [
+            {'itemIdentifier': 'm1'}, {'itemIdentifier': 'm2'}
+        ]})
+
+    @patch('src.lambda_handler.lambda_function.get_agent_module',
+           return_value=None)
+    def test_unknown_agent_is_dropped(self, mock_get_module):
+        event = {'Records': [sqs_record('m1', {'target_agent': 'nobody'})]}
+        result = lambda_function.lambda_handler(event, None)
+        self.assertEqual(result, {'batchItemFailures': []})
+
+
+class TestActionDispatch(unittest.TestCase):
+
+    def setUp(self):
+        get_response_cache().local.clear()
+
+    @patch('src.utils.database.record_audit')
+    @patch('src.agents.agent_registry.get_async_handler')
+    def test_dispatches_to_async_handler(self, mock_get_handler,
+                                         mock_record_audit):
+        async def handle(data, user_id):
+            return {'echo': data, 'user': user_id}
+
+        mock_get_handler.return_value = handle
+        event = {
+            'action': 'news',
+            'body': json.dumps({'task': 'fetch_news'}),
+            'requestContext': {'authorizer': {'claims': {'sub': 'u1'}}},
+        }
+
+        result = lambda_function.lambda_handler(event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(
+            json.loads(result['body']),
+            {'echo': {'task': 'fetch_news'}, 'user': 'u1'}
+        )
+        mock_get_handler.assert_called_once_with('news')
+        # One audit record per action, written by the dispatcher
+        mock_record_audit.assert_called_once()
+        self.assertEqual(mock_record_audit.call_args[0][:2], ('u1', 'news'))
+
+    @patch('src.lambda_handler.lambda_function.log_audit')
+    @patch('src.agents.agent_registry.get_async_handler', return_value=None)
+    def test_unknown_action(self, mock_get_handler, mock_log_audit):
+        with patch('src.lambda_handler.lambda_function.span',
+                   wraps=tracing.span) as mock_span:
+            result = lambda_function.lambda_handler({'action': 'nope'}, None)
+        self.assertEqual(json.loads(result['body']),
+                         {'error': 'Invalid action'})
+        # Unknown actions share one metric dimension value
+        mock_span.assert_called_once_with('invocation', action='other')
+
+    @patch('src.utils.database.record_audit')
+    @patch('src.agents.agent_registry.get_async_handler')
+    def test_batch_returns_one_result_per_request(self, mock_get_handler,
+                                                  mock_record_audit):
+        async def handle(data, user_id):
+            return {'task': data.get('task')}
+
+        mock_get_handler.return_value = handle
+        event = {
+            'action': 'batch',
+            'body': json.dumps({'requests': [
+                {'action': 'news', 'data': {'task': 'fetch_m2'}},
+                {'action': 'priority', 'data': {'task': 'prioritize'}},
+            ]}),
+            'requestContext': {'authorizer': {'claims': {'sub': 'u1'}}},
+        }
+
+        result = lambda_function.lambda_handler(event, None)
+
+        self.assertEqual(result['statusCode'], 200)
+        body = json.loads(result['body'])
+        self.assertEqual(
+            [entry['result'] for entry in body['results']],
+            [{'task': 'fetch_m2'}, {'task': 'prioritize'}]
+        )
+        self.assertEqual(mock_record_audit.call_count, 2)
+
+    @patch('src.lambda_handler.lambda_function.log_audit')
+    def test_malformed_batch(self, mock_log_audit):
+        event = {'action': 'batch', 'body': json.dumps({'requests': 'news'})}
+        result = lambda_function.lambda_handler(event, None)
+        self.assertEqual(result['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
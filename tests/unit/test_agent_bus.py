@@ -0,0 +1,137 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from benchmarks.fakes import offline
+from src.agents import agent_bus
+from src.agents.coding import coding_agent
+from src.utils.aws_clients import (
+    flush_messages, get_shared_data, store_shared_data, write_behind
+)
+from src.utils.database import audit_scope, flush_audit, log_audit
+
+
+def sent_bodies(services):
+    flush_messages()
+    return [json.loads(m['Body']) for m in services.sqs.messages]
+
+
+class TestAgentBus(unittest.TestCase):
+
+    @patch('src.agents.agent_bus.get_agent_module')
+    def test_colocated_agent_is_called_in_process(self, mock_get_module):
+        agent = MagicMock()
+        mock_get_module.return_value = agent
+        with offline() as services:
+            agent_bus.send_to_agent('news_agent', {'n': 1}, 'u1')
+            agent_bus.drain()
+            self.assertEqual(sent_bodies(services), [])
+
+        agent.handle_message.assert_called_once_with(
+            {'n': 1, 'target_agent': 'news_agent', 'user_id': 'u1'}, 'u1'
+        )
+
+    def test_remote_agent_goes_through_sqs(self):
+        with offline() as services:
+            agent_bus.send_to_agent('smart_contract_ai_agent', {'n': 1}, 'u1')
+            self.assertEqual(agent_bus.drain(), 0)
+            self.assertEqual(sent_bodies(services), [{
+                'n': 1, 'target_agent': 'smart_contract_ai_agent',
+                'user_id': 'u1',
+            }])
+
+    @patch('src.agents.agent_bus.get_agent_module')
+    def test_failed_delivery_falls_back_to_sqs(self, mock_get_module):
+        mock_get_module.return_value = MagicMock(
+            handle_message=MagicMock(side_effect=RuntimeError('boom'))
+        )
+        with offline() as services:
+            agent_bus.send_to_agent('news_agent', {'n': 1}, 'u1')
+            agent_bus.drain()
+            self.assertEqual(sent_bodies(services), [
+                {'n': 1, 'target_agent': 'news_agent', 'user_id': 'u1'}
+            ])
+
+    def test_local_delivery_can_be_turned_off(self):
+        with offline({'agent_bus': {'local_delivery': False}}) as services:
+            agent_bus.send_to_agent('news_agent', {'n': 1}, 'u1')
+            self.assertEqual(len(sent_bodies(services)), 1)
+
+    @patch('src.agents.agent_bus.get_agent_module')
+    def test_error_result_falls_back_to_sqs(self, mock_get_module):
+        mock_get_module.return_value = MagicMock(
+            handle_message=lambda message, user_id: {'error': 'upstream'}
+        )
+        with offline() as services:
+            agent_bus.send_to_agent('news_agent', {'n': 1}, 'u1')
+            agent_bus.drain()
+            self.assertEqual(len(sent_bodies(services)), 1)
+
+    @patch('src.agents.agent_registry.get_async_agent_handler')
+    @patch('src.agents.agent_bus.get_agent_module')
+    def test_request_handler_never_takes_messages(self, mock_get_module,
+                                                  mock_get_handler):
+        mock_get_module.return_value = object()
+        with offline() as services:
+            agent_bus.send_to_agent('trading_agent',
+                                    {'task': 'execute_trade'}, 'u1')
+            agent_bus.drain()
+            self.assertEqual(len(sent_bodies(services)), 1)
+
+        mock_get_handler.assert_not_called()
+
+    @patch('src.agents.agent_bus.get_agent_module')
+    def test_buffered_writes_are_visible_to_receiver(self, mock_get_module):
+        seen = []
+        mock_get_module.return_value = MagicMock(
+            handle_message=lambda message, user_id: seen.append(
+                get_shared_data('draft', user_id)
+            )
+        )
+        with offline():
+            with write_behind(True):
+                store_shared_data('draft', {'v': 1}, 'u1')
+                agent_bus.send_to_agent('news_agent', {}, 'u1')
+                agent_bus.drain()
+
+        self.assertEqual(seen, [{'v': 1}])
+
+    @patch('src.agents.agent_bus.get_agent_module')
+    def test_receiver_does_not_run_in_sender_scopes(self, mock_get_module):
+        def handle_message(message, user_id):
+            log_audit(user_id, 'received', {})
+            store_shared_data('reply', {'v': 2}, user_id)
+
+        mock_get_module.return_value = MagicMock(
+            handle_message=handle_message
+        )
+        config = {'shared_data': {'write_behind': True}}
+        with offline(config) as services:
+            with audit_scope('u1', 'sendit'), write_behind():
+                agent_bus.send_to_agent('news_agent', {}, 'u1')
+            agent_bus.drain()
+            flush_audit()
+            self.assertEqual(get_shared_data('reply', 'u1'), {'v': 2})
+
+        actions = [row['action']
+                   for row in services.supabase.tables['audit_logs']]
+        self.assertIn('sendit', actions)
+        self.assertIn('received', actions)
+        self.assertIn('u1:reply',
+                      services.dynamodb.tables['SharedData'].items)
+
+    def test_coding_agent_notifies_contract_agent(self):
+        with offline() as services:
+            result = coding_agent.handle_code_request(
+                {'task': 'generate_rust', 'spec': 'demo', 'task_id': 't1'},
+                'u1'
+            )
+            bodies = sent_bodies(services)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(bodies), 1)
+        self.assertEqual(bodies[0]['target_agent'], 'smart_contract_ai_agent')
+        self.assertEqual(bodies[0]['task_id'], 't1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,29 +1,43 @@
+import asyncio
+import contextvars
+import subprocess
+import tempfile
+import threading
+import time
+import types
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 import sys
 import os
-import importlib
-
-sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
-
-# Mock potentially missing modules before importing the registry
-# This allows testing the registry even if some agents are not yet created.
-mock_modules = [
-    'agents.notes_agent',
-    'agents.voice_agent',
-    'dashboard.dashboard',
-    'workflows'
-]
-for module_name in mock_modules:
-    if module_name not in sys.modules:
-        sys.modules[module_name] = MagicMock()
-
 from src.agents import agent_registry
+from src.utils import database
+from src.utils.audit_spool import AuditSpool, SpoolReplayer
+from src.utils.cache import get_response_cache
+
+
+def use_temp_spool(test):
+    """Spool failed audit writes made by a test to a temp dir."""
+    tmpdir = tempfile.TemporaryDirectory()
+    test.addCleanup(tmpdir.cleanup)
+    replayer = SpoolReplayer(
+        AuditSpool(os.path.join(tmpdir.name, 'spool.db')),
+        database.write_audit_rows
+    )
+    patcher = patch('src.utils.database.get_spool_replayer',
+                    return_value=replayer)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    # Runs first: writes the test's buffered records while patched
+    test.addCleanup(database.flush_audit)
+
 
 class TestAgentRegistry(unittest.TestCase):
 
+    def setUp(self):
+        agent_registry.resolve.cache_clear()
+
     def test_handler_registry_structure(self):
-        """Test that the HANDLER_REGISTRY is a dictionary and contains essential handlers."""
+        """Test that HANDLER_REGISTRY maps essential actions to paths."""
         self.assertIsInstance(agent_registry.HANDLER_REGISTRY, dict)
 
         essential_handlers = [
@@ -37,8 +51,248 @@ class TestAgentRegistry(unittest.TestCase):
 
         for handler_name in essential_handlers:
             self.assertIn(handler_name, agent_registry.HANDLER_REGISTRY)
-            self.assertTrue(callable(agent_registry.HANDLER_REGISTRY[handler_name]))
+            self.assertIn(':', agent_registry.HANDLER_REGISTRY[handler_name])
+
+    def test_list_actions_does_not_import(self):
+        """Listing actions and agents must not import any agent module."""
+        with patch('src.agents.agent_registry.importlib.import_module') \
+                as mock_import:
+            actions = agent_registry.list_actions()
+            agents = agent_registry.list_agents()
+        mock_import.assert_not_called()
+        self.assertIn('trade', actions)
+        self.assertIn('trading_agent', agents)
+
+    def test_import_does_not_load_supabase(self):
+        """The Supabase client must stay off the cold-start path."""
+        code = ('import sys, src.agents.agent_registry; '
+                'print("supabase" in sys.modules)')
+        root = os.path.join(os.path.dirname(__file__), '..', '..')
+        output = subprocess.run([sys.executable, '-c', code], cwd=root,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.split()[-1], 'False')
+
+    def test_get_handler_imports_on_first_use(self):
+        """The handler module is imported once, on first lookup."""
+        import_module = agent_registry.importlib.import_module
+        with patch('src.agents.agent_registry.importlib.import_module',
+                   wraps=import_module) as mock_import:
+            first = agent_registry.get_handler('alert')
+            second = agent_registry.get_handler('alert')
+        mock_import.assert_called_once_with('src.agents.alert_agent')
+        self.assertTrue(callable(first))
+        self.assertIs(first, second)
+
+    def test_unknown_names_return_none(self):
+        self.assertIsNone(agent_registry.get_handler('missing'))
+        self.assertIsNone(agent_registry.get_agent_module('missing_agent'))
+        self.assertIsNone(agent_registry.get_agent_handler('missing_agent'))
+
+    def test_agent_lookups_resolve(self):
+        module = agent_registry.get_agent_module('news_agent')
+        handler = agent_registry.get_agent_handler('news_agent')
+        self.assertIs(handler, module.handle_news_request)
+
+
+class TestAsyncProtocol(unittest.TestCase):
+
+    def setUp(self):
+        agent_registry.resolve.cache_clear()
+        agent_registry._resolve_async.cache_clear()
+
+    def test_to_async_keeps_coroutine_functions(self):
+        async def handle(data, user_id):
+            return data
+
+        self.assertIs(agent_registry.to_async(handle), handle)
+
+    def test_to_async_runs_sync_handler_in_executor(self):
+        """Sync handlers run off the loop thread in the caller's context."""
+        request_id = contextvars.ContextVar('request_id')
+
+        def handler(data, user_id):
+            return threading.current_thread().name, request_id.get(), user_id
+
+        async def call():
+            request_id.set('req-1')
+            return await agent_registry.to_async(handler)({}, 'u1')
+
+        thread_name, seen_request_id, user_id = asyncio.run(call())
+        self.assertTrue(thread_name.startswith('agent-handler'))
+        self.assertEqual(seen_request_id, 'req-1')
+        self.assertEqual(user_id, 'u1')
+
+    def test_native_async_handle_is_preferred(self):
+        async def handle(data, user_id):
+            return {'native': True}
+
+        module = types.SimpleNamespace(
+            handle=handle, handle_alert_request=lambda data, user_id: {}
+        )
+        with patch('src.agents.agent_registry.importlib.import_module',
+                   return_value=module):
+            handler = agent_registry.get_async_handler('alert')
+        self.assertIs(handler, handle)
+
+    def test_sync_agent_handler_is_adapted(self):
+        handler = agent_registry.get_async_agent_handler('alert_agent')
+        self.assertTrue(asyncio.iscoroutinefunction(handler))
+        self.assertIsNone(
+            agent_registry.get_async_agent_handler('missing_agent')
+        )
+
+
+class TestDispatch(unittest.TestCase):
+
+    def setUp(self):
+        get_response_cache().local.clear()
+        use_temp_spool(self)
+
+    def _counting_handler(self):
+        calls = []
+
+        async def handler(data, user_id):
+            calls.append(data)
+            await asyncio.sleep(0.05)
+            return {'calls': len(calls)}
+
+        return handler, calls
+
+    def test_read_only_requests_are_coalesced(self):
+        handler, calls = self._counting_handler()
+
+        async def run():
+            return await asyncio.gather(*(
+                agent_registry.dispatch(
+                    'update', {'task': 'view_updates'}, 'u1'
+                )
+                for _ in range(3)
+            ))
+
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=handler):
+            results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'calls': 1}] * 3)
+
+    def test_write_requests_are_not_coalesced(self):
+        handler, calls = self._counting_handler()
+
+        async def run():
+            return await asyncio.gather(*(
+                agent_registry.dispatch(
+                    'trade', {'task': 'execute_trade'}, 'u1'
+                )
+                for _ in range(2)
+            ))
+
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=handler):
+            asyncio.run(run())
+        self.assertEqual(len(calls), 2)
+
+    def test_expense_listings_are_not_coalesced(self):
+        # They store financial_{task_id} shared data for every caller
+        handler, calls = self._counting_handler()
+
+        async def run():
+            return await asyncio.gather(*(
+                agent_registry.dispatch(
+                    'expense', {'task': task}, 'u1'
+                )
+                for task in ('list_expenses', 'list_expenses',
+                             'expense_summary', 'expense_summary')
+            ))
+
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=handler):
+            asyncio.run(run())
+        self.assertEqual(len(calls), 4)
+
+    def test_cacheable_task_is_served_from_cache(self):
+        handler, calls = self._counting_handler()
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=handler):
+            first = agent_registry.dispatch_sync(
+                'news', {'task': 'fetch_news'}, 'u1'
+            )
+            # News is declared as shared across users
+            second = agent_registry.dispatch_sync(
+                'news', {'task': 'fetch_news'}, 'u2'
+            )
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(first, second)
+
+    def test_error_results_are_not_cached(self):
+        calls = []
+
+        async def failing(data, user_id):
+            calls.append(data)
+            return {'error': 'rate limited'}
+
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=failing):
+            for _ in range(2):
+                agent_registry.dispatch_sync(
+                    'portfolio', {'task': 'view_portfolio'}, 'u1'
+                )
+        self.assertEqual(len(calls), 2)
+
+    def test_unknown_action(self):
+        self.assertEqual(
+            agent_registry.dispatch_sync('missing', {}, 'u1'),
+            {'error': 'Invalid action'}
+        )
+
+
+class TestDispatchBatch(unittest.TestCase):
+
+    def setUp(self):
+        get_response_cache().local.clear()
+        use_temp_spool(self)
+
+    def test_items_run_concurrently_with_isolated_errors(self):
+        async def handler(data, user_id):
+            await asyncio.sleep(0.1)
+            if data.get('fail'):
+                raise RuntimeError('boom')
+            return {'task': data['task']}
+
+        items = [
+            {'action': 'trade', 'data': {'task': 'a'}, 'id': 'first'},
+            {'action': 'trade', 'data': {'task': 'b', 'fail': True}},
+            {'action': 'trade', 'data': {'task': 'c'}},
+        ]
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=handler):
+            start = time.perf_counter()
+            results = agent_registry.dispatch_batch_sync(items, 'u1')
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.25)
+        self.assertEqual(results, [
+            {'id': 'first', 'action': 'trade', 'result': {'task': 'a'}},
+            {'id': 1, 'action': 'trade', 'error': 'boom'},
+            {'id': 2, 'action': 'trade', 'result': {'task': 'c'}},
+        ])
+
+    def test_unknown_action_in_batch(self):
+        results = agent_registry.dispatch_batch_sync(
+            [{'action': 'missing'}], 'u1'
+        )
+        self.assertEqual(results[0]['result'], {'error': 'Invalid action'})
+
+    def test_rejects_malformed_batches(self):
+        for items in (None, [], [{'data': {}}],
+                      [{'action': 'news', 'data': []}]):
+            with self.subTest(items=items), self.assertRaises(ValueError):
+                agent_registry.validate_batch(items)
 
+    @patch('src.agents.agent_registry.get_config',
+           return_value={'max_items': 2})
+    def test_rejects_oversized_batches(self, mock_config):
+        with self.assertRaises(ValueError):
+            agent_registry.validate_batch([{'action': 'news'}] * 3)
 
 
 if __name__ == '__main__':
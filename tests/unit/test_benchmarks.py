@@ -0,0 +1,42 @@
+import unittest
+from benchmarks import run
+from benchmarks.fakes import offline
+from src.utils.cache import get_response_cache
+from src.utils.database import flush_audit
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def setUp(self):
+        get_response_cache().local.clear()
+        # Records left buffered by earlier tests go to the fake, not to
+        # Supabase or the real spool
+        with offline():
+            flush_audit(final=True)
+
+    def test_cases_run_offline(self):
+        for name, setup in run.CASES.items():
+            if name.startswith('trading.'):
+                continue
+            with self.subTest(case=name), offline() as services:
+                setup(services)()
+                flush_audit(final=True)
+
+    def test_log_audit_writes_to_fake_supabase(self):
+        with offline() as services:
+            run.CASES['audit.log_audit'](services)()
+            flush_audit(final=True)
+        self.assertEqual(len(services.supabase.tables['audit_logs']), 1)
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = {'a': {'median_us': 100.0}, 'b': {'median_us': 100.0}}
+        results = {
+            'a': {'median_us': 120.0},
+            'b': {'median_us': 130.0},
+            'new': {'median_us': 1.0},
+        }
+        self.assertEqual(run.compare(results, baseline, 0.25), ['b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
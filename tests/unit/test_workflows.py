@@ -0,0 +1,247 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+import requests_mock
+from benchmarks.fakes import offline
+from src import workflows
+from src.utils.database import flush_audit
+
+
+def fake_agents(handlers):
+    """Patch the registry lookup used by workflows with async fakes."""
+    return patch('src.workflows.get_async_agent_handler',
+                 side_effect=handlers.get)
+
+
+class SharedDataTestCase(unittest.TestCase):
+    """Backs workflow checkpoints with an in-memory dict."""
+
+    def setUp(self):
+        self.shared = {}
+        store = patch('src.workflows.store_shared_data',
+                      side_effect=self._store)
+        load = patch('src.workflows.get_shared_data', side_effect=self._load)
+        load_many = patch('src.workflows.get_many',
+                          side_effect=self._load_many)
+        self.mock_store = store.start()
+        load.start()
+        self.mock_load_many = load_many.start()
+        self.addCleanup(patch.stopall)
+
+    def _store(self, key, value, user_id):
+        self.shared[f'{user_id}:{key}'] = value
+
+    def _load(self, key, user_id):
+        return self.shared.get(f'{user_id}:{key}', {})
+
+    def _load_many(self, keys, user_id):
+        return {key: self._load(key, user_id) for key in keys}
+
+
+class TestWorkflowEngine(SharedDataTestCase):
+
+    @patch('src.workflows.log_audit')
+    def test_independent_steps_run_concurrently(self, mock_log_audit):
+        """Test that a workflow takes as long as its critical path."""
+        async def slow(data, user_id):
+            await asyncio.sleep(0.2)
+            return {'done': data['n']}
+
+        steps = [
+            {'id': f's{n}', 'agent': 'slow_agent', 'params': {'n': n}}
+            for n in range(3)
+        ]
+        with fake_agents({'slow_agent': slow}):
+            started = time.monotonic()
+            result = workflows.execute_workflow({'steps': steps}, 'u1')
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['result']['steps']['s2'], {'done': 2})
+        self.assertLess(elapsed, 0.5)
+
+    @patch('src.workflows.log_audit')
+    def test_outputs_flow_into_later_steps(self, mock_log_audit):
+        async def news(data, user_id):
+            return {'news': ['crypto up']}
+
+        async def sentiment(data, user_id):
+            return {'status': 'success', 'result': {'text': data['text']}}
+
+        async def alert(data, user_id):
+            return {'sent': data['message'], 'topic': data['topic_arn']}
+
+        agents = {'news_agent': news, 'sentiment_agent': sentiment,
+                  'alert_agent': alert}
+        steps = [
+            {'id': 'alert', 'agent': 'alert_agent', 'params': {
+                'message': '$steps.score.result.text',
+                'topic_arn': '$input.topic_arn'}},
+            {'id': 'score', 'agent': 'sentiment_agent',
+             'params': {'text': '$steps.news.news'}},
+            {'id': 'news', 'agent': 'news_agent', 'params': {}},
+        ]
+        with fake_agents(agents):
+            result = workflows.execute_workflow(
+                {'steps': steps, 'topic_arn': 'arn:topic'}, 'u1'
+            )
+
+        self.assertEqual(
+            result['result']['steps']['alert'],
+            {'sent': ['crypto up'], 'topic': 'arn:topic'}
+        )
+
+    @patch('src.agents.alert_agent.boto3')
+    @patch('src.agents.sentiment_agent.get_config', return_value='key')
+    @patch('src.workflows.log_audit')
+    def test_market_watch_runs_with_real_agents(self, mock_log_audit,
+                                                mock_get_config, mock_boto3):
+        news = {'data': [{'title': 'Crypto rally'},
+                         {'title': 'Stocks flat'},
+                         {'title': 'crypto fees fall'}]}
+        sentiment = {'sentiment': 'positive', 'score': 0.6,
+                     'confidence': 0.9}
+        with requests_mock.Mocker() as http, offline():
+            http.get('https://api.coingecko.com/api/v3/news', json=news)
+            http.get('https://fred.stlouisfed.org/series/M2SL', text='m2')
+            scored = http.post('https://api.groq.com/v1/sentiment',
+                               json=sentiment)
+            result = workflows.execute_workflow(
+                {'workflow': 'market_watch', 'topic_arn': 'arn:topic'}, 'u1'
+            )
+            flush_audit()
+
+        self.assertEqual(result['status'], 'success')
+        # The sentiment agent takes text, not the list of articles
+        self.assertEqual(scored.last_request.json()['text'],
+                         'Crypto rally\ncrypto fees fall')
+        mock_boto3.client.return_value.publish.assert_called_once()
+
+    @patch('src.workflows.log_audit')
+    def test_failed_step_skips_dependents(self, mock_log_audit):
+        async def broken(data, user_id):
+            return {'error': 'upstream down'}
+
+        async def ok(data, user_id):
+            return {'ok': True}
+
+        steps = [
+            {'id': 'a', 'agent': 'broken', 'params': {}},
+            {'id': 'b', 'agent': 'ok', 'params': {}, 'depends_on': ['a']},
+            {'id': 'c', 'agent': 'ok', 'params': {'x': '$steps.b'}},
+            {'id': 'd', 'agent': 'ok', 'params': {}},
+        ]
+        with fake_agents({'broken': broken, 'ok': ok}):
+            result = workflows.execute_workflow({'steps': steps}, 'u1')
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(result['result']['failed'],
+                         {'a': {'error': 'upstream down'}})
+        self.assertEqual(sorted(result['result']['skipped']), ['b', 'c'])
+        self.assertEqual(result['result']['steps'], {'d': {'ok': True}})
+
+    @patch('src.workflows.log_audit')
+    def test_cycle_is_rejected(self, mock_log_audit):
+        steps = [
+            {'id': 'a', 'agent': 'x', 'depends_on': ['b']},
+            {'id': 'b', 'agent': 'x', 'depends_on': ['a']},
+        ]
+        result = workflows.execute_workflow({'steps': steps}, 'u1')
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('cycle', result['result'])
+
+    @patch('src.workflows.get_config', return_value={})
+    def test_unknown_workflow(self, mock_get_config):
+        result = workflows.execute_workflow({'workflow': 'nope'}, 'u1')
+        self.assertEqual(result, {'status': 'error',
+                                  'result': 'Unknown workflow: nope'})
+
+
+class TestWorkflowCheckpoints(SharedDataTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+
+        async def record(data, user_id):
+            self.calls.append(data['n'])
+            return {'n': data['n']}
+
+        self.agents = fake_agents({'rec': record})
+        self.agents.start()
+        self.steps = [
+            {'id': 'a', 'agent': 'rec', 'params': {'n': 1}},
+            {'id': 'b', 'agent': 'rec',
+             'params': {'n': 2, 'prev': '$steps.a'}},
+            {'id': 'c', 'agent': 'rec',
+             'params': {'n': 3, 'prev': '$steps.b'}},
+        ]
+
+    def test_deadline_margin(self):
+        async def check(seconds_remaining):
+            workflows.set_deadline(seconds_remaining)
+            return workflows._out_of_time()
+
+        with patch('src.workflows.get_config',
+                   return_value={'deadline_margin_seconds': 5}):
+            self.assertFalse(asyncio.run(check(60)))
+            self.assertTrue(asyncio.run(check(3)))
+
+    @patch('src.workflows.log_audit')
+    def test_each_step_is_checkpointed(self, mock_log_audit):
+        result = workflows.execute_workflow({'steps': self.steps}, 'u1')
+        run_id = result['result']['run_id']
+
+        self.assertEqual(result['status'], 'success')
+        self.assertIn(f'u1:workflow_{run_id}', self.shared)
+        self.assertEqual(
+            self.shared[f'u1:workflow_{run_id}_step_b'], {'output': {'n': 2}}
+        )
+
+    @patch('src.workflows.log_audit')
+    def test_resume_skips_completed_steps(self, mock_log_audit):
+        """Test that a run suspended at the deadline resumes in place."""
+        with patch('src.workflows._out_of_time',
+                   side_effect=[False, False, True]):
+            suspended = workflows.execute_workflow({'steps': self.steps}, 'u1')
+
+        self.assertEqual(suspended['status'], 'suspended')
+        self.assertEqual(suspended['result']['pending'], ['c'])
+        self.assertEqual(self.calls, [1, 2])
+
+        run_id = suspended['result']['run_id']
+        resumed = workflows.execute_workflow({'run_id': run_id}, 'u1')
+
+        self.assertEqual(resumed['status'], 'success')
+        self.assertEqual(self.calls, [1, 2, 3])
+        # Every step checkpoint is loaded in one bulk read
+        self.mock_load_many.assert_called_once()
+        self.assertEqual(resumed['result']['steps']['c'], {'n': 3})
+
+    @patch('src.workflows.log_audit')
+    def test_secret_inputs_are_not_checkpointed(self, mock_log_audit):
+        steps = [{'id': 'a', 'agent': 'rec',
+                  'params': {'n': 1, 'key': '$input.api_key'}}]
+        inputs = {'steps': steps, 'api_key': 'k1', 'region': 'eu'}
+        with patch('src.workflows._out_of_time', side_effect=[True]):
+            suspended = workflows.execute_workflow(inputs, 'u1')
+        run_id = suspended['result']['run_id']
+
+        manifest = self.shared[f'u1:workflow_{run_id}']
+        self.assertEqual(manifest['inputs'], {'region': 'eu'})
+        self.assertEqual(manifest['secret_inputs'], ['api_key'])
+
+        refused = workflows.execute_workflow({'run_id': run_id}, 'u1')
+        self.assertEqual(refused['status'], 'error')
+        self.assertEqual(self.calls, [])
+
+        resumed = workflows.execute_workflow(
+            {'run_id': run_id, 'api_key': 'k1'}, 'u1'
+        )
+        self.assertEqual(resumed['status'], 'success')
+        self.assertEqual(self.calls, [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
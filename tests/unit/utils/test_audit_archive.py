@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from benchmarks.fakes import FakeQuery, FakeSupabase
+from src.utils.audit_archive import (
+    archive_audit_logs, read_audit_archive, write_archive
+)
+
+
+def _row(row_id, user_id, timestamp, action='trade'):
+    return {'id': row_id, 'user_id': user_id, 'action': action,
+            'details': '{"status":"success"}', 'timestamp': timestamp}
+
+
+class BlockedDeleteQuery(FakeQuery):
+    """Deletes blocked by row-level security match no rows."""
+
+    def delete(self, **kwargs):
+        self._filters.append(lambda row: False)
+        return super().delete(**kwargs)
+
+
+class ArchiveTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.root = self.tmpdir.name
+
+
+class TestArchiveFiles(ArchiveTestCase):
+
+    def setUp(self):
+        super().setUp()
+        write_archive([
+            _row(1, 'u1', '2026-01-01T10:00:00+00:00'),
+            _row(2, 'u1', '2026-01-02T10:00:00+00:00', action='key_task'),
+            _row(3, 'u2', '2026-01-02T11:00:00+00:00'),
+        ], self.root)
+
+    def test_files_are_partitioned_by_day_and_user(self):
+        partitions = sorted(
+            os.path.relpath(path, self.root)
+            for path, _, files in os.walk(self.root) if files
+        )
+        self.assertEqual(partitions, [
+            os.path.join('date=2026-01-01', 'user_id=u1'),
+            os.path.join('date=2026-01-02', 'user_id=u1'),
+            os.path.join('date=2026-01-02', 'user_id=u2'),
+        ])
+
+    def test_reader_filters_by_user_action_and_time(self):
+        rows = read_audit_archive(user_id='u1', source=self.root)
+        self.assertEqual([row['id'] for row in rows], [1, 2])
+
+        rows = read_audit_archive(action='trade', source=self.root,
+                                  start='2026-01-02T00:00:00+00:00')
+        self.assertEqual([row['id'] for row in rows], [3])
+
+        rows = read_audit_archive(end='2026-01-02T10:30:00+00:00',
+                                  columns=['id'], source=self.root)
+        self.assertEqual(rows, [{'id': 1}, {'id': 2}])
+
+    def test_appending_keeps_earlier_files(self):
+        write_archive([_row(4, 'u1', '2026-01-01T12:00:00+00:00')],
+                      self.root)
+        rows = read_audit_archive(user_id='u1', source=self.root)
+        self.assertEqual([row['id'] for row in rows], [1, 4, 2])
+
+
+class TestArchiveJob(ArchiveTestCase):
+
+    def test_moves_only_aged_rows_in_batches(self):
+        now = datetime.now(timezone.utc)
+        supabase = FakeSupabase()
+        supabase.tables['audit_logs'] = [
+            _row(i, 'u1', (now - timedelta(days=100 + i)).isoformat())
+            for i in range(1, 6)
+        ] + [_row(6, 'u1', now.isoformat())]
+
+        with patch('src.utils.database.supabase_client', supabase):
+            summary = archive_audit_logs(90, self.root, batch_size=2,
+                                         allow_local=True)
+
+        self.assertEqual(summary['archived'], 5)
+        self.assertEqual([row['id'] for row in supabase.tables['audit_logs']],
+                         [6])
+        archived = read_audit_archive(source=self.root)
+        self.assertEqual([row['id'] for row in archived], [5, 4, 3, 2, 1])
+
+    def test_failed_write_keeps_rows(self):
+        supabase = FakeSupabase()
+        supabase.tables['audit_logs'] = [
+            _row(1, 'u1', '2020-01-01T00:00:00+00:00')
+        ]
+        with patch('src.utils.database.supabase_client', supabase), \
+                patch('src.utils.audit_archive.write_archive',
+                      side_effect=OSError('bucket unavailable')):
+            with self.assertRaises(OSError):
+                archive_audit_logs(90, self.root, allow_local=True)
+        self.assertEqual(len(supabase.tables['audit_logs']), 1)
+
+    def test_local_destination_is_refused_by_default(self):
+        supabase = FakeSupabase()
+        supabase.tables['audit_logs'] = [
+            _row(1, 'u1', '2020-01-01T00:00:00+00:00')
+        ]
+        with patch('src.utils.database.supabase_client', supabase):
+            with self.assertRaises(ValueError):
+                archive_audit_logs(90, self.root)
+        self.assertEqual(len(supabase.tables['audit_logs']), 1)
+
+    def test_stops_when_rows_are_not_deleted(self):
+        supabase = FakeSupabase()
+        supabase.tables['audit_logs'] = [
+            _row(i, 'u1', '2020-01-01T00:00:00+00:00') for i in range(1, 5)
+        ]
+        rows = supabase.tables['audit_logs']
+        with patch('src.utils.database.supabase_client', supabase), \
+                patch.object(supabase, 'table',
+                             lambda name: BlockedDeleteQuery(rows)):
+            with self.assertRaises(RuntimeError):
+                archive_audit_logs(90, self.root, batch_size=2,
+                                   allow_local=True)
+        # The first batch was archived once, and the job went no further
+        self.assertEqual(len(read_audit_archive(source=self.root)), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
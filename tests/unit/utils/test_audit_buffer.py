@@ -0,0 +1,71 @@
+import json
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+from src.utils import database
+from src.utils.audit_buffer import AuditBuffer
+
+
+class TestAuditBuffer(unittest.TestCase):
+
+    def test_flushes_when_batch_is_full(self):
+        batches = []
+        buffer = AuditBuffer(batches.append, max_batch=3, flush_interval=60)
+        for i in range(7):
+            buffer.add({'n': i})
+
+        self.assertEqual([len(batch) for batch in batches], [3, 3])
+        self.assertEqual(buffer.pending(), 1)
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(batches[-1], [{'n': 6}])
+
+    def test_flushes_after_interval(self):
+        batches = []
+        buffer = AuditBuffer(batches.append, max_batch=100, flush_interval=0.1)
+        buffer.add({'n': 1})
+        deadline = time.monotonic() + 2
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(batches, [[{'n': 1}]])
+
+    def test_write_errors_do_not_propagate(self):
+        buffer = AuditBuffer(MagicMock(side_effect=RuntimeError('down')),
+                             flush_interval=60)
+        buffer.add({'n': 1})
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(buffer.pending(), 0)
+
+
+class TestBufferedLogAudit(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('src.utils.database.get_spool_replayer',
+                        return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        database.flush_audit()
+
+    @patch('src.utils.database.supabase_client')
+    def test_log_audit_is_written_in_one_bulk_insert(self, mock_client):
+        database.log_audit('u1', 'news_task', {'task': 'fetch_news'})
+        database.log_audit('u1', 'alert_task', {'task': 'status'})
+        mock_client.table.assert_not_called()
+
+        self.assertEqual(database.flush_audit(), 2)
+        mock_client.table.assert_called_once_with('audit_logs')
+        rows = mock_client.table.return_value.insert.call_args[0][0]
+        self.assertEqual([row['action'] for row in rows],
+                         ['news_task', 'alert_task'])
+        self.assertEqual(json.loads(rows[0]['details']),
+                         {'task': 'fetch_news'})
+
+    @patch('src.utils.database.get_config', return_value={'buffered': False})
+    @patch('src.utils.database.supabase_client')
+    def test_unbuffered_mode_writes_immediately(self, mock_client,
+                                                mock_config):
+        database.log_audit('u1', 'news', {})
+        mock_client.table.return_value.insert.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import unittest
+from unittest.mock import patch
+from src.utils import audit_format
+from src.utils.audit_format import compact_details, encode_details
+
+
+class TestCompactDetails(unittest.TestCase):
+
+    def test_long_strings_are_replaced_by_digest(self):
+        code = 'fn main() {}\n' * 100
+        compact = compact_details('code_generate_rust', {
+            'status': 'success', 'task_id': 't1', 'result': code,
+        })
+        self.assertEqual(compact['status'], 'success')
+        self.assertEqual(compact['_omitted'], ['result'])
+
+        compact = compact_details('unlisted_action', {'code': code})
+        self.assertEqual(compact['code']['_length'], len(code))
+        self.assertEqual(len(compact['code']['_sha256']), 64)
+
+    def test_schema_keeps_nested_fields(self):
+        compact = compact_details('trade', {
+            'order': {'id': 'o1', 'side': 'buy', 'info': {'raw': 'x'}},
+        })
+        self.assertEqual(compact, {'order': {'id': 'o1', 'side': 'buy'}})
+
+    def test_trading_data_is_reduced_to_omitted_keys(self):
+        candles = [[i, 1.0, 2.0, 0.5, 1.5, 10] for i in range(100)]
+        compact = compact_details('trade', {'data': candles,
+                                            'patterns': candles})
+        self.assertEqual(compact, {'_omitted': ['data', 'patterns']})
+
+    def test_lists_and_depth_are_capped(self):
+        compact = compact_details('unlisted_action', {
+            'rows': list(range(50)),
+            'deep': {'a': {'b': {'c': {'d': 1}}}},
+        })
+        self.assertEqual(compact['rows'][:20], list(range(20)))
+        self.assertEqual(compact['rows'][20], {'_truncated': 30})
+        self.assertEqual(compact['deep']['a']['b'], {'c': {'_keys': 1}})
+
+    def test_config_schema_overrides_builtin(self):
+        with patch.object(audit_format, 'get_config',
+                          return_value={'schemas': {'trade': ['data']}}):
+            compact = compact_details('trade', {'data': [1], 'status': 'ok'})
+        self.assertEqual(compact, {'data': [1], '_omitted': ['status']})
+
+    def test_oversized_record_is_digested(self):
+        details = {f'k{i}': 'x' * 200 for i in range(20)}
+        with patch.object(audit_format, 'get_config',
+                          return_value={'max_details_bytes': 512}):
+            encoded = json.loads(encode_details('unlisted_action', details))
+        self.assertIn('_sha256', encoded)
+        self.assertEqual(encoded['_keys'][:2], ['k0', 'k1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
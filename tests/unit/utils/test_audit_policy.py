@@ -0,0 +1,146 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch
+from src.agents import agent_registry
+from src.utils import audit_policy, database
+from src.utils.audit_policy import AuditAggregator, get_policy
+from src.utils.cache import get_response_cache
+
+
+class TestAuditPolicy(unittest.TestCase):
+
+    def test_task_policy_overrides_action_default(self):
+        self.assertEqual(get_policy('news', 'fetch_news')['mode'],
+                         'aggregated')
+        self.assertEqual(get_policy('news', 'other')['mode'], 'always')
+        self.assertEqual(get_policy('trade', 'execute_trade')['mode'],
+                         'always')
+
+    def test_config_overrides_builtin_policies(self):
+        settings = {'policies': {'trade': {'mode': 'sampled', 'rate': 0.5}}}
+        with patch.object(audit_policy, 'get_config', return_value=settings):
+            self.assertEqual(get_policy('trade', 'fetch_data'),
+                             {'mode': 'sampled', 'rate': 0.5})
+            self.assertEqual(get_policy('news', 'fetch_news')['mode'],
+                             'aggregated')
+
+    def test_aggregator_counts_per_user_action_and_task(self):
+        aggregator = AuditAggregator(window=60)
+        aggregator.add('u1', 'news', 'fetch_news')
+        aggregator.add('u1', 'news', 'fetch_news')
+        aggregator.add('u2', 'news', 'fetch_news')
+
+        records = aggregator.drain()
+        counts = {(user, details['action']): details['count']
+                  for user, _, details in records}
+        self.assertEqual(counts, {('u1', 'news'): 2, ('u2', 'news'): 1})
+        self.assertEqual(aggregator.drain(), [])
+
+
+class AuditRecordingTestCase(unittest.TestCase):
+    """Captures the records the audit pipeline would write."""
+
+    def setUp(self):
+        get_response_cache().local.clear()
+        database.get_audit_aggregator().drain()
+        self.written = []
+        patcher = patch('src.utils.database._write_record',
+                        side_effect=lambda *args: self.written.append(args))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
+class TestRecordAudit(AuditRecordingTestCase):
+
+    def test_aggregated_records_are_written_as_counters(self):
+        for _ in range(3):
+            database.record_audit('u1', 'news', {'status': 'ok'}, 'fetch_news')
+        self.assertEqual(self.written, [])
+
+        database.flush_audit(final=True)
+        user_id, action, details = self.written[0][:3]
+        self.assertEqual((user_id, action), ('u1', 'audit_aggregate'))
+        self.assertEqual(details['count'], 3)
+
+    def test_invocations_in_one_window_share_a_record(self):
+        from src.lambda_handler import lambda_function
+
+        async def route(event):
+            database.record_audit('u1', 'news', {}, 'fetch_news')
+            return {'statusCode': 200}
+
+        with patch.object(lambda_function, 'route_event', route):
+            for _ in range(2):
+                asyncio.run(lambda_function.handle_event({}, None))
+        self.assertEqual(self.written, [])
+
+        # The first invocation after the window closes writes it out
+        with patch.object(lambda_function, 'route_event', route), \
+                patch('src.utils.audit_policy.time.monotonic',
+                      return_value=time.monotonic() + 3600):
+            asyncio.run(lambda_function.handle_event({}, None))
+        self.assertEqual(len(self.written), 1)
+        self.assertEqual(self.written[0][2]['count'], 3)
+
+    def test_errors_bypass_sampling_and_aggregation(self):
+        database.record_audit('u1', 'news', {'error': 'timeout'}, 'fetch_news')
+        self.assertEqual(len(self.written), 1)
+
+    @patch('src.utils.audit_policy.random.random', return_value=0.5)
+    def test_sampled_records_carry_their_rate(self, mock_random):
+        database.record_audit('u1', 'priority', {'status': 'ok'}, 'prioritize')
+        self.assertEqual(self.written, [])
+
+        mock_random.return_value = 0.01
+        database.record_audit('u1', 'priority', {'status': 'ok'}, 'prioritize')
+        self.assertEqual(self.written[0][2]['_sample_rate'], 0.1)
+
+
+class TestAuditScope(AuditRecordingTestCase):
+
+    def test_agent_and_dispatcher_records_collapse_into_one(self):
+        def handler(data, user_id):
+            database.log_audit(user_id, 'trade_task', {'task': data['task']})
+            return {'status': 'success'}
+
+        async_handler = agent_registry.to_async(handler)
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=async_handler):
+            result = agent_registry.dispatch_sync(
+                'trade', {'task': 'execute_trade'}, 'u1'
+            )
+
+        self.assertEqual(result, {'status': 'success'})
+        self.assertEqual(len(self.written), 1)
+        user_id, action, details, events = self.written[0]
+        self.assertEqual((user_id, action), ('u1', 'trade'))
+        self.assertEqual(events, [('trade_task', {'task': 'execute_trade'})])
+
+    def test_handler_exception_is_recorded(self):
+        async def failing(data, user_id):
+            raise RuntimeError('exchange down')
+
+        with patch('src.agents.agent_registry.get_async_handler',
+                   return_value=failing):
+            with self.assertRaises(RuntimeError):
+                asyncio.run(agent_registry.dispatch('trade', {}, 'u1'))
+        self.assertEqual(self.written[0][2], {'error': 'exchange down'})
+
+
+class TestCollapsedEncoding(unittest.TestCase):
+
+    def test_events_are_compacted_under_events(self):
+        from src.utils.audit_format import encode_details
+        encoded = json.loads(encode_details(
+            'trade', {'status': 'success', 'data': [1, 2]},
+            [('trade_task', {'task': 'fetch_data'})]
+        ))
+        self.assertEqual(encoded['_events'],
+                         [{'action': 'trade_task', 'task': 'fetch_data'}])
+        self.assertEqual(encoded['_omitted'], ['data'])
+
+
+if __name__ == '__main__':
+    unittest.main()
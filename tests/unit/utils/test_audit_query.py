@@ -0,0 +1,88 @@
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+from src.utils import audit_query
+from src.utils.audit_query import (
+    decode_cursor, encode_cursor, handle_audit_request, query_audit_logs
+)
+
+
+def _rows(count):
+    return [
+        {'id': 100 - i, 'user_id': 'u1', 'action': 'trade',
+         'details': json.dumps({'n': i}),
+         'timestamp': f'2026-10-18T12:00:{59 - i:02d}+00:00'}
+        for i in range(count)
+    ]
+
+
+class TestAuditQuery(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch('src.utils.database.supabase_client')
+        self.client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.query = MagicMock()
+        for method in ('select', 'eq', 'gte', 'lt', 'or_', 'order', 'limit'):
+            getattr(self.query, method).return_value = self.query
+        self.client.table.return_value = self.query
+
+    def test_first_page_returns_cursor_when_more_rows_exist(self):
+        self.query.execute.return_value.data = _rows(3)
+
+        page = query_audit_logs('u1', action='trade', limit=2)
+
+        self.query.eq.assert_any_call('user_id', 'u1')
+        self.query.eq.assert_any_call('action', 'trade')
+        self.query.limit.assert_called_once_with(3)
+        self.query.or_.assert_not_called()
+        self.assertEqual([item['details'] for item in page['items']],
+                         [{'n': 0}, {'n': 1}])
+        self.assertEqual(decode_cursor(page['next_cursor']),
+                         ('2026-10-18T12:00:58+00:00', 99))
+
+    def test_next_page_continues_after_cursor(self):
+        self.query.execute.return_value.data = _rows(1)
+        cursor = encode_cursor({'timestamp': '2026-10-18T12:00:58+00:00',
+                                'id': 99})
+
+        page = query_audit_logs('u1', cursor=cursor, limit=2)
+
+        self.query.or_.assert_called_once_with(
+            'timestamp.lt."2026-10-18T12:00:58+00:00",'
+            'and(timestamp.eq."2026-10-18T12:00:58+00:00",id.lt.99)'
+        )
+        self.assertIsNone(page['next_cursor'])
+
+    def test_time_range_and_page_size_cap(self):
+        self.query.execute.return_value.data = []
+        with patch.object(audit_query, 'get_config',
+                          return_value={'max_page_size': 10}):
+            query_audit_logs('u1', start='2026-10-01T00:00:00+00:00',
+                             end='2026-10-02T00:00:00+00:00', limit=500)
+        self.query.gte.assert_called_once_with(
+            'timestamp', '2026-10-01T00:00:00+00:00')
+        self.query.lt.assert_called_once_with(
+            'timestamp', '2026-10-02T00:00:00+00:00')
+        self.query.limit.assert_called_once_with(11)
+
+    def test_invalid_input_is_reported(self):
+        for data in ({'cursor': 'not-a-cursor'}, {'start': 'yesterday'},
+                     {'limit': 0}):
+            with self.subTest(data=data):
+                result = handle_audit_request(data, 'u1')
+                self.assertEqual(result['status'], 'error')
+        self.query.execute.assert_not_called()
+
+    def test_registry_dispatches_audit_queries(self):
+        from src.agents import agent_registry
+        self.query.execute.return_value.data = _rows(1)
+        result = agent_registry.dispatch_sync(
+            'audit', {'task': 'query_audit'}, 'u1'
+        )
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(len(result['result']['items']), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+from src.utils import database
+from src.utils.audit_spool import AuditSpool, SpoolReplayer
+
+
+class SpoolTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.spool = AuditSpool(os.path.join(self.tmpdir.name, 'spool.db'))
+
+
+class TestAuditSpool(SpoolTestCase):
+
+    def test_rows_round_trip_in_order(self):
+        self.spool.append([{'n': 1}, {'n': 2}])
+        self.spool.append([{'n': 3}])
+
+        batch = self.spool.peek(2)
+        self.assertEqual([row for _, row in batch], [{'n': 1}, {'n': 2}])
+        self.spool.ack([row_id for row_id, _ in batch])
+        self.assertEqual(self.spool.pending(), 1)
+
+    def test_rows_survive_reopening(self):
+        self.spool.append([{'n': 1}])
+        reopened = AuditSpool(self.spool.path)
+        self.assertEqual(reopened.pending(), 1)
+
+
+class TestSpoolReplayer(SpoolTestCase):
+
+    def test_drains_in_batches(self):
+        batches = []
+        replayer = SpoolReplayer(self.spool, batches.append, batch_size=2)
+        self.spool.append([{'n': i} for i in range(5)])
+
+        self.assertEqual(replayer.drain(), 5)
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(self.spool.pending(), 0)
+
+    def test_backs_off_exponentially_after_failures(self):
+        writer = MagicMock(side_effect=RuntimeError('down'))
+        replayer = SpoolReplayer(self.spool, writer, interval=1,
+                                 max_backoff=3)
+        self.spool.append([{'n': 1}])
+
+        with patch('src.utils.audit_spool.time.monotonic', return_value=100):
+            self.assertEqual(replayer.drain(), 0)
+            self.assertFalse(replayer.available())
+            # Backing off: no new attempt
+            replayer.drain()
+        self.assertEqual(writer.call_count, 1)
+        self.assertEqual(replayer.record_failure(), 2)
+        self.assertEqual(replayer.record_failure(), 3)
+        self.assertEqual(self.spool.pending(), 1)
+
+        writer.side_effect = None
+        replayer.record_success()
+        self.assertEqual(replayer.drain(), 1)
+        self.assertEqual(replayer.failures, 0)
+
+    def test_rejected_row_is_dead_lettered(self):
+        written = []
+
+        def writer(rows):
+            if any(row.get('bad') for row in rows):
+                raise ValueError('violates check constraint')
+            written.extend(rows)
+
+        replayer = SpoolReplayer(self.spool, writer, batch_size=4,
+                                 interval=0, max_backoff=0, max_attempts=2)
+        rows = [{'n': 0}, {'n': 1}, {'n': 2, 'bad': True}, {'n': 3},
+                {'n': 4}]
+        self.spool.append(rows)
+
+        for _ in range(20):
+            if not self.spool.pending():
+                break
+            replayer.replay_once()
+
+        self.assertEqual(self.spool.pending(), 0)
+        self.assertEqual(written, [rows[0], rows[1], rows[3], rows[4]])
+        self.assertEqual(self.spool.dead_letters(), [rows[2]])
+
+    def test_non_blocking_replay_skips_a_running_replay(self):
+        writer = MagicMock()
+        replayer = SpoolReplayer(self.spool, writer)
+        self.spool.append([{'n': 1}])
+
+        with replayer._lock:
+            self.assertEqual(replayer.replay_once(blocking=False), 0)
+        writer.assert_not_called()
+        self.assertEqual(replayer.replay_once(blocking=False), 1)
+
+    def test_start_does_not_wait_for_a_replay(self):
+        writing = threading.Event()
+        release = threading.Event()
+
+        def slow_writer(rows):
+            writing.set()
+            release.wait(2)
+
+        replayer = SpoolReplayer(self.spool, slow_writer, interval=60)
+        self.spool.append([{'n': 1}])
+        worker = threading.Thread(target=replayer.replay_once)
+        worker.start()
+        self.assertTrue(writing.wait(2))
+        try:
+            started = threading.Thread(target=replayer.start)
+            started.start()
+            started.join(1)
+            self.assertFalse(started.is_alive())
+        finally:
+            release.set()
+            worker.join()
+
+
+class TestLogAuditSpooling(SpoolTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.replayer = SpoolReplayer(self.spool, database.write_audit_rows)
+        self.replayer.start = MagicMock()
+        patcher = patch('src.utils.database.get_spool_replayer',
+                        return_value=self.replayer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('src.utils.database.supabase_client')
+    def test_failed_write_is_spooled_and_replayed(self, mock_client):
+        insert = mock_client.table.return_value.insert
+        insert.return_value.execute.side_effect = RuntimeError('timeout')
+
+        database.write_or_spool_audit_rows([{'action': 'a'}])
+        self.assertEqual(self.spool.pending(), 1)
+        self.replayer.start.assert_called_once()
+
+        # While backing off, later batches skip the network entirely
+        database.write_or_spool_audit_rows([{'action': 'b'}])
+        self.assertEqual(insert.call_count, 1)
+        self.assertEqual(self.spool.pending(), 2)
+
+        insert.return_value.execute.side_effect = None
+        self.replayer.record_success()
+        self.replayer.drain()
+        self.assertEqual(self.spool.pending(), 0)
+        self.assertEqual(insert.call_args[0][0],
+                         [{'action': 'a'}, {'action': 'b'}])
+
+    @patch('src.utils.database.supabase_client')
+    def test_rejected_row_does_not_stop_auditing(self, mock_client):
+        inserted = []
+
+        def insert(rows):
+            if any(row['action'] == 'bad' for row in rows):
+                raise RuntimeError('column "bad" does not exist')
+            inserted.extend(row['action'] for row in rows)
+            return MagicMock()
+
+        mock_client.table.return_value.insert.side_effect = insert
+        self.replayer.interval = self.replayer.max_backoff = 0
+        self.replayer.max_attempts = 1
+
+        database.write_or_spool_audit_rows([{'action': 'bad'}])
+        database.write_or_spool_audit_rows([{'action': 'a'}])
+        self.assertEqual(self.spool.pending(), 2)
+        # Split, dead-letter the rejected row, then replay the rest
+        for _ in range(3):
+            self.replayer.drain()
+
+        self.assertEqual(self.spool.pending(), 0)
+        self.assertEqual(inserted, ['a'])
+        self.assertEqual(self.spool.dead_letters(), [{'action': 'bad'}])
+
+    @patch('src.utils.database.write_audit_rows')
+    def test_flush_replays_one_batch(self, write_rows):
+        self.replayer.write_batch = write_rows
+        self.replayer.batch_size = 2
+        self.spool.append([{'n': i} for i in range(5)])
+
+        database.flush_audit()
+        write_rows.assert_called_once_with([{'n': 0}, {'n': 1}])
+        # The background thread replays the rest
+        self.replayer.start.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
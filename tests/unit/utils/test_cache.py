@@ -0,0 +1,72 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from src.utils.cache import (
+    LRUCache, MISS, ResponseCache, SQLiteCacheTier, cache_key, cacheable,
+    shared_across_users
+)
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used_to_fit_size(self):
+        cache = LRUCache(max_bytes=10)
+        cache.set('a', 'aaaa', 60, 4)
+        cache.set('b', 'bbbb', 60, 4)
+        cache.get('a')
+        cache.set('c', 'cccc', 60, 4)
+
+        self.assertEqual(cache.get('a'), 'aaaa')
+        self.assertIs(cache.get('b'), MISS)
+        self.assertEqual(cache.size, 8)
+
+    def test_entries_expire(self):
+        cache = LRUCache()
+        with patch('src.utils.cache.time.time', return_value=1000):
+            cache.set('a', 1, 30, 1)
+        with patch('src.utils.cache.time.time', return_value=1031):
+            self.assertIs(cache.get('a'), MISS)
+        self.assertEqual(cache.size, 0)
+
+    def test_oversized_values_are_not_stored(self):
+        cache = LRUCache(max_bytes=4)
+        cache.set('a', 'too big', 60, 7)
+        self.assertIs(cache.get('a'), MISS)
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def test_hits_return_copies(self):
+        cache = ResponseCache()
+        cache.set('k', {'news': [1]}, 60)
+        hit = cache.get('k')
+        hit['news'].append(2)
+        self.assertEqual(cache.get('k'), {'news': [1]})
+
+    def test_shared_tier_hit_is_promoted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.db')
+            ResponseCache(shared=SQLiteCacheTier(path)).set('k', {'v': 1}, 60)
+
+            # A second process sees the value through the shared tier
+            other = ResponseCache(shared=SQLiteCacheTier(path))
+            self.assertIs(other.get_local('k'), MISS)
+            self.assertEqual(other.get('k'), {'v': 1})
+            self.assertEqual(other.get_local('k'), {'v': 1})
+
+    def test_cache_keys(self):
+        per_user = cacheable(ttl=60)
+        shared = cacheable(ttl=60, key=shared_across_users)
+        data = {'task': 'fetch_news', 'api_key': 'secret'}
+
+        key = cache_key('news', data, 'u1', per_user)
+        self.assertTrue(key.startswith('news:fetch_news:'))
+        self.assertNotIn('secret', key)
+        self.assertNotEqual(key, cache_key('news', data, 'u2', per_user))
+        self.assertEqual(cache_key('news', data, 'u1', shared),
+                         cache_key('news', data, 'u2', shared))
+
+
+if __name__ == '__main__':
+    unittest.main()
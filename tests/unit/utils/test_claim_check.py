@@ -0,0 +1,104 @@
+import json
+import os
+import tempfile
+import unittest
+from benchmarks.fakes import offline
+from src.utils import claim_check
+from src.utils.aws_clients import (
+    flush_messages, get_many, get_shared_data, get_shared_data_cache,
+    send_message, store_shared_data
+)
+
+
+class TestClaimCheck(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.config = {
+            'claim_check': {
+                'store': 'local', 'local_path': self.tmp.name,
+                'prefix': 'cc/', 'shared_data_threshold_bytes': 200,
+                'message_threshold_bytes': 200,
+            },
+            # Keep values uncompressed so they cross the threshold
+            'shared_data_codec': {'compression': 'none'},
+            # The local store is only for the SQLite backend
+            'shared_data': {'backend': 'sqlite', 'sqlite_path': os.path.join(
+                self.tmp.name, 'shared_data.db')},
+        }
+        self.dynamodb = {'backend': 'dynamodb', 'track_usage': False}
+        self.value = {'candles': [[i, i + 1.5] for i in range(50)]}
+
+    def test_local_store_is_content_addressed(self):
+        with offline(self.config):
+            first = claim_check.offload(b'payload', 'test')
+            second = claim_check.offload(b'payload', 'test')
+
+            self.assertEqual(first, second)
+            self.assertTrue(first['location'].startswith(
+                os.path.join(self.tmp.name, 'cc', 'test')))
+            self.assertEqual(claim_check.fetch(first), b'payload')
+
+    def test_corrupt_payload_is_rejected(self):
+        with offline(self.config):
+            pointer = claim_check.offload(b'payload', 'test')
+            with open(pointer['location'], 'wb') as f:
+                f.write(b'tampered')
+            with self.assertRaises(ValueError):
+                claim_check.fetch(pointer)
+
+    def test_oversized_shared_data_is_offloaded_to_s3(self):
+        config = dict(self.config, shared_data=self.dynamodb, claim_check={
+            **self.config['claim_check'], 'store': 's3', 'bucket': 'b1',
+        })
+        with offline(config) as services:
+            store_shared_data('history', self.value, 'u1')
+            store_shared_data('small', {'n': 1}, 'u1')
+            items = services.dynamodb.Table('SharedData').items
+
+            self.assertNotIn('value', items['u1:history'])
+            pointer = json.loads(items['u1:history']['value_ref'])
+            self.assertTrue(pointer['location'].startswith('s3://b1/cc/'))
+            self.assertEqual(len(services.s3.objects), 1)
+            self.assertEqual(items['u1:small']['value'], '{"n":1}')
+
+            get_shared_data_cache().clear()
+            self.assertEqual(get_shared_data('history', 'u1'), self.value)
+            get_shared_data_cache().clear()
+            self.assertEqual(get_many(['history'], 'u1'),
+                             {'history': self.value})
+
+    def test_s3_store_requires_bucket(self):
+        config = dict(self.config, shared_data=self.dynamodb, claim_check={
+            **self.config['claim_check'], 'store': None,
+        })
+        with offline(config):
+            with self.assertRaises(ValueError):
+                store_shared_data('history', self.value, 'u1')
+
+    def test_local_store_is_refused_with_dynamodb(self):
+        config = dict(self.config, shared_data=self.dynamodb)
+        with offline(config) as services:
+            with self.assertRaises(ValueError):
+                store_shared_data('history', self.value, 'u1')
+            self.assertEqual(services.dynamodb.Table('SharedData').items, {})
+
+    def test_oversized_message_sends_pointer(self):
+        message = {'target_agent': 'trading_agent', 'user_id': 'u1',
+                   **self.value}
+        with offline(self.config) as services:
+            send_message(message)
+            flush_messages()
+            body = json.loads(services.sqs.messages[0]['Body'])
+
+            self.assertEqual(body['target_agent'], 'trading_agent')
+            self.assertEqual(body['user_id'], 'u1')
+            self.assertNotIn('candles', body)
+            pointer = claim_check.get_pointer(body)
+            self.assertEqual(json.loads(claim_check.fetch(pointer)), message)
+
+
+if __name__ == '__main__':
+    unittest.main()
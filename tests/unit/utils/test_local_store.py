@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.utils import log_utils
+from src.utils.aws_clients import (
+    get_many, get_shared_data, get_shared_data_cache, store_many,
+    store_shared_data
+)
+from src.utils.local_store import SQLiteSharedStore
+
+
+class TestSQLiteSharedStore(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'shared.db')
+        self.config = {'shared_data': {'backend': 'sqlite',
+                                       'sqlite_path': self.path}}
+
+    def test_shared_data_api_on_sqlite_backend(self):
+        large = {'rows': [{'close': i} for i in range(500)]}
+        with offline(self.config) as services:
+            store_shared_data('session', {'n': 1}, 'u1')
+            store_shared_data('large', large, 'u1')
+            store_many({f'k{i}': {'n': i} for i in range(30)}, 'u1')
+            get_shared_data_cache().clear()
+
+            self.assertEqual(get_shared_data('session', 'u1'), {'n': 1})
+            self.assertEqual(get_shared_data('large', 'u1'), large)
+            self.assertEqual(get_many(['k0', 'k29', 'nope'], 'u1'),
+                             {'k0': {'n': 0}, 'k29': {'n': 29}, 'nope': {}})
+            self.assertEqual(services.dynamodb.tables, {})
+
+        # Compressed values come back as the same bytes
+        item = SQLiteSharedStore(self.path).get_item(
+            Key={'key': 'u1:large'})['Item']
+        self.assertIsInstance(item['value'], bytes)
+
+    def test_put_replaces_whole_item(self):
+        store = SQLiteSharedStore(self.path)
+        store.put_item(Item={'key': 'k', 'value_ref': '{}'})
+        old = store.put_item(Item={'key': 'k', 'value': 'v'},
+                             ReturnValues='ALL_OLD')
+        self.assertEqual(old, {'Attributes': {'key': 'k',
+                                              'value_ref': '{}'}})
+        self.assertEqual(store.get_item(Key={'key': 'k'}),
+                         {'Item': {'key': 'k', 'value': 'v'}})
+        store.delete_item(Key={'key': 'k'})
+        self.assertEqual(store.get_item(Key={'key': 'k'}), {})
+
+    def test_concurrent_writers(self):
+        store = SQLiteSharedStore(self.path)
+        other = SQLiteSharedStore(self.path)
+
+        def write(target, start):
+            for i in range(start, start + 50):
+                target.put_item(Item={'key': f'k{i}', 'value': str(i)})
+
+        threads = [threading.Thread(target=write, args=(s, n * 50))
+                   for n, s in enumerate([store, other, store])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        keys = [{'key': f'k{i}'} for i in range(150)]
+        found = store.batch_get_item(
+            RequestItems={'SharedData': {'Keys': keys}})
+        self.assertEqual(len(found['Responses']['SharedData']), 150)
+
+
+class TestLogUtilsStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'shared_data.db')
+        self.config = {'shared_data': {'backend': 'sqlite',
+                                       'sqlite_path': self.path}}
+        self.own = os.path.join(self.tmp.name, 'log_utils.db')
+        self.legacy = os.path.join(self.tmp.name, 'shared_data.json')
+        paths = {
+            'STORAGE_PATH': self.own,
+            'LEGACY_STORAGE_PATH': self.legacy,
+        }
+        for name, path in paths.items():
+            patcher = patch.object(log_utils, name, path)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_store_and_get(self):
+        with offline(self.config):
+            self.assertIsNone(log_utils.get_shared_data('missing'))
+            log_utils.store_shared_data('plan', {'steps': [1, 2]})
+            self.assertEqual(log_utils.get_shared_data('plan'),
+                             {'steps': [1, 2]})
+
+        # The same store the sqlite backend of aws_clients uses
+        item = SQLiteSharedStore(self.path).get_item(Key={'key': 'plan'})
+        self.assertEqual(json.loads(item['Item']['value']),
+                         {'steps': [1, 2]})
+
+    def test_dynamodb_backend_is_never_written(self):
+        with offline() as services:
+            log_utils.store_shared_data('plan', {'steps': [1]})
+            self.assertEqual(log_utils.get_shared_data('plan'),
+                             {'steps': [1]})
+            self.assertEqual(services.dynamodb.tables, {})
+        self.assertTrue(os.path.exists(self.own))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_legacy_json_file_is_imported_once(self):
+        with open(self.legacy, 'w', encoding='utf-8') as f:
+            json.dump({'old': {'n': 1}}, f)
+
+        with offline(self.config):
+            self.assertEqual(log_utils.get_shared_data('old'), {'n': 1})
+        self.assertFalse(os.path.exists(self.legacy))
+        self.assertTrue(os.path.exists(self.legacy + '.imported'))
+
+
+if __name__ == '__main__':
+    unittest.main()
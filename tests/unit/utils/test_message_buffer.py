@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.utils.aws_clients import flush_messages, send_message
+from src.utils.message_buffer import MessageBuffer, SendError
+
+
+def failing_first(sqs, sender_fault=False):
+    """Make the fake's first batch call fail its first entry."""
+    send_batch = sqs.send_message_batch
+    calls = []
+
+    def flaky(QueueUrl, Entries, **kwargs):
+        calls.append([entry['Id'] for entry in Entries])
+        if len(calls) > 1:
+            return send_batch(QueueUrl=QueueUrl, Entries=Entries)
+        response = send_batch(QueueUrl=QueueUrl, Entries=Entries[1:])
+        response['Failed'] = [{'Id': Entries[0]['Id'],
+                               'SenderFault': sender_fault,
+                               'Code': 'InternalError'}]
+        return response
+    return flaky, calls
+
+
+class TestMessageBuffer(unittest.TestCase):
+
+    def test_messages_are_sent_ten_per_call(self):
+        with offline() as services:
+            for n in range(12):
+                send_message({'target_agent': 'news_agent', 'n': n})
+            self.assertEqual(services.sqs.calls, 1)
+            self.assertEqual(flush_messages(), 2)
+
+        self.assertEqual(services.sqs.calls, 2)
+        bodies = [json.loads(m['Body']) for m in services.sqs.messages]
+        self.assertEqual([body['n'] for body in bodies], list(range(12)))
+
+    def test_batch_is_flushed_before_exceeding_byte_limit(self):
+        sent = []
+        buffer = MessageBuffer(sent.append, max_batch_bytes=100)
+        buffer.add('q', 'a' * 60)
+        buffer.add('q', 'b' * 60)
+        self.assertEqual(sent, [[('q', 'a' * 60)]])
+        self.assertEqual(buffer.pending(), 1)
+
+    def test_old_messages_are_flushed_in_the_background(self):
+        sent = []
+        buffer = MessageBuffer(sent.append, flush_interval=0.02)
+        buffer.add('q', 'body')
+        deadline = time.monotonic() + 2
+        while not sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(sent, [[('q', 'body')]])
+
+    @patch('src.utils.aws_clients.time.sleep')
+    def test_failed_entries_are_retried(self, sleep):
+        with offline() as services:
+            flaky, calls = failing_first(services.sqs)
+            with patch.object(services.sqs, 'send_message_batch', flaky):
+                send_message({'n': 0})
+                send_message({'n': 1})
+                self.assertEqual(flush_messages(), 2)
+
+        self.assertEqual(calls, [['0', '1'], ['0']])
+        self.assertEqual(len(services.sqs.messages), 2)
+
+    @patch('src.utils.aws_clients.time.sleep')
+    def test_unsent_messages_stay_queued(self, sleep):
+        with offline() as services:
+            with patch.object(services.sqs, 'send_message_batch',
+                              side_effect=ConnectionError('down')):
+                send_message({'n': 0})
+                with self.assertRaises(ConnectionError):
+                    flush_messages()
+            self.assertEqual(flush_messages(), 1)
+        self.assertEqual(len(services.sqs.messages), 1)
+
+    @patch('src.utils.aws_clients.time.sleep')
+    def test_rejected_messages_are_reported_and_dropped(self, sleep):
+        with offline() as services:
+            flaky, calls = failing_first(services.sqs, sender_fault=True)
+            with patch.object(services.sqs, 'send_message_batch', flaky):
+                send_message({'n': 0})
+                send_message({'n': 1})
+                with self.assertRaises(SendError) as raised:
+                    flush_messages()
+            self.assertEqual(raised.exception.unsent, [])
+            self.assertEqual(flush_messages(), 0)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(services.sqs.messages), 1)
+
+    def test_unbuffered_sends_immediately(self):
+        config = {'outbound_messages': {'buffered': False}}
+        with offline(config) as services:
+            send_message({'n': 0})
+            self.assertEqual(len(services.sqs.messages), 1)
+            self.assertEqual(flush_messages(), 0)
+
+    def test_invocation_sends_its_messages_before_returning(self):
+        from src.lambda_handler import lambda_function
+
+        async def route(event):
+            send_message({'target_agent': 'news_agent'})
+            return {'statusCode': 200}
+
+        with offline() as services, \
+                patch.object(lambda_function, 'route_event', route):
+            asyncio.run(lambda_function.handle_event({}, None))
+            self.assertEqual(len(services.sqs.messages), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.utils import shared_codec
+from src.utils.aws_clients import (
+    get_many, get_shared_data, get_shared_data_cache, store_shared_data
+)
+
+
+def settings(**values):
+    return patch('src.utils.shared_codec.get_config', return_value=values)
+
+
+class TestSharedCodec(unittest.TestCase):
+
+    def test_small_values_stay_json_text(self):
+        text = shared_codec.to_json({'a': [1, 2]})
+        self.assertEqual(text, '{"a":[1,2]}')
+        self.assertEqual(shared_codec.encode(text), text)
+        self.assertEqual(shared_codec.decode(text), text)
+
+    def test_large_values_are_compressed_with_header(self):
+        text = shared_codec.to_json({'rows': [{'close': 1.5}] * 500})
+        with settings(threshold_bytes=100):
+            stored = shared_codec.encode(text)
+
+        self.assertIsInstance(stored, bytes)
+        self.assertEqual(stored[:4], b'SD\x01\x01')
+        self.assertLess(len(stored), len(text) // 10)
+        self.assertEqual(shared_codec.decode(stored), text)
+
+    def test_decodes_boto3_binary_wrapper(self):
+        from boto3.dynamodb.types import Binary
+        with settings(threshold_bytes=0, compression='none'):
+            stored = shared_codec.encode('{"n":1}')
+        self.assertEqual(shared_codec.decode(Binary(stored)), '{"n":1}')
+
+    def test_unknown_encodings_are_rejected(self):
+        with self.assertRaises(ValueError):
+            shared_codec.decode(b'SD\x09\x01payload')
+        with self.assertRaises(ValueError):
+            shared_codec.decode(b'SD\x01\xfepayload')
+
+    def test_registered_codec_is_selectable(self):
+        def reverse(data, *level):
+            return data[::-1]
+
+        with patch.dict(shared_codec.CODECS):
+            shared_codec.register_codec('reverse', 200, reverse, reverse)
+            with self.assertRaises(ValueError):
+                shared_codec.register_codec('zlib2', 1, reverse, reverse)
+            with settings(threshold_bytes=0, compression='reverse'):
+                stored = shared_codec.encode('{"n":1}')
+            self.assertEqual(stored, b'SD\x01\xc8}1:"n"{')
+            self.assertEqual(shared_codec.decode(stored), '{"n":1}')
+
+
+class TestSharedDataEncoding(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+
+    def test_round_trip_through_dynamodb(self):
+        value = {'rows': [{'close': i} for i in range(300)]}
+        config = {'shared_data_codec': {'threshold_bytes': 256}}
+        with offline(config) as services:
+            store_shared_data('big', value, 'u1')
+            store_shared_data('small', {'n': 1}, 'u1')
+            items = services.dynamodb.Table('SharedData').items
+            self.assertIsInstance(items['u1:big']['value'], bytes)
+            self.assertEqual(items['u1:small']['value'], '{"n":1}')
+
+            get_shared_data_cache().clear()
+            self.assertEqual(get_shared_data('big', 'u1'), value)
+            get_shared_data_cache().clear()
+            self.assertEqual(get_many(['big', 'small'], 'u1'),
+                             {'big': value, 'small': {'n': 1}})
+
+    def test_legacy_json_items_still_decode(self):
+        with offline() as services:
+            services.dynamodb.Table('SharedData').put_item(Item={
+                'key': 'u1:old', 'value': json.dumps({'code': 'x = 1'}),
+            })
+            self.assertEqual(get_shared_data('old', 'u1'), {'code': 'x = 1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.utils.aws_clients import (
+    get_many, get_shared_data, get_shared_data_cache, store_many
+)
+
+
+class TestSharedDataBatch(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+        sleep = patch('src.utils.aws_clients.time.sleep')
+        sleep.start()
+        self.addCleanup(patch.stopall)
+
+    def test_store_many_chunks_writes(self):
+        values = {f'k{i}': {'n': i} for i in range(60)}
+        with offline() as services:
+            store_many(values, 'u1')
+            # Three BatchWriteItem calls; usage tracking is off, so the
+            # replaced items are not read first
+            self.assertEqual(services.dynamodb.calls, 3)
+            self.assertEqual(
+                get_many(list(values), 'u1', bypass_cache=True), values
+            )
+            # 60 keys fit in one BatchGetItem call
+            self.assertEqual(services.dynamodb.calls, 4)
+
+    def test_get_many_serves_cached_keys_and_fills_missing(self):
+        with offline() as services:
+            store_many({'a': {'n': 1}}, 'u1')
+            services.dynamodb.Table('SharedData').put_item(
+                Item={'key': 'u1:b', 'value': '{"n": 2}'}
+            )
+            with patch.object(services.dynamodb, 'batch_get_item',
+                              wraps=services.dynamodb.batch_get_item) as get:
+                found = get_many(['a', 'b', 'c', 'b'], 'u1')
+                requested = get.call_args.kwargs['RequestItems']
+
+            self.assertEqual(found, {'a': {'n': 1}, 'b': {'n': 2}, 'c': {}})
+            self.assertEqual(requested['SharedData']['Keys'],
+                             [{'key': 'u1:b'}, {'key': 'u1:c'}])
+            # Items read in bulk are cached for single-key reads
+            self.assertEqual(get_shared_data('b', 'u1'), {'n': 2})
+
+    def test_unprocessed_items_are_retried(self):
+        with offline() as services:
+            resource = services.dynamodb
+            write = resource.batch_write_item
+
+            def throttle_first(RequestItems):
+                requests = RequestItems['SharedData']
+                if resource.calls == 0:
+                    write(RequestItems={'SharedData': requests[:1]})
+                    return {'UnprocessedItems': {'SharedData': requests[1:]}}
+                return write(RequestItems={'SharedData': requests})
+
+            with patch.object(resource, 'batch_write_item',
+                              side_effect=throttle_first):
+                store_many({'a': {'n': 1}, 'b': {'n': 2}}, 'u1')
+
+            self.assertEqual(resource.calls, 2)
+            self.assertEqual(resource.Table('SharedData').items.keys(),
+                             {'u1:a', 'u1:b'})
+
+    def test_store_many_raises_when_items_stay_unprocessed(self):
+        with offline() as services:
+            def throttle(RequestItems):
+                return {'UnprocessedItems': RequestItems}
+
+            with patch.object(services.dynamodb, 'batch_write_item',
+                              side_effect=throttle):
+                with self.assertRaises(RuntimeError):
+                    store_many({'a': {'n': 1}}, 'u1')
+            self.assertEqual(get_many(['a'], 'u1'), {'a': {}})
+
+
+if __name__ == '__main__':
+    unittest.main()
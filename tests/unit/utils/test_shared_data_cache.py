@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.utils.aws_clients import (
+    get_shared_data, get_shared_data_cache, store_shared_data
+)
+
+
+class TestSharedDataCache(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+
+    def test_repeated_reads_are_served_from_cache(self):
+        with offline() as services:
+            table = services.dynamodb.Table('SharedData')
+            table.put_item(Item={'key': 'u1:session', 'value': '{"n": 1}'})
+            with patch.object(table, 'get_item',
+                              wraps=table.get_item) as get_item:
+                self.assertEqual(get_shared_data('session', 'u1'), {'n': 1})
+                hit = get_shared_data('session', 'u1')
+                self.assertEqual(get_item.call_count, 1)
+
+            # Hits are copies, not the cached object
+            hit['n'] = 2
+            self.assertEqual(get_shared_data('session', 'u1'), {'n': 1})
+
+    def test_store_writes_through(self):
+        with offline() as services:
+            table = services.dynamodb.Table('SharedData')
+            with patch.object(table, 'put_item',
+                              wraps=table.put_item) as put_item, \
+                    patch.object(table, 'get_item') as get_item:
+                store_shared_data('session', {'n': 1}, 'u1')
+                self.assertEqual(get_shared_data('session', 'u1'), {'n': 1})
+                store_shared_data('session', {'n': 2}, 'u1')
+                self.assertEqual(get_shared_data('session', 'u1'), {'n': 2})
+
+            self.assertEqual(put_item.call_count, 2)
+            get_item.assert_not_called()
+
+    def test_cached_value_does_not_skip_write(self):
+        with offline() as services:
+            table = services.dynamodb.Table('SharedData')
+            store_shared_data('session', {'n': 1}, 'u1')
+            # Written by another container since
+            table.put_item(Item={'key': 'u1:session', 'value': '{"n": 2}'})
+            store_shared_data('session', {'n': 1}, 'u1')
+            self.assertEqual(table.items['u1:session']['value'], '{"n":1}')
+
+    def test_bypass_reads_dynamodb_and_refreshes_cache(self):
+        with offline() as services:
+            store_shared_data('session', {'n': 1}, 'u1')
+            # Written by another container
+            services.dynamodb.Table('SharedData').put_item(
+                Item={'key': 'u1:session', 'value': '{"n": 5}'}
+            )
+            self.assertEqual(get_shared_data('session', 'u1'), {'n': 1})
+            self.assertEqual(
+                get_shared_data('session', 'u1', bypass_cache=True), {'n': 5}
+            )
+            self.assertEqual(get_shared_data('session', 'u1'), {'n': 5})
+
+    def test_disabled_cache_always_reads_dynamodb(self):
+        config = {'shared_data_cache': {'enabled': False}}
+        with offline(config) as services:
+            table = services.dynamodb.Table('SharedData')
+            store_shared_data('session', {'n': 1}, 'u1')
+            with patch.object(table, 'get_item',
+                              wraps=table.get_item) as get_item:
+                get_shared_data('session', 'u1')
+                get_shared_data('session', 'u1')
+            self.assertEqual(get_item.call_count, 2)
+            self.assertEqual(len(get_shared_data_cache()), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
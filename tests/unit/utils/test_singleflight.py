@@ -0,0 +1,73 @@
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from src.utils.singleflight import SingleFlight, request_key
+
+
+class TestRequestKey(unittest.TestCase):
+
+    def test_key_ignores_payload_order(self):
+        self.assertEqual(
+            request_key('news', {'task': 'fetch_news', 'limit': 5}, 'u1'),
+            request_key('news', {'limit': 5, 'task': 'fetch_news'}, 'u1')
+        )
+
+    def test_key_separates_users_and_actions(self):
+        data = {'task': 'fetch_news'}
+        key = request_key('news', data, 'u1')
+        self.assertNotEqual(key, request_key('news', data, 'u2'))
+        self.assertNotEqual(key, request_key('portfolio', data, 'u1'))
+
+
+class TestSingleFlight(unittest.TestCase):
+
+    def test_concurrent_threads_share_one_call(self):
+        flight = SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {'news': []}
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = [pool.submit(flight.do, 'k', fetch) for _ in range(4)]
+            while flight.in_flight() == 0:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            release.set()
+            results = [f.result() for f in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_errors_reach_every_caller(self):
+        flight = SingleFlight()
+
+        async def failing():
+            await asyncio.sleep(0.05)
+            raise RuntimeError('rate limited')
+
+        async def run():
+            return await asyncio.gather(
+                flight.do_async('k', failing), flight.do_async('k', failing),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    def test_sequential_calls_are_not_cached(self):
+        flight = SingleFlight()
+        calls = []
+        flight.do('k', lambda: calls.append(1))
+        flight.do('k', lambda: calls.append(1))
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
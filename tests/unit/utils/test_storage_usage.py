@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.utils import aws_clients
+from src.utils.aws_clients import (
+    get_many, get_shared_data, get_shared_data_cache, get_storage_usage,
+    get_ttl, store_many, store_shared_data
+)
+from src.utils.local_store import SQLiteSharedStore
+from src.utils.storage_usage import (
+    PERMANENT, QuotaExceededError, bucket, item_deltas, total
+)
+
+NOW = 1_700_000_000  # 2023-11-14T22:13:20Z, in the past
+DAY = 86400
+
+
+def shared_data(**settings):
+    return {'shared_data': {
+        'ttl_seconds': {'coding_': 7 * DAY, 'coding_session_': 30 * DAY},
+        'track_usage': True,
+        **settings,
+    }}
+
+
+class TestExpiry(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+
+    def test_longest_prefix_wins(self):
+        with offline(shared_data(default_ttl_seconds=60)):
+            self.assertEqual(get_ttl('coding_t1'), 7 * DAY)
+            self.assertEqual(get_ttl('coding_session_t1'), 30 * DAY)
+            self.assertEqual(get_ttl('notes'), 60)
+        with offline(shared_data()):
+            self.assertIsNone(get_ttl('notes'))
+
+    def test_items_carry_expiry_and_expired_items_read_as_missing(self):
+        with offline(shared_data()) as services:
+            items = services.dynamodb.Table('SharedData').items
+            with patch('src.utils.aws_clients.time.time', return_value=NOW):
+                store_shared_data('coding_t1', {'code': 'x'}, 'u1')
+                store_many({'notes': {'n': 1}}, 'u1')
+            self.assertEqual(items['u1:coding_t1']['expires_at'],
+                             NOW + 7 * DAY)
+            self.assertNotIn('expires_at', items['u1:notes'])
+
+            # Not yet deleted by DynamoDB TTL, but past its expiry
+            get_shared_data_cache().clear()
+            later = NOW + 8 * DAY
+            with patch('src.utils.aws_clients.time.time', return_value=later):
+                self.assertEqual(get_shared_data('coding_t1', 'u1'), {})
+                self.assertEqual(get_many(['coding_t1', 'notes'], 'u1'),
+                                 {'coding_t1': {}, 'notes': {'n': 1}})
+
+    def test_local_sweep_deletes_expired_items(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SQLiteSharedStore(os.path.join(tmp, 'shared.db'))
+            store.put_item(Item={'key': 'u1:a', 'value': '1',
+                                 'expires_at': NOW})
+            store.put_item(Item={'key': 'u1:b', 'value': '2'})
+
+            self.assertEqual(store.sweep(now=NOW + 1), 1)
+            self.assertEqual(store.get_item(Key={'key': 'u1:a'}), {})
+            self.assertIn('Item', store.get_item(Key={'key': 'u1:b'}))
+
+
+class TestStorageUsage(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+        aws_clients._usage_totals.clear()
+
+    def test_buckets_and_deltas(self):
+        self.assertEqual(bucket(None), PERMANENT)
+        self.assertEqual(bucket(NOW), 'b_20231114')
+        self.assertEqual(
+            item_deltas({'size': 10, 'expires_at': NOW}, {'size': 4}),
+            {'b_20231114': -10, PERMANENT: 4}
+        )
+        self.assertEqual(total({PERMANENT: 5, 'b_20000101': 7}), 5)
+
+    def test_writes_are_accounted_per_user(self):
+        with offline(shared_data()):
+            store_shared_data('notes', {'n': 1}, 'u1')
+            self.assertEqual(get_storage_usage('u1'), len('{"n":1}'))
+            # Replacing an item only counts the difference
+            store_many({'notes': {'n': 100}, 'other': {}}, 'u1')
+            self.assertEqual(get_storage_usage('u1', refresh=True),
+                             len('{"n":100}') + len('{}'))
+            self.assertEqual(get_storage_usage('u2'), 0)
+
+    def test_expired_buckets_stop_counting_and_are_pruned(self):
+        with offline(shared_data()) as services:
+            with patch('src.utils.aws_clients.time.time', return_value=NOW):
+                store_shared_data('coding_t1', {'code': 'x'}, 'u1')
+            store_shared_data('notes', {'n': 1}, 'u1')
+            counters = services.dynamodb.Table('SharedDataUsage').items
+            self.assertEqual(len(counters['u1']), 3)
+
+            self.assertEqual(get_storage_usage('u1', refresh=True),
+                             len('{"n":1}'))
+            self.assertEqual(set(counters['u1']), {'user_id', PERMANENT})
+
+    def test_quota_is_enforced(self):
+        with offline(shared_data(quota_bytes=20)):
+            store_shared_data('a', {'text': 'x' * 20}, 'u1')
+            with self.assertRaises(QuotaExceededError):
+                store_shared_data('b', {'n': 1}, 'u1')
+            with self.assertRaises(QuotaExceededError):
+                store_many({'b': {'n': 1}}, 'u1')
+            # Other users are unaffected
+            store_shared_data('b', {'n': 1}, 'u2')
+
+    def test_accounting_on_sqlite_backend(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'shared.db')
+            with offline(shared_data(backend='sqlite', sqlite_path=path)):
+                store_shared_data('notes', {'n': 1}, 'u1')
+                store_many({'notes': {'n': 22}, 'more': {'n': 3}}, 'u1')
+                self.assertEqual(get_storage_usage('u1', refresh=True),
+                                 len('{"n":22}') + len('{"n":3}'))
+
+
+if __name__ == '__main__':
+    unittest.main()
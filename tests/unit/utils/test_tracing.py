@@ -0,0 +1,84 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+import requests
+import requests_mock
+from src.utils import tracing
+
+
+class TestSpans(unittest.TestCase):
+
+    def setUp(self):
+        with patch('sys.stdout', new_callable=io.StringIO):
+            tracing.flush_metrics()
+
+    def test_spans_nest_and_inherit_action(self):
+        with tracing.span('invocation', action='news') as root:
+            with tracing.span('audit.write') as child:
+                self.assertIs(tracing.current_span(), child)
+
+        self.assertIsNone(tracing.current_span())
+        self.assertEqual(child['parent_id'], root['span_id'])
+        self.assertEqual(child['trace_id'], root['trace_id'])
+        self.assertEqual(child['action'], 'news')
+        self.assertGreaterEqual(root['duration_ms'], child['duration_ms'])
+
+    def test_errors_are_recorded(self):
+        with self.assertRaises(ValueError):
+            with tracing.span('shared_data.read', action='code') as record:
+                raise ValueError('throttled')
+        self.assertEqual(record['status'], 'error')
+        snapshot = tracing.metrics_snapshot()
+        self.assertEqual(snapshot['shared_data.read']['code']['count'], 1)
+
+    def test_percentiles(self):
+        for ms in range(1, 101):
+            tracing.record_latency('dispatch', 'trade', float(ms))
+        stats = tracing.metrics_snapshot()['dispatch']['trade']
+        self.assertEqual(stats, {'count': 100, 'p50': 50.0, 'p95': 95.0,
+                                 'p99': 99.0})
+
+    def test_flush_emits_emf_and_resets(self):
+        for ms in (12.5, 3.0, 12.5):
+            tracing.record_latency('dispatch', 'news', ms)
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            tracing.flush_metrics()
+
+        record = json.loads(out.getvalue().strip())
+        self.assertEqual(record['Span'], 'dispatch')
+        self.assertEqual(record['Action'], 'news')
+        # Raw samples, so CloudWatch computes the percentiles
+        self.assertEqual(record['Latency'],
+                         {'Values': [3.0, 12.5], 'Counts': [1, 2]})
+        metrics = record['_aws']['CloudWatchMetrics'][0]['Metrics']
+        self.assertEqual([m['Name'] for m in metrics], ['Latency'])
+        self.assertEqual(tracing.metrics_snapshot(), {})
+
+    def test_flush_splits_values_across_records(self):
+        for ms in range(150):
+            tracing.record_latency('dispatch', 'news', float(ms))
+        with patch('sys.stdout', new_callable=io.StringIO) as out:
+            tracing.flush_metrics()
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual([len(r['Latency']['Values']) for r in records],
+                         [100, 50])
+
+    def test_http_calls_are_traced(self):
+        tracing.instrument_http()
+        adapter = requests_mock.Adapter()
+        url = 'https://api.coingecko.com/api/v3/news'
+        adapter.register_uri('GET', url, json={'data': []})
+        session = requests.Session()
+        session.mount('https://', adapter)
+
+        with tracing.span('handler', action='news'):
+            session.get(url, timeout=10)
+
+        snapshot = tracing.metrics_snapshot()
+        self.assertEqual(snapshot['http']['news']['count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
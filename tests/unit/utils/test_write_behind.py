@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+from benchmarks.fakes import offline
+from src.agents import agent_registry
+from src.utils.aws_clients import (
+    get_many, get_shared_data, get_shared_data_cache, store_many,
+    store_shared_data, write_behind
+)
+from src.utils.cache import get_response_cache
+
+# Usage accounting is off so call counts only cover the writes
+UNTRACKED = {'shared_data': {'track_usage': False}}
+ENABLED = {'shared_data': {'track_usage': False, 'write_behind': True}}
+
+
+class TestWriteBehind(unittest.TestCase):
+
+    def setUp(self):
+        get_shared_data_cache().clear()
+
+    def test_writes_coalesce_until_scope_exits(self):
+        with offline(UNTRACKED) as services:
+            items = services.dynamodb.Table('SharedData').items
+            with write_behind(enabled=True):
+                store_shared_data('session', {'n': 1}, 'u1')
+                store_shared_data('session', {'n': 2}, 'u1')
+                store_many({'result': {'ok': True}}, 'u1')
+                self.assertEqual(items, {})
+                # Reads see the buffered values
+                self.assertEqual(get_shared_data('session', 'u1'), {'n': 2})
+                self.assertEqual(get_many(['result'], 'u1'),
+                                 {'result': {'ok': True}})
+
+            self.assertEqual(services.dynamodb.calls, 1)
+            self.assertEqual(items['u1:session']['value'], '{"n":2}')
+            self.assertIn('u1:result', items)
+
+    def test_disabled_by_default(self):
+        with offline() as services:
+            with write_behind():
+                store_shared_data('session', {'n': 1}, 'u1')
+                self.assertIn('u1:session',
+                              services.dynamodb.Table('SharedData').items)
+
+    def test_nested_scope_takes_its_keys_from_outer_scope(self):
+        with offline(UNTRACKED) as services:
+            items = services.dynamodb.Table('SharedData').items
+            with write_behind(enabled=True):
+                store_shared_data('k', {'v': 'old'}, 'u1')
+                with write_behind(enabled=True):
+                    self.assertEqual(get_shared_data('k', 'u1'), {'v': 'old'})
+                    store_shared_data('k', {'v': 'new'}, 'u1')
+                self.assertEqual(items['u1:k']['value'], '{"v":"new"}')
+            self.assertEqual(items['u1:k']['value'], '{"v":"new"}')
+            self.assertEqual(services.dynamodb.calls, 1)
+
+    def test_failed_flush_raises(self):
+        with offline() as services:
+            with patch.object(services.dynamodb, 'batch_write_item',
+                              side_effect=RuntimeError('throttled')):
+                with self.assertRaises(RuntimeError):
+                    with write_behind(enabled=True):
+                        store_shared_data('k', {'n': 1}, 'u1')
+
+    def test_dispatch_flushes_before_returning(self):
+        get_response_cache().local.clear()
+
+        def handler(data, user_id):
+            store_shared_data('coding_session_t1', {'code': 'x'}, user_id)
+            store_shared_data('coding_session_t1', {'code': 'y'}, user_id)
+            store_shared_data('coding_t1', {'code': 'y'}, user_id)
+            return {'status': 'success'}
+
+        async def run():
+            result = await agent_registry.dispatch(
+                'code', {'task': 'generate_code'}, 'u1'
+            )
+            return result, dict(services.dynamodb.Table('SharedData').items)
+
+        with offline(ENABLED) as services, \
+                patch('src.utils.database.record_audit'), \
+                patch.object(agent_registry, 'get_async_handler',
+                             return_value=agent_registry.to_async(handler)):
+            result, items = asyncio.run(run())
+
+        self.assertEqual(result, {'status': 'success'})
+        self.assertEqual(set(items), {'u1:coding_session_t1', 'u1:coding_t1'})
+        self.assertEqual(services.dynamodb.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()